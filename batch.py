@@ -0,0 +1,402 @@
+# batch.py
+"""
+사고 사례 배치 실행기
+
+- test_preprocessing.csv 를 청크 단위로 스트리밍하며 컴파일된 그래프를 동시 실행 (confirm 정책: auto)
+- 결과(answer, report, sources, usage, timings)를 JSONL로 즉시 기록
+- 재시작 시 이미 완료(status=ok)된 ID는 건너뜀
+- 진행 중이던 사례는 SQLite 체크포인트에서 마지막 완료 노드부터 재개
+- --export-dir 지정 시 완료된 보고서를 워커 프로세스에서 .docx로 동시 내보내기 (core/report_export.py)
+- 정규화한 상황 문장이 같은 사례는 그래프를 1번만 실행하고 결과를 나머지 ID에 복사 (--no-dedup으로 끄기)
+  절약량은 종료 시 출력하고 <output>.dedup.json에 저장
+
+실행 예:
+    python batch.py --input data/test_preprocessing.csv --output results/batch.jsonl --concurrency 4
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "test_preprocessing.csv")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "batch_results.jsonl")
+
+
+# === 1️⃣ 입력 스트리밍 ===
+def iter_cases(path: str) -> Iterator[Dict[str, str]]:
+    """CSV를 청크 단위로 읽어 {id, situation} 반환 (core/dataset.py)"""
+    from core.dataset import iter_cases as _iter_cases
+    return _iter_cases(path)
+
+
+def scan_cases(path: str, completed: Set[str], limit: int = 0) -> Tuple[int, int, Counter]:
+    """(전체 사례 수, 그중 이미 완료된 수, 정규화 상황 키별 남은 사례 수)"""
+    from core.dataset import normalize_situation
+
+    total = skipped = 0
+    pending: Counter = Counter()
+    for case in iter_cases(path):
+        if limit and total >= limit:
+            break
+        total += 1
+        if case["id"] in completed:
+            skipped += 1
+        else:
+            pending[normalize_situation(case["situation"])] += 1
+    return total, skipped, pending
+
+
+def load_completed(path: str) -> Set[str]:
+    """출력 JSONL에서 정상 완료된 ID 목록"""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 중단 시 잘린 마지막 줄
+            if rec.get("status") == "ok":
+                done.add(rec["id"])
+    return done
+
+
+def load_reusable(path: str, keys: Set[str]) -> Dict[str, Dict[str, Any]]:
+    """출력 JSONL에서 keys(남은 사례의 상황 키)와 같은 상황의 완료 결과 (재시작 시 재실행 없이 복사)"""
+    from core.dataset import normalize_situation
+
+    found: Dict[str, Dict[str, Any]] = {}
+    if not keys or not os.path.exists(path):
+        return found
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if rec.get("status") != "ok":
+                continue
+            key = normalize_situation(rec.get("situation", ""))
+            if key in keys and key not in found:
+                found[key] = rec
+    return found
+
+
+# === 2️⃣ 사례 1건 실행 ===
+def _jsonable(obj: Any) -> Any:
+    return json.loads(json.dumps(obj, ensure_ascii=False, default=str))
+
+
+def run_case(app, case: Dict[str, str]) -> Dict[str, Any]:
+    """
+    그래프를 스트리밍 실행하며 노드별 소요 시간을 누적
+    - checkpointer가 있으면 사례 ID를 thread_id로 사용해 중단 지점부터 재개
+    """
+    from core.graph import make_init_state
+    from core.budget import release
+
+    node_times: Dict[str, float] = {}
+    state: Dict[str, Any] = {}
+    t0 = last = time.perf_counter()
+
+    init_state = make_init_state(case["situation"], case_id=case["id"])
+    budget = init_state["budget"]
+    config = None
+    if app.checkpointer is not None:
+        from core.checkpoint import thread_config, resume_input
+        config = thread_config(case["id"])
+        init_state = resume_input(app, init_state, config)
+
+    try:
+        for mode, chunk in app.stream(init_state, config, stream_mode=["updates", "values"]):
+            now = time.perf_counter()
+            if mode == "updates":
+                for node in chunk:
+                    node_times[node] = node_times.get(node, 0.0) + (now - last)
+                last = now
+            else:
+                state = chunk
+    except BaseException:
+        # 실패한 실행도 프로세스 공용 사용량 장부(LEDGER)에서 제거 (재개한 실행은 state의 run_id 사용)
+        release(state if state.get("budget") else {"budget": budget})
+        raise
+
+    answer = state.get("candidate_answer")
+    if answer is None and state.get("messages"):
+        answer = state["messages"][-1].content
+
+    return {
+        "id": case["id"],
+        "status": "ok",
+        "situation": case["situation"],
+        "answer": answer,
+        "report": state.get("report"),
+        "sources": _jsonable(state.get("sources", [])),
+        "retries": state.get("retries", 0),
+        "usage": release(state),
+        "timings": {
+            "total_s": round(time.perf_counter() - t0, 3),
+            "nodes": {k: round(v, 3) for k, v in node_times.items()},
+        },
+    }
+
+
+# === 3️⃣ 같은 상황 결과 공유 ===
+class _Dedup:
+    """
+    정규화한 상황 문장이 같은 사례 묶기
+    - 처음 나온 사례(대표)만 그래프 실행, 실행 중 들어온 같은 상황 사례는 대기 → 대표 완료 시 결과 복사
+    - pending(사전 스캔한 키별 남은 사례 수)이 0이 되면 보관 중인 결과 해제
+    - 대표가 실패하면 대기 중인 첫 사례가 대표가 되어 다시 실행
+    """
+
+    def __init__(self, pending: Counter, reuse: Dict[str, Dict[str, Any]]):
+        self.pending = pending
+        self.results = reuse
+        self.waiting: Dict[str, List[Dict[str, str]]] = {}
+        self.lock = threading.Lock()
+        self.executed = 0
+        self.copied = 0
+        self.groups: Counter = Counter()
+        self.saved = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_seconds": 0.0, "total_s": 0.0}
+
+    @staticmethod
+    def key_of(case: Dict[str, str]) -> str:
+        from core.dataset import normalize_situation
+        return normalize_situation(case["situation"])
+
+    def _served(self, key: str, n: int = 1):
+        self.pending[key] -= n
+        if self.pending[key] <= 0:
+            self.pending.pop(key, None)
+            self.results.pop(key, None)
+
+    def claim(self, case: Dict[str, str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """("run", None) 대표로 실행 / ("wait", None) 실행 중인 대표 대기 / ("copy", 결과) 완료 결과 복사"""
+        key = self.key_of(case)
+        with self.lock:
+            if key in self.results:
+                leader = self.results[key]
+                self._served(key)
+                return "copy", leader
+            if key in self.waiting:
+                self.waiting[key].append(case)
+                return "wait", None
+            self.waiting[key] = []
+            self.executed += 1
+            return "run", None
+
+    def finish(self, case: Dict[str, str], rec: Dict[str, Any]) -> Tuple[List[Dict[str, str]], Optional[Dict[str, str]]]:
+        """대표 실행 종료 → (결과를 복사할 대기 사례, 실패 시 다음 대표)"""
+        key = self.key_of(case)
+        with self.lock:
+            followers = self.waiting.pop(key, [])
+            if rec["status"] != "ok":
+                self._served(key)
+                if not followers:
+                    return [], None
+                self.waiting[key] = followers[1:]
+                self.executed += 1
+                return [], followers[0]
+            self.results[key] = rec
+            self._served(key, 1 + len(followers))
+            return followers, None
+
+    def copy(self, leader: Dict[str, Any], case: Dict[str, str]) -> Dict[str, Any]:
+        """대표 결과 → 같은 상황의 다른 ID 레코드 (이 ID로는 LLM 사용량 0)"""
+        total = (leader.get("usage") or {}).get("total") or {}
+        with self.lock:
+            self.copied += 1
+            self.groups[leader.get("dedup_of") or leader["id"]] += 1
+            for k in ("llm_calls", "prompt_tokens", "completion_tokens", "llm_seconds"):
+                self.saved[k] += total.get(k, 0)
+            self.saved["total_s"] += (leader.get("timings") or {}).get("total_s", 0.0)
+        return {
+            **leader,
+            "id": case["id"],
+            "situation": case["situation"],
+            "dedup_of": leader.get("dedup_of") or leader["id"],
+            "usage": {},
+            "timings": {"total_s": 0.0, "nodes": {}},
+        }
+
+    def report(self) -> Dict[str, Any]:
+        saved = {k: round(v, 3) if isinstance(v, float) else v for k, v in self.saved.items()}
+        return {
+            "executed": self.executed,
+            "copied": self.copied,
+            "saved": saved,
+            "largest_groups": [{"leader": k, "copies": n} for k, n in self.groups.most_common(10)],
+        }
+
+
+# === 4️⃣ 배치 실행 ===
+class _Progress:
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def update(self, ok: bool, case_id: str, elapsed: float):
+        with self.lock:
+            self.done += 1
+            self.failed += 0 if ok else 1
+            spent = time.perf_counter() - self.t0
+            rate = self.done / spent if spent > 0 else 0.0
+            remaining = self.total - self.skipped - self.done
+            eta = remaining / rate if rate > 0 else float("inf")
+            mark = "✅" if ok else "❌"
+            print(
+                f"{mark} [{self.skipped + self.done}/{self.total}] {case_id} ({elapsed:.1f}s) "
+                f"| 처리량 {rate * 60:.2f} cases/min | ETA {eta / 60:.1f}분 | 실패 {self.failed}"
+            )
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 4, limit: int = 0,
+              checkpoint_db: Optional[str] = None, export_dir: Optional[str] = None,
+              export_zip: Optional[str] = None, dedup: bool = True):
+    from core.graph import build_app
+    from core.checkpoint import open_checkpointer, delete_threads, compact
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    completed = load_completed(output_path)
+    total, skipped, pending = scan_cases(input_path, completed, limit)
+    print(f"📦 배치 시작: 총 {total}건 (완료 {skipped}건 건너뜀), 동시 실행 {concurrency}")
+    shared = None
+    if dedup:
+        shared = _Dedup(pending, load_reusable(output_path, set(pending)))
+        remaining = total - skipped
+        print(f"♻️ 고유 상황 {len(pending)}개 / 남은 사례 {remaining}건 "
+              f"(중복 {remaining - len(pending)}건은 결과 복사, 이전 결과 재사용 {len(shared.results)}개)")
+
+    saver = open_checkpointer(checkpoint_db) if checkpoint_db else None
+    app = build_app(confirm_mode="auto", checkpointer=saver)
+    progress = _Progress(total, skipped=skipped)
+    exporter = None
+    if export_dir:
+        from core.report_export import ReportExporter
+        exporter = ReportExporter(export_dir, zip_path=export_zip)
+    write_lock = threading.Lock()
+    # 입력을 한꺼번에 제출하지 않도록 대기열 크기 제한
+    slots = threading.BoundedSemaphore(concurrency * 2)
+
+    # 실행 중 예외가 나도 내보내기 워커 프로세스를 정리 (종료 순서: 배치 워커 → 출력 파일 → 내보내기)
+    with exporter or nullcontext(), open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+
+        def _emit(rec, elapsed, ran=True):
+            with write_lock:
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+            progress.update(rec["status"] == "ok", rec["id"], elapsed)
+            if exporter is not None:
+                exporter.submit(rec)
+            # 결과가 JSONL에 기록됐으므로 해당 사례의 체크포인트는 더 이상 필요 없음
+            if ran and saver is not None and rec["status"] == "ok":
+                delete_threads(saver, [rec["id"]])
+
+        def _error_record(case, e):
+            return {"id": case["id"], "status": "error", "situation": case["situation"],
+                    "error": f"{type(e).__name__}: {e}"}
+
+        def _emit_copy(leader, case):
+            """대표 결과 복사 기록 (실패하면 이 사례를 오류 레코드로 남겨 재시작 시 다시 실행)"""
+            try:
+                _emit(shared.copy(leader, case), 0.0, ran=False)
+            except Exception as e:
+                traceback.print_exc()
+                try:
+                    _emit(_error_record(case, e), 0.0, ran=False)
+                except Exception:
+                    traceback.print_exc()
+
+        def _work(case):
+            try:
+                while case is not None:
+                    t0 = time.perf_counter()
+                    try:
+                        rec = run_case(app, case)
+                    except Exception as e:
+                        traceback.print_exc()
+                        rec = _error_record(case, e)
+                    try:
+                        _emit(rec, time.perf_counter() - t0)
+                    except Exception:
+                        # 기록/내보내기 실패로 아래 대기 사례까지 잃지 않도록 로그만 남기고 계속
+                        traceback.print_exc()
+                    if shared is None:
+                        break
+                    # 같은 상황으로 대기 중인 사례에 결과 복사 (실패 시 대기 사례 하나를 이어서 실행)
+                    followers, case = shared.finish(case, rec)
+                    for follower in followers:
+                        _emit_copy(rec, follower)
+            finally:
+                slots.release()
+
+        for i, case in enumerate(iter_cases(input_path)):
+            if limit and i >= limit:
+                break
+            if case["id"] in completed:
+                continue
+            if shared is not None:
+                action, leader = shared.claim(case)
+                if action == "copy":
+                    _emit_copy(leader, case)
+                if action != "run":
+                    continue
+            slots.acquire()
+            pool.submit(_work, case)
+
+    if saver is not None:
+        compact(saver)
+
+    spent = time.perf_counter() - progress.t0
+    print(f"\n🏁 배치 완료: {progress.done}건 처리 ({progress.failed}건 실패), {spent / 60:.1f}분 소요")
+
+    if shared is not None:
+        summary = shared.report()
+        saved = summary["saved"]
+        print(f"♻️ 중복 상황 공유: {summary['executed']}건 실행, {summary['copied']}건 결과 복사 → "
+              f"LLM 호출 {saved['llm_calls']}회, 토큰 {saved['prompt_tokens'] + saved['completion_tokens']}개, "
+              f"실행 시간 약 {saved['total_s'] / 60:.1f}분 절약")
+        report_path = os.path.splitext(output_path)[0] + ".dedup.json"
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사고 사례 배치 실행기")
+    parser.add_argument("--input", default=DEFAULT_INPUT)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=0, help="앞에서부터 N건만 실행 (0=전체)")
+    parser.add_argument("--checkpoint-db", default=None,
+                        help="노드 단위 체크포인트 SQLite 경로 (미지정 시 core.checkpoint.CHECKPOINT_DB)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="노드 단위 체크포인트 비활성화")
+    parser.add_argument("--export-dir", default=None, help="완료된 보고서를 .docx로 내보낼 폴더")
+    parser.add_argument("--export-zip", default=None, help="내보낸 .docx를 묶을 zip 경로 (--export-dir 필요)")
+    parser.add_argument("--no-dedup", action="store_true", help="같은 상황 문장도 사례마다 그래프 실행")
+    args = parser.parse_args()
+
+    checkpoint_db = None
+    if not args.no_checkpoint:
+        from core.checkpoint import CHECKPOINT_DB
+        checkpoint_db = args.checkpoint_db or CHECKPOINT_DB
+    run_batch(args.input, args.output, concurrency=args.concurrency, limit=args.limit,
+              checkpoint_db=checkpoint_db, export_dir=args.export_dir, export_zip=args.export_zip,
+              dedup=not args.no_dedup)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# bench/loadtest.py
+"""
+컴파일된 에이전트 그래프 부하 테스트 (retrieve → generate → grade → report 전 구간)
+
+- 동시 실행 수를 단계적으로 올리며(--concurrency 1,2,4,8) 사례 단위 지연/처리량 측정
+- --rate > 0 이면 Poisson 도착(초당 평균 rate건, open loop), 0이면 closed loop
+- 사례별 지연 분위수(p50/p90/p95/p99), 대기 시간, 루프 횟수(retries),
+  사례당 LLM 호출/토큰(core/budget.py 장부) 집계
+- 처리량이 더 이상 늘지 않거나(증가율 < --saturation-gain) 제시 부하를 못 따라가는
+  첫 단계를 포화 지점으로 표시
+- --mock 이면 bench/mock_server.py를 같은 프로세스에서 띄워 LLM/임베딩 엔드포인트로 사용
+
+실행 예:
+    python -m bench.loadtest --mock --concurrency 1,2,4,8 --cases 16 --output results/loadtest.json
+    python -m bench.loadtest --rate 0.5 --concurrency 4 --cases 40 --history results/loadtest_history.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SATURATION_GAIN = 0.10   # 이전 단계 대비 처리량 증가율이 이보다 작으면 포화
+RATE_SHORTFALL = 0.90    # open loop에서 달성 처리량 < 제시 부하 × 이 값이면 포화
+
+
+# === 1️⃣ 입력 ===
+def load_situations(source: str, limit: int = 0) -> List[str]:
+    """
+    상황 문장 목록
+    - "query": core/query.py 의 학습 데이터 질의 (core/dataset.py의 train split)
+    - "test" 또는 CSV 경로: 같은 템플릿으로 생성
+    """
+    from core.dataset import iter_cases, load_cases
+
+    if source == "query":
+        # 캐시된 사례 표에서 필요한 앞부분만 목록으로 변환
+        column = load_cases("train")["situation"]
+        return (column.iloc[:limit] if limit else column).tolist()
+    situations = []
+    for case in iter_cases(source):
+        situations.append(case["situation"])
+        if limit and len(situations) >= limit:
+            break
+    return situations
+
+
+# === 2️⃣ 단계 1개 실행 ===
+def _percentiles(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p90": None, "p95": None, "p99": None, "mean": None}
+    arr = np.asarray(values, dtype=np.float64)
+    p50, p90, p95, p99 = np.percentile(arr, [50, 90, 95, 99])
+    return {"p50": round(float(p50), 3), "p90": round(float(p90), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "mean": round(float(arr.mean()), 3)}
+
+
+def run_level(app, situations: List[str], concurrency: int, n_cases: int,
+              rate: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+    """동시 실행 concurrency, 사례 n_cases건 실행 후 요약"""
+    from batch import run_case
+
+    rng = random.Random(seed)
+    records: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _work(idx: int, arrived: float):
+        started = time.perf_counter()
+        case = {"id": f"load-{concurrency}-{idx}", "situation": situations[idx % len(situations)]}
+        try:
+            rec = run_case(app, case)
+        except Exception as e:
+            rec = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        done = time.perf_counter()
+        total = (rec.get("usage") or {}).get("total") or {}
+        row = {
+            "status": rec.get("status", "error"),
+            "latency_s": done - arrived,
+            "queue_s": started - arrived,
+            "service_s": done - started,
+            "retries": rec.get("retries", 0),
+            "llm_calls": total.get("llm_calls", 0),
+            "prompt_tokens": total.get("prompt_tokens", 0),
+            "completion_tokens": total.get("completion_tokens", 0),
+            "nodes": (rec.get("timings") or {}).get("nodes", {}),
+        }
+        with lock:
+            records.append(row)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        next_arrival = t0
+        for i in range(n_cases):
+            if rate > 0:
+                next_arrival += rng.expovariate(rate)
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                arrived = next_arrival
+            else:
+                arrived = time.perf_counter()
+            pool.submit(_work, i, arrived)
+    wall = time.perf_counter() - t0
+
+    ok = [r for r in records if r["status"] == "ok"]
+    node_totals: Dict[str, float] = {}
+    for r in ok:
+        for node, sec in r["nodes"].items():
+            node_totals[node] = node_totals.get(node, 0.0) + sec
+
+    return {
+        "concurrency": concurrency,
+        "offered_rate": rate or None,
+        "cases": len(records),
+        "errors": len(records) - len(ok),
+        "wall_s": round(wall, 3),
+        "throughput_cpm": round(len(ok) / wall * 60, 3) if wall > 0 else None,
+        "latency_s": _percentiles([r["latency_s"] for r in ok]),
+        "queue_s": _percentiles([r["queue_s"] for r in ok]),
+        "service_s": _percentiles([r["service_s"] for r in ok]),
+        "retries": _percentiles([r["retries"] for r in ok]),
+        "llm_calls_per_case": _percentiles([r["llm_calls"] for r in ok]),
+        "tokens_per_case": {
+            "prompt": round(float(np.mean([r["prompt_tokens"] for r in ok])), 1) if ok else None,
+            "completion": round(float(np.mean([r["completion_tokens"] for r in ok])), 1) if ok else None,
+        },
+        "node_seconds_per_case": {k: round(v / len(ok), 3) for k, v in sorted(node_totals.items())} if ok else {},
+    }
+
+
+# === 3️⃣ 포화 지점 ===
+def find_saturation(levels: List[Dict[str, Any]], gain: float = SATURATION_GAIN) -> Optional[Dict[str, Any]]:
+    prev = None
+    for level in levels:
+        tput = level["throughput_cpm"] or 0.0
+        if level["offered_rate"] and tput < level["offered_rate"] * 60 * RATE_SHORTFALL:
+            return {"concurrency": level["concurrency"], "reason": "throughput below offered rate"}
+        if prev is not None and prev["throughput_cpm"]:
+            ratio = tput / prev["throughput_cpm"] - 1
+            if ratio < gain:
+                return {
+                    "concurrency": prev["concurrency"],
+                    "reason": f"throughput +{ratio * 100:.1f}% at concurrency {level['concurrency']}",
+                }
+        prev = level
+    return None
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_loadtest(levels: Sequence[int], n_cases: int, rate: float = 0.0, source: str = "query",
+                 confirm_mode: str = "auto", seed: int = 0,
+                 saturation_gain: float = SATURATION_GAIN) -> Dict[str, Any]:
+    from core.graph import build_app
+    from core.llm_utils import LLM_POOL
+
+    situations = load_situations(source)
+    if not situations:
+        raise ValueError(f"상황 문장이 없습니다: {source}")
+    rng = random.Random(seed)
+    rng.shuffle(situations)
+
+    app = build_app(confirm_mode=confirm_mode)
+    results = []
+    for c in levels:
+        print(f"🚦 동시 {c}, 사례 {n_cases}건" + (f", 도착률 {rate}/s" if rate else "") + " ...")
+        level = run_level(app, situations, c, n_cases, rate=rate, seed=seed)
+        lat = level["latency_s"]
+        print(
+            f"   처리량 {level['throughput_cpm']} cases/min | 지연 p50 {lat['p50']}s p95 {lat['p95']}s "
+            f"| 대기 p95 {level['queue_s']['p95']}s | LLM 호출/사례 {level['llm_calls_per_case']['mean']} "
+            f"| 루프 {level['retries']['mean']} | 실패 {level['errors']}"
+        )
+        results.append(level)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_rev": _git_rev(),
+        "endpoints": [{"name": ep.name, "base_url": ep.base_url, "model": ep.model} for ep in LLM_POOL.endpoints],
+        "source": source,
+        "confirm_mode": confirm_mode,
+        "cases_per_level": n_cases,
+        "rate": rate or None,
+        "levels": results,
+        "saturation_gain": saturation_gain,
+        "saturation": find_saturation(results, gain=saturation_gain),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="에이전트 그래프 부하 테스트")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="쉼표로 구분한 동시 실행 수 단계")
+    parser.add_argument("--cases", type=int, default=16, help="단계별 사례 수")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson 도착률 (건/초, 0=closed loop)")
+    parser.add_argument("--source", default="query", help='"query"(core/query.py) 또는 CSV 경로')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saturation-gain", type=float, default=SATURATION_GAIN,
+                        help="이전 단계 대비 처리량 증가율이 이 값보다 작으면 포화로 판단")
+    parser.add_argument("--mock", action="store_true", help="bench/mock_server.py를 띄워 엔드포인트로 사용")
+    parser.add_argument("--mock-config", default=None)
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    parser.add_argument("--history", default=None, help="요약 1줄을 덧붙일 JSONL (추세 비교용)")
+    args = parser.parse_args()
+
+    if args.mock:
+        # core 모듈이 엔드포인트 환경 변수를 import 시점에 읽으므로 먼저 설정
+        from bench.mock_server import load_config, start_in_thread
+        base = start_in_thread(load_config(args.mock_config))
+        os.environ["MODEL_BASE_URL"] = base
+        os.environ["EMBEDDING_BASE_URL"] = base
+        os.environ.pop("MODEL_ENDPOINTS", None)
+        print(f"🧪 Mock 엔드포인트: {base}")
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    report = run_loadtest(levels, args.cases, rate=args.rate, source=args.source, seed=args.seed,
+                          saturation_gain=args.saturation_gain)
+    report["mock"] = args.mock
+
+    sat = report["saturation"]
+    print(f"\n📈 포화 지점: 동시 {sat['concurrency']} ({sat['reason']})" if sat else "\n📈 포화 지점: 측정 범위 내 없음")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 저장: {args.output}")
+    if args.history:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        summary = {
+            "timestamp": report["timestamp"],
+            "git_rev": report["git_rev"],
+            "mock": args.mock,
+            "rate": report["rate"],
+            "saturation": sat,
+            "levels": {
+                str(l["concurrency"]): {
+                    "throughput_cpm": l["throughput_cpm"],
+                    "latency_p95_s": l["latency_s"]["p95"],
+                    "llm_calls_per_case": l["llm_calls_per_case"]["mean"],
+                }
+                for l in report["levels"]
+            },
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
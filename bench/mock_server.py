@@ -0,0 +1,319 @@
+# bench/mock_server.py
+"""
+오프라인 성능 측정용 로컬 스탠드인 서버 (OpenAI 호환)
+
+- POST /v1/chat/completions  (stream=true 시 SSE 스트리밍)
+- POST /v1/embeddings        (텍스트 해시 시드 기반 결정적 임베딩)
+- GET  /v1/models            (llm_pool 헬스 체크용)
+
+실행 예:
+    python -m bench.mock_server --port 8908 --config bench/mock_config.json
+    MODEL_BASE_URL=http://127.0.0.1:8908/v1 EMBEDDING_BASE_URL=http://127.0.0.1:8908/v1 python main.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+# === 1️⃣ 기본 설정 ===
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "seed": 0,
+    "model": "Qwen/Qwen3-30B-A3B-GPTQ-Int4",
+    # 첫 토큰까지 지연 (초)
+    "ttft": {"dist": "lognormal", "mean": 0.3, "sigma": 0.25},
+    # 디코딩 속도 (토큰/초)
+    "tokens_per_s": 60.0,
+    # 임베딩 요청 지연 (초, 입력 1건당)
+    "embedding_latency": {"dist": "fixed", "value": 0.005},
+    "embedding_dim": 2560,
+    # 보고서 등 장문 응답의 최대 토큰 수 (max_tokens와 min 적용)
+    "long_answer_tokens": 2500,
+    # 섹션 병렬 보고서(REPORT_MODE=section)의 섹션당 최대 토큰 수 (max_tokens와 min 적용)
+    "section_tokens": 500,
+    # 스크립트 응답: 위에서부터 첫 매칭 규칙 사용 (pattern은 system+user 전체 텍스트 대상)
+    # response가 리스트면 매칭 횟수에 따라 순환
+    "script": [],
+}
+
+# 그래프 노드별 기본 응답 (채점기는 모두 통과시키는 결정적 판정)
+BUILTIN_SCRIPT: List[Dict[str, Any]] = [
+    {"pattern": r"보고서 품질 평가자", "response": '{"verdict": "adequate", "sections": []}'},
+    # 섹션 병렬 보고서 (RAG 결과에 '사고 개요'가 들어 있으므로 아래 규칙보다 먼저 매칭)
+    {"pattern": r"보고서 목차 설계자", "response": (
+        '{"sections": [{"index": 1, "points": ["작업 중 안전조치 미흡으로 사고 발생"]}, '
+        '{"index": 2, "points": ["작업발판 및 안전난간 미설치", "작업 전 위험성 평가 미실시"]}, '
+        '{"index": 3, "points": ["작업 중지 및 안전시설 보강"]}, '
+        '{"index": 4, "points": ["관리감독자 배치 및 안전교육 실시"]}]}'
+    )},
+    {"pattern": r"보고서 일관성 검토자", "response": '{"replacements": []}'},
+    {"pattern": r"보고서의 한 섹션을", "response": "__SECTION__"},
+    {"pattern": r"binary_score", "response": '{"binary_score": "yes"}'},
+    {"pattern": r"검색 쿼리 리라이터", "response": "__REWRITE__"},
+    {"pattern": r"재발 방지 보고서를 전문적으로", "response": "__REPORT__"},
+    {"pattern": r"사고 개요", "response": (
+        "**사고 개요**:\n- 작업 중 안전조치 미흡으로 사고가 발생함 [#1]\n\n"
+        "**위험 요인**:\n- 작업발판 및 안전난간 미설치 [#1]\n- 작업 전 위험성 평가 미실시 [#2]\n\n"
+        "**즉시 조치**:\n- 작업 중지 및 안전시설 보강 [#1]\n- 관리감독자 배치 및 안전교육 실시 [#2]"
+    )},
+]
+
+
+# === 2️⃣ 결정적 난수/토큰 유틸 ===
+def _seed_of(*parts: Any) -> int:
+    h = hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode("utf-8"))
+    return int.from_bytes(h.digest()[:8], "big")
+
+
+def sample_latency(spec: Dict[str, Any], rng: random.Random) -> float:
+    """fixed / uniform / normal / lognormal 분포에서 지연 시간 샘플"""
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        v = spec.get("value", 0.0)
+    elif dist == "uniform":
+        v = rng.uniform(spec.get("low", 0.0), spec.get("high", 0.0))
+    elif dist == "normal":
+        v = rng.gauss(spec.get("mean", 0.0), spec.get("std", 0.0))
+    elif dist == "lognormal":
+        # mean은 실제 평균(초) 기준으로 해석
+        sigma = spec.get("sigma", 0.25)
+        mu = math.log(max(spec.get("mean", 0.1), 1e-6)) - sigma ** 2 / 2
+        v = rng.lognormvariate(mu, sigma)
+    else:
+        raise ValueError(f"알 수 없는 지연 분포: {dist}")
+    return max(0.0, float(v))
+
+
+def count_tokens(text: str) -> int:
+    """대략적인 토큰 수 (한글 기준 약 2자/토큰)"""
+    return max(1, len(text) // 2)
+
+
+def split_tokens(text: str) -> List[str]:
+    """스트리밍용 토큰 조각 (2자 단위)"""
+    return [text[i:i + 2] for i in range(0, len(text), 2)] or [""]
+
+
+def hash_embedding(item: Any, dim: int) -> List[float]:
+    """입력(텍스트 또는 토큰 id 리스트) 해시로 시드한 단위 벡터"""
+    rng = random.Random(_seed_of(item))
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+# === 3️⃣ 응답 생성 ===
+class MockBackend:
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.rng = random.Random(self.config["seed"])
+        self.script = [
+            {**rule, "_re": re.compile(rule["pattern"], re.S)}
+            for rule in list(self.config.get("script", [])) + BUILTIN_SCRIPT
+        ]
+        self.hits: Dict[int, int] = {}
+        self.lock = threading.Lock()
+        self.stats = {"chat": 0, "embeddings": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _latency(self, spec: Dict[str, Any]) -> float:
+        with self.lock:
+            return sample_latency(spec, self.rng)
+
+    def reply(self, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        user = str(messages[-1].get("content", "")) if messages else ""
+
+        for i, rule in enumerate(self.script):
+            if not rule["_re"].search(text):
+                continue
+            with self.lock:
+                n = self.hits.get(i, 0)
+                self.hits[i] = n + 1
+            resp = rule["response"]
+            if isinstance(resp, list):
+                resp = resp[n % len(resp)]
+            if resp == "__REWRITE__":
+                return self._rewrite(user)
+            if resp == "__REPORT__":
+                return self._long_text(text, max_tokens)
+            if resp == "__SECTION__":
+                return self._long_text(text, min(max_tokens, self.config["section_tokens"]), sections=["본문"])
+            return resp
+
+        return self._long_text(text, min(max_tokens, 200))
+
+    @staticmethod
+    def _rewrite(user: str) -> str:
+        q = re.sub(r"^입력:\s*|\s*출력:\s*$", "", user.strip())
+        q = re.sub(r"[?？'\"]|(인가요|입니까|했습니다|하였습니다)", "", q)
+        return re.sub(r"\s+", " ", q).strip()[:120] or "건설 현장 안전조치"
+
+    def _long_text(self, prompt: str, max_tokens: int, sections: Optional[List[str]] = None) -> str:
+        """프롬프트 해시 기반 결정적 장문 (보고서 스탠드인, sections로 소제목 지정)"""
+        n_tokens = min(max_tokens, self.config["long_answer_tokens"])
+        rng = random.Random(_seed_of(prompt, self.config["seed"]))
+        vocab = ["안전", "작업", "관리", "점검", "추락", "방지", "조치", "교육", "장비", "현장",
+                 "기준", "설치", "확인", "위험", "요인", "대책", "보호구", "감독", "계획", "개선"]
+        sections = sections or ["1. 사고 개요", "2. 사고 원인 분석", "3. 재발 방지 대책", "4. 관련 법규 및 기준", "5. 결론"]
+        per_section = max(1, n_tokens // len(sections))
+        out = []
+        for title in sections:
+            words = [rng.choice(vocab) for _ in range(per_section)]
+            out.append(f"## {title}\n" + " ".join(words) + ".")
+        return "\n\n".join(out)
+
+
+def _usage(prompt_text: str, completion: str) -> Dict[str, int]:
+    p, c = count_tokens(prompt_text), count_tokens(completion)
+    return {"prompt_tokens": p, "completion_tokens": c, "total_tokens": p + c}
+
+
+# === 4️⃣ HTTP 핸들러 ===
+def make_app(config: Optional[Dict[str, Any]] = None) -> web.Application:
+    backend = MockBackend(config)
+    app = web.Application()
+    app["backend"] = backend
+
+    async def models(request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": backend.config["model"], "object": "model"}]})
+
+    async def chat(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages = body.get("messages", [])
+        max_tokens = int(body.get("max_tokens") or 2000)
+        completion = backend.reply(messages, max_tokens)
+        prompt_text = "\n".join(str(m.get("content", "")) for m in messages)
+        usage = _usage(prompt_text, completion)
+        model = body.get("model") or backend.config["model"]
+        rid = f"chatcmpl-{_seed_of(prompt_text) % 10**12}"
+
+        with backend.lock:
+            backend.stats["chat"] += 1
+            backend.stats["prompt_tokens"] += usage["prompt_tokens"]
+            backend.stats["completion_tokens"] += usage["completion_tokens"]
+
+        ttft = backend._latency(backend.config["ttft"])
+        per_token = 1.0 / max(backend.config["tokens_per_s"], 1e-6)
+        await asyncio.sleep(ttft)
+
+        if not body.get("stream"):
+            await asyncio.sleep(per_token * usage["completion_tokens"])
+            return web.json_response({
+                "id": rid,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": completion},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+
+        def _chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> bytes:
+            data = {"id": rid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        await resp.write(_chunk({"role": "assistant"}))
+        for piece in split_tokens(completion):
+            await resp.write(_chunk({"content": piece}))
+            await asyncio.sleep(per_token)
+        await resp.write(_chunk({}, "stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            data = {"id": rid, "object": "chat.completion.chunk", "model": model, "choices": [], "usage": usage}
+            await resp.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def embeddings(request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body.get("input", [])
+        # 단일 문자열 / 단일 토큰 리스트도 허용
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = int(body.get("dimensions") or backend.config["embedding_dim"])
+
+        delay = sum(backend._latency(backend.config["embedding_latency"]) for _ in inputs)
+        await asyncio.sleep(delay)
+
+        data = [{"object": "embedding", "index": i, "embedding": hash_embedding(x, dim)} for i, x in enumerate(inputs)]
+        n_tokens = sum(len(x) if isinstance(x, list) else count_tokens(x) for x in inputs)
+        with backend.lock:
+            backend.stats["embeddings"] += len(inputs)
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "mock-embedding"),
+            "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens},
+        })
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(backend.stats)
+
+    app.router.add_get("/v1/models", models)
+    app.router.add_post("/v1/chat/completions", chat)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def start_in_thread(config: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", port: int = 0) -> str:
+    """
+    벤치마크/부하 테스트용: 백그라운드 스레드에서 서버를 띄우고 base_url을 반환
+    (port=0이면 빈 포트 자동 선택)
+    """
+    ready = threading.Event()
+    holder: Dict[str, Any] = {}
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(make_app(config))
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        holder["port"] = runner.addresses[0][1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, name="mock-llm-server", daemon=True).start()
+    ready.wait()
+    return f"http://{host}:{holder['port']}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스탠드인 LLM/임베딩 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8908)
+    parser.add_argument("--config", default=None, help="지연 분포/스크립트 설정 JSON")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.seed is not None:
+        config["seed"] = args.seed
+
+    print(f"🧪 Mock LLM 서버 시작: http://{args.host}:{args.port}/v1")
+    web.run_app(make_app(config), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# bench/retrieval_bench.py
+"""
+검색 성능/품질 벤치마크 (data/retrieval_results.csv 재생)
+
+- 설정별로 기록된 질의를 다시 검색하고 단계별 지연(p50/p95/p99)과 처리량 측정
+    dense          임베딩 → FAISS(flat)
+    bm25           BM25
+    hybrid         dense + BM25 → RRF (EnsembleRetriever와 동일 가중치)
+    hybrid+rerank  hybrid 후보 → Cross-Encoder 재정렬 (그래프 기본 경로)
+    ann-hnsw       임베딩 → FAISS HNSW (flat 인덱스 벡터로 구성)
+    ann-ivf        임베딩 → FAISS IVF-Flat
+- 정답: CSV의 snippets(검색 당시 상위 청크 본문 앞부분)와 본문이 일치하는 docstore 청크
+  (sources가 'unknown'으로만 기록돼 있어 본문 기준으로 매칭)
+- recall@k / MRR / nDCG@k 를 (질의 × 순위) 관련도 행렬로 한 번에 계산
+- --baseline 과 비교해 품질 하락/지연 증가가 허용치를 넘으면 회귀로 표시 (종료 코드 1)
+
+실행 예:
+    python -m bench.retrieval_bench --repeat 3 --output results/retrieval_bench.json
+    python -m bench.retrieval_bench --baseline bench/retrieval_baseline.json
+    python -m bench.retrieval_bench --save-baseline bench/retrieval_baseline.json
+"""
+import argparse
+import ast
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_QUERIES = os.path.join(ROOT, "data", "retrieval_results.csv")
+CONFIGS = ("dense", "bm25", "hybrid", "hybrid+rerank", "ann-hnsw", "ann-ivf")
+CUTOFFS = (1, 3, 5, 8)
+SNIPPET_MATCH_CHARS = 60
+
+# 회귀 판정 허용치
+QUALITY_TOLERANCE = 0.02   # recall/MRR/nDCG 절대값 하락
+LATENCY_TOLERANCE = 1.25   # p95 지연 배수
+LATENCY_FLOOR_MS = 1.0     # 이보다 작은 지연 차이는 측정 잡음으로 간주
+
+
+# === 1️⃣ 질의/정답 로드 ===
+_NON_WORD = re.compile(r"[^0-9A-Za-z가-힣]+")
+
+
+def _normalize(text: str) -> str:
+    """공백/기호를 모두 제거 (snippets는 기호가 제거된 상태로 기록됨)"""
+    return _NON_WORD.sub("", text or "")
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    queries = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                snippets = ast.literal_eval(row.get("snippets") or "[]")
+            except (ValueError, SyntaxError):
+                snippets = []
+            queries.append({"id": row["global_idx"], "query": row["query_text"], "snippets": snippets})
+    return queries
+
+
+def relevant_ids(queries: List[Dict[str, Any]], docstore) -> List[Set[str]]:
+    """snippet 앞부분이 본문에 포함된 청크 id 집합 (질의별)"""
+    chunks = [(doc_id, _normalize(doc.page_content)) for doc_id, doc in docstore._dict.items()]
+    rel = []
+    for q in queries:
+        keys = {_normalize(s)[:SNIPPET_MATCH_CHARS] for s in q["snippets"]}
+        keys.discard("")
+        rel.append({doc_id for doc_id, text in chunks if any(k in text for k in keys)})
+    return rel
+
+
+# === 2️⃣ 품질 지표 (질의 × 순위 관련도 행렬) ===
+def quality_metrics(ranked: List[List[str]], relevant: List[Set[str]], cutoffs: Sequence[int] = CUTOFFS) -> Dict[str, Any]:
+    depth = max(cutoffs)
+    mask = np.array([len(r) > 0 for r in relevant])
+    if not mask.any():
+        return {"judged_queries": 0}
+
+    rel = np.zeros((len(ranked), depth), dtype=np.float64)
+    for i, (ids, gold) in enumerate(zip(ranked, relevant)):
+        hits = [doc_id in gold for doc_id in ids[:depth]]
+        rel[i, : len(hits)] = hits
+    rel = rel[mask]
+    n_rel = np.array([len(r) for r in relevant])[mask]
+
+    ranks = np.arange(1, depth + 1)
+    discount = 1.0 / np.log2(ranks + 1)
+    any_hit = rel.any(axis=1)
+    first_hit = np.where(any_hit, rel.argmax(axis=1) + 1, np.inf)
+
+    out: Dict[str, Any] = {"judged_queries": int(mask.sum()), "mrr": float(np.mean(1.0 / first_hit))}
+    for k in cutoffs:
+        hits_k = rel[:, :k].sum(axis=1)
+        dcg = (rel[:, :k] * discount[:k]).sum(axis=1)
+        ideal = np.array([discount[: min(n, k)].sum() for n in n_rel])
+        out[f"recall@{k}"] = float(np.mean(hits_k / np.minimum(n_rel, k)))
+        out[f"ndcg@{k}"] = float(np.mean(dcg / ideal))
+    return out
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3), "mean_ms": round(float(arr.mean()), 3), "n": int(arr.size)}
+
+
+# === 3️⃣ 검색 설정 ===
+class _Timer:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def __call__(self, stage: str, fn: Callable, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - t0
+        return out
+
+
+class RetrievalBench:
+    def __init__(self, retriever, hnsw_m: int = 32, ef_search: int = 64, ivf_nprobe: int = 8):
+        self.r = retriever
+        self.db = retriever.content_db
+        self.k = retriever.top_k
+        self.ann: Dict[str, Any] = {}
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.ivf_nprobe = ivf_nprobe
+
+    def build_ann(self, configs: Sequence[str]) -> Dict[str, float]:
+        """flat 인덱스 벡터로 ANN 인덱스 구성 (구성 시간 반환)"""
+        import faiss
+
+        build_s = {}
+        flat = self.db.index
+        xb = flat.reconstruct_n(0, flat.ntotal).astype(np.float32)
+        dim = xb.shape[1]
+        if "ann-hnsw" in configs:
+            t0 = time.perf_counter()
+            index = faiss.IndexHNSWFlat(dim, self.hnsw_m, flat.metric_type)
+            index.hnsw.efSearch = self.ef_search
+            index.add(xb)
+            self.ann["ann-hnsw"] = index
+            build_s["ann-hnsw"] = time.perf_counter() - t0
+        if "ann-ivf" in configs:
+            t0 = time.perf_counter()
+            nlist = max(1, min(int(4 * np.sqrt(len(xb))), len(xb) // 39))
+            quantizer = faiss.IndexFlat(dim, flat.metric_type)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, flat.metric_type)
+            index.train(xb)
+            index.add(xb)
+            index.nprobe = min(self.ivf_nprobe, nlist)
+            self.ann["ann-ivf"] = (index, quantizer)
+            build_s["ann-ivf"] = time.perf_counter() - t0
+        return {k: round(v, 3) for k, v in build_s.items()}
+
+    def _dense(self, t: _Timer, query: str) -> List:
+        vec = t("embedding", self.db.embedding_function.embed_query, query)
+        return t("faiss", self.db.similarity_search_by_vector, vec, k=self.k)
+
+    def _ann(self, t: _Timer, name: str, query: str) -> List[str]:
+        index = self.ann[name]
+        index = index[0] if isinstance(index, tuple) else index
+        vec = t("embedding", self.db.embedding_function.embed_query, query)
+        xq = np.asarray([vec], dtype=np.float32)
+        _, pos = t(name.split("-", 1)[1], index.search, xq, self.k)
+        return [self.db.index_to_docstore_id[p] for p in pos[0] if p >= 0]
+
+    def _hybrid(self, t: _Timer, query: str) -> List:
+        dense = self._dense(t, query)
+        sparse = t("bm25", self.r.sparse_retriever.invoke, query)
+        return t("fusion", self.r.hybrid_retriever.weighted_reciprocal_rank, [sparse, dense])
+
+    def run_one(self, config: str, query: str) -> Tuple[List[str], Dict[str, float]]:
+        t = _Timer()
+        t0 = time.perf_counter()
+        if config == "dense":
+            ids = [d.id for d in self._dense(t, query)]
+        elif config == "bm25":
+            ids = [d.id for d in t("bm25", self.r.sparse_retriever.invoke, query)]
+        elif config == "hybrid":
+            ids = [d.id for d in self._hybrid(t, query)]
+        elif config == "hybrid+rerank":
+            docs = self._hybrid(t, query)
+            ids = [d.id for d in t("rerank", self.r.rerank, query, docs)]
+        elif config in self.ann:
+            ids = self._ann(t, config, query)
+        else:
+            raise ValueError(f"unknown config: {config}")
+        t.stages["total"] = time.perf_counter() - t0
+        return ids, t.stages
+
+    def run(self, config: str, queries: List[str], repeat: int = 1, concurrency: int = 1) -> Dict[str, Any]:
+        stages: Dict[str, List[float]] = defaultdict(list)
+        ranked: List[List[str]] = []
+
+        def _one(q):
+            return self.run_one(config, q)
+
+        t0 = time.perf_counter()
+        for rnd in range(repeat):
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(_one, queries))
+            for ids, st in results:
+                for name, sec in st.items():
+                    stages[name].append(sec)
+            if rnd == 0:
+                ranked = [ids for ids, _ in results]
+        wall = time.perf_counter() - t0
+
+        return {
+            "ranked": ranked,
+            "latency": {name: latency_summary(v) for name, v in stages.items()},
+            "throughput_qps": round(len(queries) * repeat / wall, 3) if wall > 0 else None,
+        }
+
+
+# === 4️⃣ 기준선 비교 ===
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            quality_tol: float = QUALITY_TOLERANCE, latency_tol: float = LATENCY_TOLERANCE) -> List[str]:
+    regressions = []
+    for config, cur in current["configs"].items():
+        base = baseline.get("configs", {}).get(config)
+        if not base:
+            continue
+        for metric, value in cur["quality"].items():
+            ref = base["quality"].get(metric)
+            if metric == "judged_queries" or ref is None:
+                continue
+            if value < ref - quality_tol:
+                regressions.append(f"{config} {metric}: {ref:.3f} → {value:.3f}")
+        for stage, lat in cur["latency"].items():
+            ref = base["latency"].get(stage, {}).get("p95_ms")
+            if ref and lat["p95_ms"] > ref * latency_tol and lat["p95_ms"] - ref > LATENCY_FLOOR_MS:
+                regressions.append(f"{config} {stage} p95: {ref:.1f}ms → {lat['p95_ms']:.1f}ms")
+    return regressions
+
+
+def run_bench(retriever, query_path: str = DEFAULT_QUERIES, configs: Sequence[str] = CONFIGS,
+              repeat: int = 3, concurrency: int = 1, warmup: int = 1) -> Dict[str, Any]:
+    queries = load_queries(query_path)
+    texts = [q["query"] for q in queries]
+    relevant = relevant_ids(queries, retriever.docstore)
+    bench = RetrievalBench(retriever)
+
+    build_s = {}
+    ann_configs = [c for c in configs if c.startswith("ann-")]
+    if ann_configs:
+        try:
+            build_s = bench.build_ann(ann_configs)
+        except ImportError:
+            print("⚠️ faiss 모듈이 없어 ANN 설정을 건너뜁니다.")
+            configs = [c for c in configs if not c.startswith("ann-")]
+
+    report: Dict[str, Any] = {
+        "queries": len(queries),
+        "judged_queries": sum(1 for r in relevant if r),
+        "top_k": retriever.top_k,
+        "repeat": repeat,
+        "concurrency": concurrency,
+        "ann_build_s": build_s,
+        "configs": {},
+    }
+    for config in configs:
+        if warmup:
+            bench.run(config, texts[:warmup])
+        res = bench.run(config, texts, repeat=repeat, concurrency=concurrency)
+        report["configs"][config] = {
+            "quality": quality_metrics(res["ranked"], relevant),
+            "latency": res["latency"],
+            "throughput_qps": res["throughput_qps"],
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n📊 검색 벤치마크: 질의 {report['queries']}건 (정답 매칭 {report['judged_queries']}건), "
+          f"top_k={report['top_k']}, 반복 {report['repeat']}회, 동시 {report['concurrency']}")
+    print(f"{'config':<15} {'recall@5':>9} {'mrr':>7} {'ndcg@5':>7} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'qps':>8}")
+    for config, res in report["configs"].items():
+        q, lat = res["quality"], res["latency"]["total"]
+        print(
+            f"{config:<15} {q.get('recall@5', float('nan')):>9.3f} {q.get('mrr', float('nan')):>7.3f} "
+            f"{q.get('ndcg@5', float('nan')):>7.3f} {lat['p50_ms']:>9.2f} {lat['p95_ms']:>9.2f} "
+            f"{lat['p99_ms']:>9.2f} {res['throughput_qps']:>8.2f}"
+        )
+        stages = ", ".join(f"{s} {v['p50_ms']:.1f}ms" for s, v in res["latency"].items() if s != "total")
+        print(f"{'':<15} └ {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 성능/품질 벤치마크")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES)
+    parser.add_argument("--db", default=None, help="FAISS DB 경로 (미지정 시 core.retriever의 기본 인스턴스)")
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    parser.add_argument("--baseline", default=None, help="비교할 기준선 JSON")
+    parser.add_argument("--save-baseline", default=None, help="이번 결과를 기준선으로 저장")
+    args = parser.parse_args()
+
+    if args.db:
+        from core.retriever import RerankRetriever
+        retriever = RerankRetriever(faiss_db_path=args.db, top_k=8)
+    else:
+        from core.retriever import retriever_instance as retriever
+
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    report = run_bench(retriever, args.queries, configs, repeat=args.repeat, concurrency=args.concurrency)
+    print_report(report)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 저장: {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline)
+        if regressions:
+            print("\n❌ 기준선 대비 회귀:")
+            for r in regressions:
+                print(f"  - {r}")
+            sys.exit(1)
+        print("\n✅ 기준선 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,43 @@
+import os
 from typing import Annotated, Sequence, TypedDict, Any
 from typing_extensions import NotRequired
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 from langchain.schema import Document  # 문서 컨테이너
 
+
+# 대화 이력 상한 (첫 질문 + 최근 N-1개만 유지, 0이면 무제한, 1이면 2로 취급 — 최신 답변은 항상 유지)
+MAX_MESSAGES = int(os.environ.get("STATE_MAX_MESSAGES", 6))
+
+
+def add_messages_capped(left, right):
+    """add_messages 후 오래된 중간 메시지 제거 (질문은 messages[0], 최신 답변은 messages[-1]로 계속 접근 가능)"""
+    merged = add_messages(left, right)
+    cap = max(2, MAX_MESSAGES) if MAX_MESSAGES > 0 else 0
+    if cap and len(merged) > cap:
+        merged = [merged[0]] + merged[-(cap - 1):]
+    return merged
+
+
 class AgentState(TypedDict):
     """
     전체 LangGraph 실행 동안 공유되는 Agent의 상태 정의
     """
 
-    # 1️⃣ 대화 이력: 그래프 전체에서 계속 누적
-    messages: Annotated[Sequence[BaseMessage], add_messages]
+    # 1️⃣ 대화 이력: 질문 + 최근 메시지만 유지 (STATE_MAX_MESSAGES)
+    messages: Annotated[Sequence[BaseMessage], add_messages_capped]
 
     # 2️⃣ 질의/의도 파싱 결과
     query: NotRequired[str]                 # 최종 검색용 쿼리
     intent: NotRequired[str]                # 예: "lookup", "reason", "summarize"
 
-    # 3️⃣ 검색 단계 산출물
-    retrieved: NotRequired[list[Document]]  # 원본 검색 결과
-    selected: NotRequired[list[Document]]   # 재랭크/필터 후 컨텍스트로 쓸 하위셋
+    # 3️⃣ 검색 단계 산출물 (본문은 core/chunk_store.py에서 id로 조회)
+    retrieved_ids: NotRequired[list[str]]   # 원본 검색 결과 청크 id
+    selected_ids: NotRequired[list[str]]    # 재랭크/필터 후 컨텍스트로 쓸 하위셋 청크 id
+    web_docs: NotRequired[dict[str, Document]]  # 웹 검색 결과 (id → Document, 코퍼스에 없는 문서)
     sources: NotRequired[list[dict[str, Any]]]  # 간단한 출처 요약 (filename, page, idx 등)
+    retrieval_pool: NotRequired[dict[str, float]]  # rewrite 루프 간 누적 후보 (청크 id → rerank 점수)
+    retrieval_pool_query: NotRequired[str]  # retrieval_pool 점수를 계산한 쿼리
 
     # 4️⃣ 생성/검증 단계 산출물
     draft: NotRequired[str]                 # 1차 초안(검증 전)
@@ -29,6 +47,8 @@ class AgentState(TypedDict):
 
     # 5️⃣ 최종 보고서 단계
     report: NotRequired[str]                # ✅ final_report.py에서 생성된 보고서 텍스트
+    report_review: NotRequired[dict[str, Any]]  # 보고서 채점 결과 {"verdict", "sections": [{index, title, verdict, reason}]}
+    report_repairs: NotRequired[int]        # 섹션 보강(repair_report) 횟수
 
     # 6️⃣ 툴 상호작용/제어
     tool_calls: NotRequired[list[dict[str, Any]]] # 호출 내역/결과 로그
@@ -38,3 +58,7 @@ class AgentState(TypedDict):
     # 7️⃣ 루프 제어 변수
     retries: int                 # generate/rewrite 루프 카운트
     web_fallback: bool           # 웹 보강을 시도할지 플래그
+
+    # 8️⃣ 예산/사용량 (core/budget.py)
+    budget: NotRequired[dict[str, Any]]   # run_id, deadline, max_llm_calls, max_prompt/completion_tokens
+    usage: NotRequired[dict[str, Any]]    # 노드별 LLM 호출 수/토큰/시간 누적 {"nodes": {...}, "total": {...}}
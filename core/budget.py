@@ -0,0 +1,184 @@
+# core/budget.py
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+
+# === 요청(run) 단위 예산 기본값 (환경 변수, 미설정 시 무제한) ===
+def _env_num(name: str, cast=float) -> Optional[float]:
+    v = os.environ.get(name)
+    return cast(v) if v not in (None, "") else None
+
+
+DEFAULT_DEADLINE_S = _env_num("BUDGET_DEADLINE_S")
+DEFAULT_MAX_LLM_CALLS = _env_num("BUDGET_MAX_LLM_CALLS", int)
+DEFAULT_MAX_PROMPT_TOKENS = _env_num("BUDGET_MAX_PROMPT_TOKENS", int)
+DEFAULT_MAX_COMPLETION_TOKENS = _env_num("BUDGET_MAX_COMPLETION_TOKENS", int)
+
+# 현재 실행 중인 run / 노드 (call_llm이 사용량을 어디에 기록할지 결정)
+_current_run: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("budget_run", default=None)
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("budget_node", default=None)
+
+_USAGE_KEYS = ("llm_calls", "prompt_tokens", "completion_tokens", "llm_seconds")
+
+
+def new_budget(
+    deadline_s: Optional[float] = DEFAULT_DEADLINE_S,
+    max_llm_calls: Optional[int] = DEFAULT_MAX_LLM_CALLS,
+    max_prompt_tokens: Optional[int] = DEFAULT_MAX_PROMPT_TOKENS,
+    max_completion_tokens: Optional[int] = DEFAULT_MAX_COMPLETION_TOKENS,
+) -> Dict[str, Any]:
+    """요청 1건의 예산 (None 항목은 제한 없음)"""
+    return {
+        "run_id": uuid.uuid4().hex,
+        "deadline": time.time() + deadline_s if deadline_s else None,
+        "max_llm_calls": max_llm_calls,
+        "max_prompt_tokens": max_prompt_tokens,
+        "max_completion_tokens": max_completion_tokens,
+    }
+
+
+# === 사용량 장부 (run_id → 노드별 누적) ===
+# 라우팅 함수(conditional edge)는 state를 갱신할 수 없으므로 프로세스 공용 장부에 기록하고,
+# 노드가 끝날 때마다 스냅샷을 state["usage"]로 내보낸다.
+class _Ledger:
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def seed(self, run_id: str, usage: Optional[Dict[str, Any]]):
+        """체크포인트에서 재개한 경우 이전 사용량으로 장부 복원"""
+        with self._lock:
+            if run_id in self._runs or not usage:
+                return
+            self._runs[run_id] = {n: dict(v) for n, v in (usage.get("nodes") or {}).items()}
+
+    def add(self, run_id: str, node: str, **delta: float):
+        with self._lock:
+            nodes = self._runs.setdefault(run_id, {})
+            row = nodes.setdefault(node, {k: 0 for k in _USAGE_KEYS})
+            for k, v in delta.items():
+                row[k] = row.get(k, 0) + v
+
+    def snapshot(self, run_id: str) -> Dict[str, Any]:
+        with self._lock:
+            nodes = {n: dict(v) for n, v in self._runs.get(run_id, {}).items()}
+        total = {k: sum(v.get(k, 0) for v in nodes.values()) for k in _USAGE_KEYS}
+        total["llm_seconds"] = round(total["llm_seconds"], 3)
+        for v in nodes.values():
+            v["llm_seconds"] = round(v.get("llm_seconds", 0), 3)
+        return {"nodes": nodes, "total": total}
+
+    def pop(self, run_id: str) -> Dict[str, Any]:
+        snap = self.snapshot(run_id)
+        with self._lock:
+            self._runs.pop(run_id, None)
+        return snap
+
+
+LEDGER = _Ledger()
+
+
+def record_llm_call(usage: Optional[Dict[str, Any]], seconds: float, node: Optional[str] = None):
+    """call_llm 1회 결과 기록 (OpenAI 응답의 usage 필드 사용)"""
+    run_id = _current_run.get()
+    if run_id is None:
+        return
+    usage = usage or {}
+    LEDGER.add(
+        run_id,
+        node or _current_node.get() or "unknown",
+        llm_calls=1,
+        prompt_tokens=int(usage.get("prompt_tokens") or 0),
+        completion_tokens=int(usage.get("completion_tokens") or 0),
+        llm_seconds=seconds,
+    )
+
+
+def usage_of(state: Dict[str, Any]) -> Dict[str, Any]:
+    """현재까지의 노드별 사용량 (라우팅 함수 호출분 포함)"""
+    budget = state.get("budget") or {}
+    if "run_id" not in budget:
+        return state.get("usage") or {}
+    return LEDGER.snapshot(budget["run_id"])
+
+
+def release(state: Dict[str, Any]) -> Dict[str, Any]:
+    """실행 종료 후 장부에서 제거하고 최종 사용량 반환"""
+    budget = state.get("budget") or {}
+    if "run_id" not in budget:
+        return state.get("usage") or {}
+    return LEDGER.pop(budget["run_id"])
+
+
+def budget_exhausted(state: Dict[str, Any]) -> Optional[str]:
+    """예산 초과 사유 (초과하지 않았으면 None)"""
+    budget = state.get("budget")
+    if not budget:
+        return None
+    if budget.get("deadline") and time.time() >= budget["deadline"]:
+        return "deadline"
+    total = usage_of(state).get("total") or {}
+    limits = {
+        "max_llm_calls": "llm_calls",
+        "max_prompt_tokens": "prompt_tokens",
+        "max_completion_tokens": "completion_tokens",
+    }
+    for limit_key, usage_key in limits.items():
+        limit = budget.get(limit_key)
+        if limit is not None and total.get(usage_key, 0) >= limit:
+            return limit_key
+    return None
+
+
+# === 노드/라우팅 함수 래퍼 ===
+def _enter(name: str, state: Dict[str, Any]):
+    budget = state.get("budget") or {}
+    run_id = budget.get("run_id")
+    if run_id:
+        LEDGER.seed(run_id, state.get("usage"))
+    return _current_run.set(run_id), _current_node.set(name)
+
+
+def _exit(tokens):
+    _current_run.reset(tokens[0])
+    _current_node.reset(tokens[1])
+
+
+def tracked(name: str, fn: Callable) -> Callable:
+    """노드 실행 중 LLM 사용량을 run에 귀속시키고, 결과에 usage 스냅샷을 포함"""
+    @functools.wraps(fn)
+    def wrapper(state):
+        tokens = _enter(name, state)
+        try:
+            result = fn(state)
+        finally:
+            _exit(tokens)
+        if isinstance(result, dict) and (state.get("budget") or {}).get("run_id"):
+            result["usage"] = usage_of(state)
+        return result
+
+    return wrapper
+
+
+def tracked_route(name: str, fn: Callable) -> Callable:
+    """라우팅 함수용 래퍼 (state 갱신 없이 장부에만 기록)"""
+    @functools.wraps(fn)
+    def wrapper(state):
+        tokens = _enter(name, state)
+        try:
+            return fn(state)
+        finally:
+            _exit(tokens)
+
+    return wrapper
+
+
+def submit_with_context(pool, fn: Callable, *args, **kwargs):
+    """ThreadPoolExecutor에 현재 run/노드 컨텍스트를 유지한 채 제출"""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
@@ -0,0 +1,152 @@
+# core/checkpoint.py
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from langgraph.checkpoint.base.id import UUID
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+# === 체크포인트 DB 경로 (없으면 기본값) ===
+CHECKPOINT_DB = os.environ.get(
+    "CHECKPOINT_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "checkpoints", "graph.sqlite"),
+)
+
+# uuid6 타임스탬프(1582-10-15 기준 100ns 단위) → Unix epoch 보정값
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def open_checkpointer(path: Optional[str] = None) -> SqliteSaver:
+    """
+    SQLite 기반 LangGraph checkpointer 생성
+    - 배치/서비스의 여러 스레드에서 공유하므로 check_same_thread=False (SqliteSaver 내부 lock 사용)
+    """
+    path = path or CHECKPOINT_DB
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    saver = SqliteSaver(conn)
+    saver.setup()
+    return saver
+
+
+def thread_config(case_id: str, **configurable: Any) -> Dict[str, Any]:
+    """사례별 thread_id 설정"""
+    return {"configurable": {"thread_id": str(case_id), **configurable}}
+
+
+def resume_input(app, init_state: Dict[str, Any], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    그래프 입력 결정
+    - 같은 thread_id로 중단된 실행이 있으면 None (마지막 완료 노드 다음부터 재개)
+    - 없거나 이미 끝난 실행이면 초기 상태로 새로 시작
+    """
+    snapshot = app.get_state(config)
+    if snapshot.values and snapshot.next:
+        print(f"♻️ 체크포인트에서 재개: thread={config['configurable']['thread_id']} → {list(snapshot.next)}")
+        return None
+    if snapshot.values:
+        # 이미 끝난 스레드를 다시 실행하면 이전 messages가 누적되므로 비우고 시작
+        app.checkpointer.delete_thread(config["configurable"]["thread_id"])
+    return init_state
+
+
+def invoke_resumable(app, init_state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """체크포인트가 있으면 이어서, 없으면 처음부터 실행"""
+    return app.invoke(resume_input(app, init_state, config), config)
+
+
+def _checkpoint_time(checkpoint_id: str) -> float:
+    """checkpoint_id(uuid6)에 포함된 생성 시각 (Unix time)"""
+    try:
+        return (UUID(checkpoint_id).time - _UUID_EPOCH_OFFSET) / 1e7
+    except Exception:
+        return time.time()
+
+
+def delete_threads(saver: SqliteSaver, thread_ids: Iterable[str]):
+    """완료된 사례의 체크포인트 삭제 (결과는 별도 저장소에 이미 기록된 경우)"""
+    for tid in thread_ids:
+        saver.delete_thread(str(tid))
+
+
+def compact(
+    saver: SqliteSaver,
+    keep_last: int = 1,
+    max_age_days: Optional[float] = None,
+    vacuum: bool = True,
+) -> Dict[str, int]:
+    """
+    오래된 체크포인트 정리
+    - 스레드(namespace)별로 최근 keep_last개 체크포인트와 그 pending writes만 유지
+      (재개에는 마지막 체크포인트만 필요)
+    - max_age_days: 마지막 체크포인트가 이보다 오래된 스레드는 통째로 삭제
+    """
+    conn = saver.conn
+    stats = {"threads_dropped": 0, "checkpoints_deleted": 0, "writes_deleted": 0}
+
+    with saver.lock:
+        cur = conn.cursor()
+
+        # === 1️⃣ 오래된 스레드 삭제 ===
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            cur.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id")
+            stale = [tid for tid, last_id in cur.fetchall() if _checkpoint_time(last_id) < cutoff]
+            for tid in stale:
+                cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (tid,))
+                stats["checkpoints_deleted"] += cur.rowcount
+                cur.execute("DELETE FROM writes WHERE thread_id = ?", (tid,))
+                stats["writes_deleted"] += cur.rowcount
+            stats["threads_dropped"] = len(stale)
+
+        # === 2️⃣ 스레드별 최근 keep_last개만 유지 ===
+        cur.execute(
+            """
+            DELETE FROM checkpoints WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                    ) AS rn
+                    FROM checkpoints
+                ) WHERE rn > ?
+            )
+            """,
+            (max(1, keep_last),),
+        )
+        stats["checkpoints_deleted"] += cur.rowcount
+
+        # === 3️⃣ 남은 체크포인트에 속하지 않은 writes 삭제 ===
+        cur.execute(
+            """
+            DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id
+                  AND c.checkpoint_ns = writes.checkpoint_ns
+                  AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        )
+        stats["writes_deleted"] += cur.rowcount
+        conn.commit()
+
+        if vacuum:
+            conn.execute("VACUUM")
+
+    print(
+        f"🧹 체크포인트 정리: 스레드 {stats['threads_dropped']}개 삭제, "
+        f"체크포인트 {stats['checkpoints_deleted']}건, writes {stats['writes_deleted']}건 삭제"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LangGraph SQLite 체크포인트 정리")
+    parser.add_argument("--db", default=CHECKPOINT_DB)
+    parser.add_argument("--keep-last", type=int, default=1)
+    parser.add_argument("--max-age-days", type=float, default=None)
+    args = parser.parse_args()
+    compact(open_checkpointer(args.db), keep_last=args.keep_last, max_age_days=args.max_age_days)
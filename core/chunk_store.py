@@ -0,0 +1,81 @@
+# core/chunk_store.py
+"""
+청크 저장소 (프로세스 공용, 읽기 전용)
+
+- state에는 Document 대신 청크 id만 저장 (retrieved_ids / selected_ids)
+- 코퍼스 청크: RerankRetriever가 로드한 FAISS docstore (Document.id = docstore 키)
+- 웹 검색 결과: 실행마다 다르므로 state["web_docs"] (id → Document)에 보관해
+  체크포인트에서 재개해도 다시 찾을 수 있게 함
+- rerank 점수는 state["retrieval_pool"](id → 점수)에서 꺼내 사본의 metadata에 붙임
+"""
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain.schema import Document
+
+
+WEB_ID_PREFIX = "web:"
+
+
+class ChunkStore:
+    def __init__(self):
+        self._docstore = None
+        self._lock = threading.Lock()
+
+    def attach(self, docstore):
+        """코퍼스 docstore 등록 (RerankRetriever 초기화 시)"""
+        with self._lock:
+            self._docstore = docstore
+
+    def get(self, chunk_id: str) -> Optional[Document]:
+        if self._docstore is None:
+            return None
+        doc = self._docstore.search(chunk_id)
+        return doc if isinstance(doc, Document) else None
+
+    def get_many(self, ids: Iterable[str]) -> List[Document]:
+        docs = (self.get(i) for i in ids)
+        return [d for d in docs if d is not None]
+
+
+CHUNKS = ChunkStore()
+
+
+def with_score(doc: Document, score: Optional[float]) -> Document:
+    """점수를 metadata["rerank_score"]에 기록한 사본 (원본 docstore 객체는 건드리지 않음)"""
+    if score is None:
+        return doc
+    return Document(
+        id=doc.id,
+        page_content=doc.page_content,
+        metadata={**doc.metadata, "rerank_score": float(score)},
+    )
+
+
+def web_doc_id(doc: Document) -> str:
+    """웹 문서 id (본문 해시, 같은 내용이면 같은 id)"""
+    return WEB_ID_PREFIX + hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve(state: Dict[str, Any], key: str = "selected_ids") -> List[Document]:
+    """
+    state의 청크 id 목록 → Document 목록 (rerank 점수 포함 사본)
+    - key: "selected_ids" / "retrieved_ids"
+    - 이전 형식(state["selected"] / state["retrieved"]에 Document 저장) 체크포인트도 그대로 읽음
+    """
+    ids = state.get(key)
+    if ids is None:
+        legacy = key[: -len("_ids")]
+        return list(state.get(legacy) or [])
+
+    pool = state.get("retrieval_pool") or {}
+    web = state.get("web_docs") or {}
+    docs = []
+    for chunk_id in ids:
+        doc = web.get(chunk_id) or CHUNKS.get(chunk_id)
+        if doc is None:
+            print(f"⚠️ 청크를 찾을 수 없습니다: {chunk_id}")
+            continue
+        docs.append(with_score(doc, pool.get(chunk_id)))
+    return docs
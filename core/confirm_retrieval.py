@@ -1,35 +1,33 @@
 # core/confirm_retrieval.py
+import os
 import re
+from typing import Callable, Dict, List, Optional, Tuple
 from core.agentstate import AgentState
+from core.budget import budget_exhausted
+from core.chunk_store import resolve
+from core.text_render import display_text
 from langchain.schema import Document
-from bs4 import BeautifulSoup
-
-def _clean_html(text: str) -> str:
-    """HTML 태그 제거 및 줄바꿈 유지"""
-    soup = BeautifulSoup(text, "html.parser")
-    text = soup.get_text(separator="\n", strip=True)
-    return _prettify_text(text)
-
-def _prettify_text(text: str) -> str:
-    """표·기호 구조가 깨진 텍스트를 사람이 읽기 좋게 재정렬"""
-    text = re.sub(r"[\u2027•․·]+", "·", text)        # 중간점 통일
-    text = re.sub(r"\s+", " ", text)                 # 과도한 공백 제거
-    text = re.sub(r"(\.)([가-힣])", r"\1\n\2", text) # 문장 구분시 줄바꿈 추가
-    text = re.sub(r"(·\s*)", r"\n- ", text)          # · 기호를 리스트 형식으로 변환
-    text = re.sub(r"([가-힣])(\s*:\s*)", r"\1\n", text)
-    text = text.strip()
-    return text
-
-def confirm_retrieval(state: AgentState):
-    """
-    Human-in-the-loop 확인 단계 (CLI 버전)
-    - 검색 결과(청킹 데이터)를 사람이 검토하고 필요 시 제외할 수 있음
-    """
-    docs = state.get("retrieved", [])
-    if not docs:
-        print("\n  검색된 문서가 없습니다. 쿼리를 재작성합니다.")
-        return {"route": "rewrite"}
 
+# === 확인 정책 (CONFIRM_MODE 환경 변수 또는 build_graph(confirm_mode=...)로 선택) ===
+# 각 정책은 (state, docs) -> (accept: bool, excluded_indices: list[int]) 를 반환
+DEFAULT_CONFIRM_MODE = os.environ.get("CONFIRM_MODE", "interactive")
+
+# auto 정책 임계값 (bge-reranker 점수는 0~1)
+AUTO_ACCEPT_SCORE = float(os.environ.get("CONFIRM_ACCEPT_SCORE", 0.2))  # 최고 점수가 이보다 낮으면 rewrite
+AUTO_EXCLUDE_SCORE = float(os.environ.get("CONFIRM_EXCLUDE_SCORE", 0.05))  # 이보다 낮은 문서는 제외
+AUTO_MIN_DOCS = int(os.environ.get("CONFIRM_MIN_DOCS", 2))  # 제외 후에도 최소 유지할 문서 수
+AUTO_MAX_REJECTS = int(os.environ.get("CONFIRM_MAX_REJECTS", 2))  # rewrite 횟수가 이 이상이면 더 거부하지 않음
+
+
+def _score(doc: Document) -> Optional[float]:
+    try:
+        return float(doc.metadata["rerank_score"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _confirm_interactive(state: AgentState, docs: List[Document]) -> Tuple[bool, List[int]]:
+    """CLI에서 사람이 직접 yes/no 및 제외 문서를 입력"""
     print("\n🔍 === 검색 결과 미리보기 ===")
 
     # === 모든 검색 문서 표시 ===
@@ -38,7 +36,7 @@ def confirm_retrieval(state: AgentState):
         file = meta.get("source")
         section = meta.get("section")
 
-        clean_text = _clean_html(doc.page_content.strip())
+        clean_text = display_text(doc)  # 미리보기 렌더링 (core/text_render.py, 본문별 1회 계산)
 
         print(f"\n📄 [{i+1}] 문서 정보")
         print(f"   ┣ 파일명: {file}")
@@ -52,38 +50,129 @@ def confirm_retrieval(state: AgentState):
         if user_input in {"yes", "y", "예", "네"}:
             break
         elif user_input in {"no", "n", "아니오", "아님"}:
-            print("🔄 사용자가 검색 결과를 거부했습니다. 쿼리를 재작성합니다.")
-            return {"route": "rewrite"}
+            return False, []
         else:
             print("❗ 'yes' 또는 'no'로 입력해주세요.")
 
     # === 제외 문서 선택 ===
     exclude_input = input("\n제외할 문서 번호를 입력하세요 (쉼표 구분, 없으면 Enter): ").strip()
-    excluded_indices = []
-    if exclude_input:
-        try:
-            max_idx = len(docs)
-            excluded_indices = [
-                int(x.strip()) - 1
-                for x in exclude_input.split(",")
-                if x.strip().isdigit() and 1 <= int(x.strip()) <= max_idx
-            ]
-            display_nums = [i + 1 for i in excluded_indices]
-            print(f"🚫 제외 문서 번호: {display_nums}")
-        except Exception:
-            print("⚠️ 제외 번호 입력을 이해할 수 없습니다. 모든 문서를 유지합니다.")
-            excluded_indices = []
+    return True, _parse_excluded(exclude_input, len(docs))
+
+
+def _parse_excluded(exclude_input, max_idx: int) -> List[int]:
+    """'1, 3' 또는 [1, 3] 형태의 1-based 번호 → 0-based 인덱스"""
+    if not exclude_input:
+        return []
+    try:
+        items = exclude_input.split(",") if isinstance(exclude_input, str) else exclude_input
+        return [
+            int(str(x).strip()) - 1
+            for x in items
+            if str(x).strip().isdigit() and 1 <= int(str(x).strip()) <= max_idx
+        ]
+    except Exception:
+        print("⚠️ 제외 번호 입력을 이해할 수 없습니다. 모든 문서를 유지합니다.")
+        return []
+
+
+def _confirm_auto(state: AgentState, docs: List[Document]) -> Tuple[bool, List[int]]:
+    """Reranker 점수 기반 자동 확인 (무인/배치 실행용)"""
+    scores = [_score(d) for d in docs]
+    known = [s for s in scores if s is not None]
+    if not known:
+        # 점수가 없으면(웹 문서 등) 판단 근거가 없으므로 그대로 통과
+        return True, []
+    can_reject = state.get("retries", 0) < AUTO_MAX_REJECTS and not budget_exhausted(state)
+    if max(known) < AUTO_ACCEPT_SCORE and can_reject:
+        print(f"🤖 자동 확인: 최고 점수 {max(known):.3f} < {AUTO_ACCEPT_SCORE} → 재작성")
+        return False, []
+
+    order = sorted(range(len(docs)), key=lambda i: scores[i] if scores[i] is not None else 1.0, reverse=True)
+    keep = set(order[:AUTO_MIN_DOCS])
+    excluded = [
+        i for i, s in enumerate(scores)
+        if s is not None and s < AUTO_EXCLUDE_SCORE and i not in keep
+    ]
+    print(f"🤖 자동 확인: {len(docs) - len(excluded)}개 유지, {len(excluded)}개 제외")
+    return True, excluded
+
+
+def _confirm_interrupt(state: AgentState, docs: List[Document]) -> Tuple[bool, List[int]]:
+    """
+    LangGraph interrupt 기반 비동기 Human-in-the-loop
+    - 그래프가 여기서 멈추고 미리보기 payload를 호출자에게 반환 (checkpointer 필요)
+    - Command(resume={"accept": true, "exclude": [2, 5]}) 로 재개
+    """
+    from langgraph.types import interrupt
+
+    decision = interrupt({
+        "type": "confirm_retrieval",
+        "query": state.get("query"),
+        "documents": [
+            {
+                "idx": i + 1,
+                "source": d.metadata.get("source"),
+                "section": d.metadata.get("section"),
+                "rerank_score": _score(d),
+                "preview": display_text(d)[:500],
+            }
+            for i, d in enumerate(docs)
+        ],
+    })
+
+    if isinstance(decision, str):
+        decision = {"accept": decision.strip().lower() in {"yes", "y", "예", "네"}}
+    accept = bool(decision.get("accept", True))
+    return accept, _parse_excluded(decision.get("exclude"), len(docs)) if accept else []
+
+
+CONFIRM_POLICIES: Dict[str, Callable[[AgentState, List[Document]], Tuple[bool, List[int]]]] = {
+    "interactive": _confirm_interactive,
+    "auto": _confirm_auto,
+    "interrupt": _confirm_interrupt,
+}
+
+
+def register_confirm_policy(name: str, policy: Callable[[AgentState, List[Document]], Tuple[bool, List[int]]]):
+    """사용자 정의 확인 정책 등록"""
+    CONFIRM_POLICIES[name] = policy
+
+
+def confirm_retrieval(state: AgentState, mode: Optional[str] = None):
+    """
+    Human-in-the-loop 확인 단계
+    - 검색 결과(청킹 데이터)를 검토하고 필요 시 제외할 수 있음
+    - mode: "interactive"(CLI input) / "auto"(reranker 점수) / "interrupt"(LangGraph interrupt)
+    """
+    docs = resolve(state, "retrieved_ids")
+    if not docs:
+        print("\n  검색된 문서가 없습니다. 쿼리를 재작성합니다.")
+        return {"route": "rewrite"}
+
+    mode = mode or (state.get("meta") or {}).get("confirm_mode") or DEFAULT_CONFIRM_MODE
+    if mode not in CONFIRM_POLICIES:
+        raise ValueError(f"알 수 없는 confirm 정책: {mode} (가능: {list(CONFIRM_POLICIES)})")
+
+    accept, excluded_indices = CONFIRM_POLICIES[mode](state, docs)
+    if not accept:
+        print("🔄 검색 결과가 거부되었습니다. 쿼리를 재작성합니다.")
+        update = {"route": "rewrite"}
+        if state.get("retrieval_pool"):
+            # 거부된 문서는 (모든 정책에서) 이전 후보에서 빼서 재작성된 쿼리의 검색 결과로만 다시 들어오게 함
+            rejected = {d.id for d in docs}
+            update["retrieval_pool"] = {k: v for k, v in state["retrieval_pool"].items() if k not in rejected}
+        return update
+    if excluded_indices:
+        print(f"🚫 제외 문서 번호: {[i + 1 for i in excluded_indices]}")
 
     # === 최종 선택 문서 반영 ===
     selected_docs = [d for i, d in enumerate(docs) if i not in excluded_indices]
     print(f"\n✅ {len(selected_docs)}개 문서를 유지하고 다음 단계로 진행합니다.")
 
+    selected_ids = [d.id for d in selected_docs]
     return {
-        "retrieved": selected_docs,
-        "selected": selected_docs,
-        "docs_text": "\n\n".join(
-            f"[{i+1}] {_clean_html(d.page_content)}" for i, d in enumerate(selected_docs)
-        ),
+        "retrieved_ids": selected_ids,
+        "selected_ids": selected_ids,
         "sources": [
             {
                 "idx": i + 1,
@@ -94,3 +183,12 @@ def confirm_retrieval(state: AgentState):
         ],
         "route": "generate",
     }
+
+
+def make_confirm_node(mode: Optional[str] = None):
+    """정책이 고정된 confirm_retrieval 노드 함수 생성"""
+    if mode is None:
+        return confirm_retrieval
+    if mode not in CONFIRM_POLICIES:
+        raise ValueError(f"알 수 없는 confirm 정책: {mode} (가능: {list(CONFIRM_POLICIES)})")
+    return lambda state: confirm_retrieval(state, mode=mode)
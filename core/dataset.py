@@ -0,0 +1,175 @@
+# core/dataset.py
+"""
+사고 사례 데이터셋 (train/test_preprocessing.csv)
+
+- import 시점에는 아무것도 읽지 않음 (처음 필요할 때 로드 후 프로세스 내 재사용)
+- 상황 문장은 pandas 문자열 연산으로 열 단위 생성 (행별 apply 없음)
+- 파싱 결과를 CSV 내용 해시로 키를 잡아 parquet로 캐시 (CSV가 바뀌면 자동 무효화)
+- iter_cases(): 배치 실행용 스트리밍 (청크 단위로 읽어 메모리 일정)
+
+상황 문장 템플릿:
+    '{공사종류(대분류)}' 공사 중 '{공종(중분류)}'의 '{작업프로세스}' 과정에서 '{사고원인}'으로 인해 사고가 발생하였습니다.
+빈 칸은 ''로 채움 (기존 batch.py의 csv.DictReader와 같음, load_cases/iter_cases 공통)
+"""
+import functools
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+DATA_DIR = os.environ.get(
+    "DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"),
+)
+CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", os.path.join(DATA_DIR, ".cache"))
+CACHE_VERSION = 3  # 파싱 결과(상황 문장)가 바뀌면 올림
+SPLITS = {
+    "train": "train_preprocessing.csv",
+    "test": "test_preprocessing.csv",
+}
+
+# 원본 열 → 코드에서 쓰는 이름
+COLUMNS = {
+    "ID": "id",
+    "공사종류(대분류)": "construct_class",
+    "공종(중분류)": "construct_type",
+    "작업프로세스": "process",
+    "사고객체(중분류)": "object_type",
+    "사고원인": "reason",
+}
+
+_lock = threading.Lock()
+_digests: Dict[str, tuple] = {}  # 절대 경로 → (mtime_ns, size, 해시)
+
+
+def _path_of(split_or_path: str) -> str:
+    if split_or_path in SPLITS:
+        return os.path.join(DATA_DIR, SPLITS[split_or_path])
+    return split_or_path
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """CSV 내용 해시 (캐시 키)"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _digest(path: str) -> str:
+    """
+    캐시 키용 CSV 해시 — (mtime_ns, 크기)가 바뀐 경우에만 다시 계산 (_lock 안에서 호출)
+    - lazy 속성 접근(core.query 등)마다 CSV 전체를 다시 읽지 않음
+    """
+    st = os.stat(path)
+    known = _digests.get(path)
+    if known is None or known[:2] != (st.st_mtime_ns, st.st_size):
+        known = (st.st_mtime_ns, st.st_size, file_hash(path))
+        _digests[path] = known
+    return known[2]
+
+
+def build_situations(df: pd.DataFrame) -> pd.Series:
+    """상황 문장 열 생성 (원본 열 이름 기준, 벡터 연산, 빈 칸은 '')"""
+    col = lambda name: df[name].fillna("").astype(str)
+    return (
+        "'" + col("공사종류(대분류)") + "' 공사 중 '" + col("공종(중분류)") + "'의 '"
+        + col("작업프로세스") + "' 과정에서 '" + col("사고원인") + "'으로 인해 사고가 발생하였습니다."
+    )
+
+
+def normalize_situation(text: str) -> str:
+    """
+    중복 판정용 키 (배치 결과 공유)
+    - 유니코드 정규화(NFKC), 소문자, 따옴표 통일, 공백 제거 → 띄어쓰기/전각 문자만 다른 문장은 같은 키
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"[‘’“”\"`]", "'", text)
+    return re.sub(r"\s+", "", text)
+
+
+def _parse(raw: pd.DataFrame) -> pd.DataFrame:
+    df = raw[[c for c in COLUMNS if c in raw.columns]].rename(columns=COLUMNS)
+    df["situation"] = build_situations(raw)
+    return df.reset_index(drop=True)
+
+
+def _cache_path(path: str, digest: str) -> str:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{name}-v{CACHE_VERSION}-{digest[:16]}.parquet")
+
+
+def _read_cached(cache: str) -> Optional[pd.DataFrame]:
+    if not os.path.exists(cache):
+        return None
+    try:
+        return pd.read_parquet(cache)
+    except Exception as e:  # 손상/엔진 없음 → CSV에서 다시 생성
+        print(f"⚠️ 데이터셋 캐시를 읽지 못했습니다 ({cache}): {e}")
+        return None
+
+
+def _write_cached(df: pd.DataFrame, cache: str):
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        tmp = cache + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, cache)
+    except Exception as e:  # pyarrow 미설치 등: 캐시 없이 계속
+        print(f"⚠️ 데이터셋 캐시 저장 생략: {e}")
+
+
+@functools.lru_cache(maxsize=8)
+def _load(path: str, digest: str) -> pd.DataFrame:
+    cache = _cache_path(path, digest)
+    df = _read_cached(cache)
+    if df is None:
+        df = _parse(pd.read_csv(path, encoding="utf-8-sig", dtype=str))
+        _write_cached(df, cache)
+    return df
+
+
+def load_cases(split: str = "train") -> pd.DataFrame:
+    """
+    사례 테이블 (id, construct_class, construct_type, process, object_type, reason, situation)
+    - split: "train" / "test" 또는 CSV 경로
+    - 반환된 DataFrame은 프로세스 내에서 공유되므로 수정하지 말 것
+    """
+    path = os.path.abspath(_path_of(split))
+    with _lock:
+        return _load(path, _digest(path))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_raw(path: str, digest: str) -> pd.DataFrame:
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+def load_raw(split: str = "train") -> pd.DataFrame:
+    """
+    원본 CSV DataFrame (원래 열 이름, pandas 기본 dtype) — core/query.py의 train/test
+    - 반환된 DataFrame은 프로세스 내에서 공유되므로 수정하지 말 것
+    """
+    path = os.path.abspath(_path_of(split))
+    with _lock:
+        return _load_raw(path, _digest(path))
+
+
+def situations(split: str = "train") -> List[str]:
+    return load_cases(split)["situation"].tolist()
+
+
+def iter_cases(split: str = "test", chunksize: int = 1000) -> Iterator[Dict[str, str]]:
+    """CSV를 청크 단위로 읽어 {id, situation}을 하나씩 반환 (배치 실행용)"""
+    usecols = lambda c: c in COLUMNS
+    for chunk in pd.read_csv(_path_of(split), encoding="utf-8-sig", dtype=str,
+                             usecols=usecols, chunksize=chunksize):
+        ids = chunk["ID"].tolist()
+        for case_id, situation in zip(ids, build_situations(chunk).tolist()):
+            yield {"id": case_id, "situation": situation}
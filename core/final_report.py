@@ -1,15 +1,37 @@
 from core.agentstate import AgentState
 from core.llm_utils import call_llm
+from core.budget import submit_with_context, budget_exhausted, usage_of
 from langchain.schema import AIMessage # ✅ 공통 LLM 호출 유틸 사용
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import os
+import re
+import threading
 import traceback
 import json
 
 
+# 보고서 생성 방식
+# - single:  보고서 전체를 LLM 호출 1회로 생성 (기존 방식)
+# - section: 목차 계획 → 섹션 동시 생성 → 순서대로 조립 → 일관성 검토
+REPORT_MODE = os.environ.get("REPORT_MODE", "single")
+
+
 # === 1. 보고서 생성 함수 ===
 def generate_accident_report(rag_output: str) -> str:
     """
     RAG 기반 사고 정보를 입력받아 건설 사고 재발 방지 대책 보고서를 생성
+    (REPORT_MODE=section 이면 섹션 병렬 생성)
     """
+    if REPORT_MODE == "section":
+        return generate_report_by_sections(rag_output)
+    return generate_report_single(rag_output)
+
+
+def generate_report_single(rag_output: str) -> str:
+    """보고서 전체를 LLM 호출 1회로 생성"""
     system_message = {
         "role": "system",
         "content": """
@@ -32,7 +54,8 @@ def generate_accident_report(rag_output: str) -> str:
             [system_message, user_message],
             temperature=0.3,
             top_p=0.9,
-            max_tokens=25000
+            max_tokens=25000,
+            node="generate_accident_report",
         )
 
         if not report_text or "⚠️" in report_text:
@@ -57,24 +80,379 @@ def generate_accident_report(rag_output: str) -> str:
         return "보고서 생성 실패 (예외 발생)"
 
 
-# === 2. LangGraph 연동용 노드 함수 ===
+# === 2. 섹션 병렬 생성 (REPORT_MODE=section) ===
+# (제목, 작성 범위, 목표 단어 수) — 합계 약 2000단어 (single 모드의 분량 기준과 동일)
+REPORT_SECTIONS = [
+    ("1. 사고 개요", "사고 발생 상황, 공사/작업 조건, 피해 내용", 250),
+    ("2. 사고 원인 분석", "직접 원인과 간접(관리적) 원인, 주요 위험 요인", 450),
+    ("3. 즉시 조치 사항", "사고 직후 현장에서 취해야 할 조치", 300),
+    ("4. 재발 방지 대책", "기술적·관리적·교육적 대책과 단계별 실행 계획", 550),
+    ("5. 관련 법규 및 기준", "산업안전보건기준에 관한 규칙 등 관련 조항과 현장 적용 방법", 300),
+    ("6. 결론", "핵심 요약과 권고 사항", 150),
+]
+TOKENS_PER_WORD = 2.5   # 한국어 단어당 대략적인 토큰 수 (섹션 max_tokens 산정용)
+SECTION_RETRIES = 1     # 섹션 생성 실패 시 재시도 횟수 (실패는 해당 섹션에만 국한)
+REPORT_PLAN = os.environ.get("REPORT_PLAN", "1") == "1"
+REPORT_CONSISTENCY = os.environ.get("REPORT_CONSISTENCY", "1") == "1"
+_SECTION_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("REPORT_SECTION_WORKERS", 6)),
+    thread_name_prefix="report-section",
+)
+
+
+# 섹션 생성 실패 시 본문 자리에 넣는 문구 (조립/보강 단계가 이 상수로 실패 섹션을 판별)
+SECTION_FAILED_NOTE = "(이 섹션은 생성에 실패했습니다. 다시 생성이 필요합니다.)"
+
+
+def _llm_failed(text: Optional[str]) -> bool:
+    return not text or text.startswith("⚠️")
+
+
+def section_failed(section_text: str) -> bool:
+    """generate_report_section 결과가 실패 자리표시인지"""
+    return SECTION_FAILED_NOTE in section_text
+
+
+def _parse_json(raw: str) -> Optional[dict]:
+    m = re.search(r"\{.*\}", raw or "", re.S)
+    if not m:
+        return None
+    try:
+        return json.loads(m.group(0))
+    except json.JSONDecodeError:
+        return None
+
+
+def _outline_text() -> str:
+    return "\n".join(f"{title} — {scope}" for title, scope, _ in REPORT_SECTIONS)
+
+
+def plan_report_outline(rag_output: str) -> Dict[int, List[str]]:
+    """
+    목차별로 다룰 핵심 내용 배정 (섹션 간 중복/누락 방지)
+    - 반환: {섹션 번호(1부터): [핵심 내용, ...]} (실패 시 빈 dict → 섹션은 작성 범위만으로 생성)
+    """
+    messages = [
+        {"role": "system", "content": "당신은 건설 사고 재발 방지 보고서 목차 설계자입니다."},
+        {"role": "user", "content": (
+            "아래 목차의 각 섹션에서 다룰 핵심 내용을 RAG 분석 결과에서 골라 배정하라. "
+            "같은 내용을 두 섹션에 배정하지 말고, 섹션당 2~5개 항목을 짧은 구절로 적어라. "
+            "JSON으로만 출력하라. 예시: {\"sections\": [{\"index\": 1, \"points\": [\"...\"]}]}\n\n"
+            f"목차:\n{_outline_text()}\n\nRAG 분석 결과:\n{rag_output}"
+        )},
+    ]
+    raw = call_llm(messages, temperature=0.1, max_tokens=800, node="report_plan")
+    data = _parse_json(raw) if not _llm_failed(raw) else None
+    plan: Dict[int, List[str]] = {}
+    for item in (data or {}).get("sections", []):
+        try:
+            plan[int(item["index"])] = [str(p) for p in item.get("points", [])]
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not plan:
+        print("⚠️ 목차 계획 실패 → 작성 범위만으로 섹션 생성")
+    return plan
+
+
+def generate_report_section(rag_output: str, section: Tuple[str, str, int], points: List[str]) -> str:
+    """섹션 1개 생성 — section: (제목, 작성 범위, 목표 단어 수), 본문은 '## 제목'으로 시작하도록 정리"""
+    title, scope, words = section
+    guide = "\n".join(f"- {p}" for p in points) or "- (RAG 분석 결과에서 작성 범위에 맞는 내용을 선택)"
+    messages = [
+        {"role": "system", "content": (
+            "당신은 건설 사고 재발 방지 보고서의 한 섹션을 작성하는 전문가입니다. "
+            "전체 목차 중 지정된 섹션만 작성하고, 다른 섹션의 내용은 반복하지 마십시오."
+        )},
+        {"role": "user", "content": (
+            f"전체 목차:\n{_outline_text()}\n\n"
+            f"작성할 섹션: {title}\n작성 범위: {scope}\n분량: 약 {words}단어\n"
+            f"반드시 다룰 내용:\n{guide}\n\n"
+            "섹션 제목 없이 본문만 작성하라. 소제목은 '###', 목록은 '-'를 사용하라.\n\n"
+            f"RAG 분석 결과:\n{rag_output}"
+        )},
+    ]
+    text = None
+    for _ in range(1 + SECTION_RETRIES):
+        text = call_llm(messages, temperature=0.3, top_p=0.9,
+                        max_tokens=int(words * TOKENS_PER_WORD * 1.5), node="report_section")
+        if not _llm_failed(text):
+            break
+    if _llm_failed(text):
+        print(f"⚠️ 섹션 생성 실패: {title}")
+        return f"## {title}\n{SECTION_FAILED_NOTE}"
+
+    # 모델이 붙인 보고서/섹션 제목 줄 제거 후 표준 제목 부착
+    name = title.split(". ", 1)[-1]
+    lines = text.strip().splitlines()
+    while lines and (not lines[0].strip() or re.match(r"^#{1,2}\s", lines[0].strip())
+                     or (name in lines[0] and len(lines[0].strip()) <= len(title) + 8)):
+        lines.pop(0)
+    return f"## {title}\n" + "\n".join(lines).strip()
+
+
+def check_report_consistency(report: str) -> str:
+    """
+    조립된 보고서의 섹션 간 불일치(수치, 용어, 조항 번호)를 찾아 교체 목록만 받아 적용
+    (보고서 전체를 다시 생성하지 않으므로 출력 토큰이 짧음)
+    """
+    messages = [
+        {"role": "system", "content": "당신은 건설안전 보고서 일관성 검토자입니다."},
+        {"role": "user", "content": (
+            "다음 보고서는 섹션별로 따로 작성되었다. 섹션 사이에 서로 모순되는 수치, 용어, 법규 조항 번호가 있으면 "
+            "고칠 문구를 최대 10개까지 찾아라. 없으면 빈 목록을 출력하라. JSON으로만 출력하라. "
+            "예시: {\"replacements\": [{\"find\": \"...\", \"replace\": \"...\"}]}\n\n"
+            f"보고서:\n{report}"
+        )},
+    ]
+    raw = call_llm(messages, temperature=0.0, max_tokens=600, node="report_consistency")
+    data = _parse_json(raw) if not _llm_failed(raw) else None
+    applied = 0
+    for item in (data or {}).get("replacements", [])[:10]:
+        find, repl = str(item.get("find", "")), str(item.get("replace", ""))
+        if find and find != repl and find in report:
+            report = report.replace(find, repl)
+            applied += 1
+    print(f"🔗 일관성 검토: 수정 {applied}건")
+    return report
+
+
+def generate_report_by_sections(rag_output: str) -> str:
+    """
+    목차 계획 → 섹션 동시 생성 → 순서대로 조립 → 일관성 검토
+    - 소요 시간은 가장 긴 섹션 1개 + 계획/검토(짧은 출력)에 가까움
+    - 섹션 1개가 실패해도 나머지는 유지
+    """
+    print("🧠 [LLM 호출 시작] 섹션 병렬 보고서 생성 중...")
+    plan = plan_report_outline(rag_output) if REPORT_PLAN else {}
+    futures = [
+        submit_with_context(_SECTION_POOL, generate_report_section, rag_output, section, plan.get(i, []))
+        for i, section in enumerate(REPORT_SECTIONS, start=1)
+    ]
+    sections = [f.result() for f in futures]
+    if all(section_failed(s) for s in sections):
+        return "보고서 생성 실패 (LLM 응답 없음 또는 오류)"
+
+    report = "\n\n".join(sections)
+    if REPORT_CONSISTENCY:
+        report = check_report_consistency(report)
+    print("✅ 보고서 생성 완료")
+    return report
+
+
+_MD_SECTION = re.compile(r"^##\s+(?P<title>.+?)\s*$")   # '## 제목' ('#' 문서 제목, '###' 소제목 제외)
+SECTION_TITLES = {  # 표준 목차 제목 ('1. 사고 개요'와 번호 없는 '사고 개요')
+    t for title, _, _ in REPORT_SECTIONS for t in (title, title.split(". ", 1)[-1])}
+
+
+def _section_title(line: str) -> Optional[str]:
+    """섹션 제목 줄이면 제목, 아니면 None"""
+    m = _MD_SECTION.match(line)
+    if m:
+        return m.group("title").strip("* ")
+    # 마크다운 제목이 아닌 줄은 표준 목차 제목과 같을 때만 (예: '**1. 사고 개요**') — 번호 목록은 본문
+    plain = line.strip().strip("*").strip().rstrip(":").strip()
+    return plain if plain in SECTION_TITLES else None
+
+
+def split_report_sections(report: str) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    보고서 → (첫 제목 앞 머리말, [{"heading": 원래 제목 줄, "title": 제목, "body": 본문}, ...])
+    - '## 제목' 줄 또는 표준 목차(REPORT_SECTIONS) 제목 줄만 섹션 경계로 사용 (single/section 모드 공통)
+    - '# 보고서 제목'은 머리말, '1. 항목' 같은 번호 목록은 섹션 본문
+    """
+    preamble: List[str] = []
+    sections: List[Dict[str, str]] = []
+    for line in (report or "").splitlines():
+        title = _section_title(line)
+        if title:
+            sections.append({"heading": line.strip(), "title": title, "body": ""})
+        elif sections:
+            sections[-1]["body"] += line + "\n"
+        else:
+            preamble.append(line)
+    for sec in sections:
+        sec["body"] = sec["body"].strip()
+    return "\n".join(preamble).strip(), sections
+
+
+def join_report_sections(preamble: str, sections: List[Dict[str, str]]) -> str:
+    parts = [preamble] if preamble else []
+    parts += [f"{sec['heading']}\n{sec['body']}".strip() for sec in sections]
+    return "\n\n".join(parts)
+
+
+def section_spec(title: str, body: str = "") -> Tuple[str, str, int]:
+    """제목 → (제목, 작성 범위, 목표 단어 수) (표준 목차에 없으면 기존 본문 길이 기준)"""
+    name = title.split(". ", 1)[-1]
+    for std_title, scope, words in REPORT_SECTIONS:
+        if std_title.split(". ", 1)[-1] in name or name in std_title:
+            return title, scope, words
+    return title, name, min(600, max(150, len(body.split())))
+
+
+# === 3. 선행(speculative) 보고서 생성 ===
+# 채점과 동시에 보고서를 미리 생성해 두고, 채점이 통과하면 노드에서 그대로 사용한다.
+# 채점이 generate/rewrite로 돌아가면 취소(시작 전) 또는 결과 폐기(진행 중).
+# ⚠️ 이미 생성 중인 초안은 멈출 수 없음: 폐기돼도 끝까지 실행되며 LLM 시간/토큰을 쓰고
+#    그 사용량은 해당 run의 예산에 그대로 집계된다. 그래서 예산 여유가 있을 때만 시작한다.
+SPECULATIVE_BUDGET_FRACTION = float(os.environ.get("SPECULATIVE_BUDGET_FRACTION", 0.5))
+
+
+def report_llm_calls() -> int:
+    """보고서 1건 생성에 드는 LLM 호출 수 (REPORT_MODE 기준)"""
+    if REPORT_MODE == "section":
+        return len(REPORT_SECTIONS) + int(REPORT_PLAN) + int(REPORT_CONSISTENCY)
+    return 1
+
+
+def can_afford_speculation(state: Optional[dict]) -> bool:
+    """
+    선행 보고서를 시작해도 되는지 (예산 제한이 없으면 항상 True)
+    - 예산이 이미 소진됐으면 False
+    - 호출 수 제한: 폐기될 초안 + 실제 보고서 + 채점 2회를 감당할 수 있어야 함
+    - 토큰 제한: 사용량이 한도의 SPECULATIVE_BUDGET_FRACTION 미만일 때만
+    """
+    budget = (state or {}).get("budget")
+    if not budget:
+        return True
+    if budget_exhausted(state):
+        return False
+    total = usage_of(state).get("total") or {}
+    max_calls = budget.get("max_llm_calls")
+    if max_calls is not None and max_calls - total.get("llm_calls", 0) < 2 * report_llm_calls() + 2:
+        return False
+    for limit_key, usage_key in (("max_prompt_tokens", "prompt_tokens"),
+                                 ("max_completion_tokens", "completion_tokens")):
+        limit = budget.get(limit_key)
+        if limit is not None and total.get(usage_key, 0) >= limit * SPECULATIVE_BUDGET_FRACTION:
+            return False
+    return True
+
+_SPECULATIVE: "OrderedDict[str, Future]" = OrderedDict()
+_SPECULATIVE_LOCK = threading.Lock()
+_SPECULATIVE_MAX = 64  # 버려진 항목이 쌓이지 않도록 보관 상한
+_SPECULATIVE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SPECULATIVE_REPORT_WORKERS", 4)),
+    thread_name_prefix="speculative-report",
+)
+
+
+def _speculative_key(rag_output: str) -> str:
+    return hashlib.sha1(rag_output.encode("utf-8")).hexdigest()
+
+
+def start_speculative_report(rag_output: str, state: Optional[dict] = None):
+    """
+    rag_output에 대한 보고서 생성을 백그라운드로 시작 (이미 있으면 무시)
+    - state의 예산 여유가 부족하면 시작하지 않음 (can_afford_speculation)
+    - 채점이 실패해 폐기돼도 이미 시작된 생성은 끝까지 실행되고 run 예산에 집계됨
+    """
+    if not can_afford_speculation(state):
+        print("⏭️ 예산 여유 부족 → 보고서 선행 생성 생략")
+        return
+    key = _speculative_key(rag_output)
+    with _SPECULATIVE_LOCK:
+        if key in _SPECULATIVE:
+            return
+        _SPECULATIVE[key] = submit_with_context(_SPECULATIVE_POOL, generate_accident_report, rag_output)
+        while len(_SPECULATIVE) > _SPECULATIVE_MAX:
+            _, old = _SPECULATIVE.popitem(last=False)
+            old.cancel()
+
+
+def discard_speculative_report(rag_output: str):
+    """
+    채점 실패로 필요 없어진 선행 보고서 취소/폐기
+    - 시작 전이면 취소, 이미 생성 중이면 Future.cancel()로 멈출 수 없으므로 결과만 버림
+      (그 생성은 끝까지 실행되며 LLM 시간/토큰이 run 예산에 집계됨)
+    """
+    with _SPECULATIVE_LOCK:
+        future = _SPECULATIVE.pop(_speculative_key(rag_output), None)
+    if future is not None and not future.cancel():
+        print("🗑️ 선행 보고서 폐기 (이미 생성 중이던 초안은 끝까지 실행되며 사용량은 예산에 집계됨)")
+
+
+def take_speculative_report(rag_output: str) -> Optional[Future]:
+    with _SPECULATIVE_LOCK:
+        return _SPECULATIVE.pop(_speculative_key(rag_output), None)
+
+
+# === 4. LangGraph 연동용 노드 함수 ===
 def generate_accident_report_node(state: AgentState):
     """
     LangGraph에서 호출되는 보고서 생성 노드.
     RAG 최종 결과를 받아 generate_accident_report() 함수를 실행하고,
     결과를 state에 저장한다.
     """
-    # 1️⃣ RAG 결과 가져오기
-    rag_output = state["messages"][-1].content
+    # 1️⃣ RAG 결과 가져오기 (finalize_response가 확정한 답변)
+    rag_output = state.get("answer") or state.get("candidate_answer") or state["messages"][-1].content
+
+    # 2️⃣ 보고서 생성 (채점 중 미리 시작한 결과가 있으면 재사용)
+    future = take_speculative_report(rag_output)
+    if future is not None and not future.cancelled():
+        print("⚡ 선행 생성된 보고서 사용")
+        report_text = future.result()
+    else:
+        report_text = generate_accident_report(rag_output)
+
+    # 3️⃣ 변경된 키만 반환 (messages는 reducer가 이어 붙임)
+    return {
+        "messages": [AIMessage(content=report_text)],
+        "report": report_text,
+    }
+
+
+# === 5. 보고서 부분 보강 노드 ===
+REPORT_MAX_REPAIRS = int(os.environ.get("REPORT_MAX_REPAIRS", 1))  # 섹션 보강 최대 횟수 (이후엔 그대로 종료)
+
+
+def repair_report_node(state: AgentState):
+    """
+    채점에서 부족(insufficient) 판정을 받은 섹션만 다시 생성
+    - 부족한 섹션 제목으로 웹 검색(중복 제거 + 재정렬)해 추가 자료로 사용
+    - 충분(adequate) 판정 섹션과 머리말은 그대로 재사용
+    """
 
-    # 2️⃣ 보고서 생성
-    report_text = generate_accident_report(rag_output)
+    review = state.get("report_review") or {}
+    failing = {s["index"]: s.get("reason", "") for s in review.get("sections", []) if s.get("verdict") == "insufficient"}
+    preamble, sections = split_report_sections(state.get("report") or "")
+    rag_output = state.get("answer") or state.get("candidate_answer") or ""
 
-    # 3️⃣ LangGraph state에 AI 메시지 추가 (✅ 핵심 수정)
-    state["messages"].append(AIMessage(content=report_text))
+    # 1️⃣ 부족한 섹션 기준으로 웹 보강 (섹션별 질의를 동시에 검색)
+    query = state.get("query") or state["messages"][0].content
+    targets = [i for i in sorted(failing) if 1 <= i <= len(sections)]
+    if not targets:
+        # 판정 섹션 번호가 현재 보고서와 맞지 않음 → 웹 검색/보강 횟수 소모 없이 그대로 반환
+        print("⚠️ 보강할 섹션이 현재 보고서에 없음 → 섹션 보강 생략")
+        return {}
 
-    # 4️⃣ report 키에도 저장 (선택적, 이후 노드 접근용)
-    state["report"] = report_text
+    from core.websearch import collect_web_docs, merge_web_docs
 
-    # 5️⃣ 전체 state 반환
-    return state
+    queries = [f"{query} {sections[i - 1]['title'].split('. ', 1)[-1]} 관련 법규 및 안전 기준" for i in targets]
+    ranked, n_found, n_dup = collect_web_docs(state, queries, query)
+    extra = "\n\n".join(f"[W{n}] {d.page_content}" for n, d in enumerate(ranked, 1))
+    context = f"{rag_output}\n\n추가 참고 자료(웹 검색):\n{extra}" if extra else rag_output
+
+    # 2️⃣ 부족한 섹션만 동시 재생성
+    print(f"🩹 보고서 섹션 보강: {[sections[i - 1]['title'] for i in targets]} (웹 자료 {len(ranked)}건)")
+    futures = {
+        i: submit_with_context(
+            _SECTION_POOL, generate_report_section, context,
+            section_spec(sections[i - 1]["title"], sections[i - 1]["body"]),
+            [p for p in [failing[i]] if p],
+        )
+        for i in targets
+    }
+    for i, future in futures.items():
+        text = future.result()
+        if section_failed(text):
+            continue  # 기존 본문 유지
+        sections[i - 1]["body"] = text.split("\n", 1)[1].strip() if "\n" in text else ""
+
+    report_text = join_report_sections(preamble, sections)
+    return {
+        **merge_web_docs(state, ranked),
+        "messages": [AIMessage(content=report_text)],
+        "report": report_text,
+        "report_repairs": state.get("report_repairs", 0) + 1,
+    }
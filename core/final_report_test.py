@@ -1,7 +1,7 @@
 import os
-from docx import Document
 from datetime import datetime
 from core.llm_utils import call_llm  # ✅ 공통 LLM 호출 유틸
+from core.report_export import REPORT_TITLE, write_docx
 # ✅ llm_utils 내부에서 LLM_URL, TOKEN, MODEL 모두 관리
 
 
@@ -12,14 +12,8 @@ def save_report_to_word(report_text: str, output_dir: str = "./reports"):
     filename = f"건설사고_재발방지대책보고서_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
     filepath = os.path.join(output_dir, filename)
 
-    doc = Document()
-    doc.add_heading("건설 사고 재발 방지 대책 보고서", level=0)
-
-    for line in report_text.split("\n"):
-        if line.strip():
-            doc.add_paragraph(line.strip())
-
-    doc.save(filepath)
+    # 제목/목록 서식 적용 (배치 내보내기와 같은 렌더러)
+    write_docx(report_text, filepath, title=REPORT_TITLE)
     print(f"✅ 보고서가 Word 파일로 저장되었습니다: {filepath}")
     return filepath
 
@@ -1,5 +1,5 @@
 from core.agentstate import AgentState
 
 def finalize_response(state: AgentState):
-    # 마지막 AIMessage가 최종 응답
-    return {"messages": state["messages"]}
\ No newline at end of file
+    # 마지막 generate 결과가 최종 응답 (messages는 그대로 두고 answer로 확정)
+    return {"answer": state.get("candidate_answer") or state["messages"][-1].content}
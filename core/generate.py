@@ -4,6 +4,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import AIMessage
 from core.agentstate import AgentState
 from core.llm_utils import call_llm  # ✅ 공용 LLM 호출 유틸 가져오기
+from core.chunk_store import resolve
 
 
 # === 프롬프트 정의 ===
@@ -70,11 +71,7 @@ def format_sections(text: str) -> str:
 def generate(state: AgentState):
     """RAG 기반 사고 개요 / 위험 요인 / 즉시 조치 생성"""
     q = state.get("query") or state["messages"][0].content
-    sel = state.get("selected") or state.get("retrieved") or []
-
-    # ✅ retrieved 동기화
-    if len(state.get("retrieved", [])) != len(sel):
-        state["retrieved"] = sel
+    sel = resolve(state, "selected_ids") or resolve(state, "retrieved_ids")
 
     # ✅ sources 재생성
     src_list = [
@@ -85,7 +82,6 @@ def generate(state: AgentState):
         }
         for i, d in enumerate(sel)
     ]
-    state["sources"] = src_list
 
     # ✅ CONTEXT 구성
     ctx = "\n\n".join(f"[{i+1}] {d.page_content}" for i, d in enumerate(sel[:8]))
@@ -100,7 +96,7 @@ def generate(state: AgentState):
     body_answer = call_llm([
         {"role": "system", "content": "당신은 건설 안전 지침 전용 어시스턴트입니다."},
         {"role": "user", "content": prompt_text}
-    ])
+    ], node="generate")
     body_answer = format_sections(body_answer)
 
     # ✅ 존재하지 않는 인용번호 제거 ([#6] 이상 등)
@@ -129,7 +125,8 @@ def generate(state: AgentState):
         answer += "\n\n> 추가로 필요한 키워드나 문서 범위를 지정해 주세요."
 
     return {
-        "messages": state["messages"] + [AIMessage(content=answer)],
+        "messages": [AIMessage(content=answer)],
         "candidate_answer": answer,
+        "sources": src_list,
         "retries": state.get("retries", 0) + 1,
     }
@@ -1,10 +1,15 @@
 # core/generation_grader.py
+import os
 import re, json
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
 from core.agentstate import AgentState
 from core.llm_utils import call_llm  # ✅ 공용 LLM 호출 유틸 사용
+from core.final_report import start_speculative_report, discard_speculative_report
+from core.budget import budget_exhausted, submit_with_context
+from core.chunk_store import resolve
 
 
 SAFE_YES = {"yes", "y", "예", "네", "맞음", "true"}
@@ -79,18 +84,9 @@ def get_answer_grader():
     return prompt, parser
 
 
-# === ✅ 메인 평가 함수 ===
-MAX_RETRIES = 3
-
-def grade_generation(state: AgentState) -> str:
-    """생성 결과의 사실성 및 질문 해결 여부를 단계적으로 평가"""
-    question = state.get("query") or state["messages"][0].content
-    docs = state.get("selected") or state.get("retrieved") or []
-    generation = state.get("candidate_answer", state["messages"][-1].content)
-    retries = state.get("retries", 0)
-    web_fallback = state.get("web_fallback", True)
-
-    # === 1️⃣ 사실성 평가 (FACTS 기반) ===
+# === ✅ 개별 채점 호출 ===
+def _grade_hallucination(docs, generation: str) -> str:
+    """1️⃣ 사실성 평가 (FACTS 기반)"""
     prompt, parser = get_hallucination_grader()
     filled_prompt = prompt.format(
         documents="\n\n".join(d.page_content for d in docs[:8]),
@@ -100,24 +96,72 @@ def grade_generation(state: AgentState) -> str:
     raw = call_llm([
         {"role": "system", "content": "당신은 FACTS 기반 채점기입니다. 오직 JSON만 출력하세요."},
         {"role": "user", "content": filled_prompt}
-    ])
-    hall = _safe_extract_yesno(raw)
-
-    if hall == "yes":
-        # === 2️⃣ 질문 해결 여부 평가 ===
-        prompt, parser = get_answer_grader()
-        filled_prompt = prompt.format(question=question, generation=generation)
-        raw = call_llm([
-            {"role": "system", "content": "당신은 답변이 질문을 해결하는지 판단하는 평가자입니다. 반드시 JSON만 출력하세요."},
-            {"role": "user", "content": filled_prompt}
-        ])
-        ans = _safe_extract_yesno(raw)
-
-        # === 결과 라우팅 ===
-        if ans == "yes":
-            return "finalize_response"
-        else:
-            return "rewrite" if retries < MAX_RETRIES else ("websearch" if web_fallback else "finalize_response")
-
-    else:
+    ], node="generation_grader")
+    return _safe_extract_yesno(raw)
+
+
+def _grade_answer(question: str, generation: str) -> str:
+    """2️⃣ 질문 해결 여부 평가"""
+    prompt, parser = get_answer_grader()
+    filled_prompt = prompt.format(question=question, generation=generation)
+    raw = call_llm([
+        {"role": "system", "content": "당신은 답변이 질문을 해결하는지 판단하는 평가자입니다. 반드시 JSON만 출력하세요."},
+        {"role": "user", "content": filled_prompt}
+    ], node="generation_grader")
+    return _safe_extract_yesno(raw)
+
+
+def _route(hall: str, ans: str, retries: int, web_fallback: bool) -> str:
+    """채점 결과 → 다음 노드"""
+    if hall != "yes":
         return "generate" if retries < MAX_RETRIES else ("websearch" if web_fallback else "finalize_response")
+    if ans == "yes":
+        return "finalize_response"
+    return "rewrite" if retries < MAX_RETRIES else ("websearch" if web_fallback else "finalize_response")
+
+
+# === ✅ 메인 평가 함수 ===
+MAX_RETRIES = 3
+
+# sequential: 사실성 통과 시에만 질문 해결 평가 (기본)
+# concurrent: 두 채점기를 동시에 실행하고, 통과를 가정해 보고서 생성을 미리 시작
+GRADER_MODE = os.environ.get("GRADER_MODE", "sequential")
+SPECULATIVE_REPORT = os.environ.get("SPECULATIVE_REPORT", "1") == "1"
+
+_GRADER_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("GRADER_WORKERS", 8)),
+    thread_name_prefix="grader",
+)
+
+
+def grade_generation(state: AgentState) -> str:
+    """생성 결과의 사실성 및 질문 해결 여부를 평가"""
+    question = state.get("query") or state["messages"][0].content
+    docs = resolve(state, "selected_ids") or resolve(state, "retrieved_ids")
+    generation = state.get("candidate_answer", state["messages"][-1].content)
+    retries = state.get("retries", 0)
+    web_fallback = state.get("web_fallback", True)
+
+    # === 예산 소진 시 재채점/재생성 없이 현재 답변으로 마무리 ===
+    reason = budget_exhausted(state)
+    if reason:
+        print(f"⏱️ 예산 소진({reason}) → 채점 생략, finalize_response")
+        return "finalize_response"
+
+    if GRADER_MODE != "concurrent":
+        hall = _grade_hallucination(docs, generation)
+        ans = _grade_answer(question, generation) if hall == "yes" else "no"
+        return _route(hall, ans, retries, web_fallback)
+
+    # === 동시 채점 + 보고서 선행 생성 ===
+    # finalize_response는 messages를 그대로 넘기므로 보고서 입력 = 현재 generation
+    if SPECULATIVE_REPORT:
+        start_speculative_report(generation, state)
+
+    hall_future = submit_with_context(_GRADER_POOL, _grade_hallucination, docs, generation)
+    ans_future = submit_with_context(_GRADER_POOL, _grade_answer, question, generation)
+    route = _route(hall_future.result(), ans_future.result(), retries, web_fallback)
+
+    if SPECULATIVE_REPORT and route != "finalize_response":
+        discard_speculative_report(generation)
+    return route
@@ -5,6 +5,7 @@ from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
 from core.agentstate import AgentState
 from core.llm_utils import call_llm  # ✅ 공용 LLM 호출 유틸 사용
+from core.chunk_store import resolve
 
 
 # --- helpers ---
@@ -59,7 +60,7 @@ def grade_documents(state: AgentState) -> Literal["generate", "rewrite"]:
     """
     문서 관련성 평가기 (공용 call_llm 기반)
     """
-    docs = (state.get("retrieved") or state.get("selected") or [])[:8]
+    docs = (resolve(state, "retrieved_ids") or resolve(state, "selected_ids"))[:8]
     if not docs:
         return "rewrite"
 
@@ -85,7 +86,7 @@ def grade_documents(state: AgentState) -> Literal["generate", "rewrite"]:
         raw = call_llm([
             {"role": "system", "content": "당신은 문서-질문 관련성을 판별하는 평가자입니다. 반드시 JSON만 출력하세요."},
             {"role": "user", "content": filled_prompt}
-        ])
+        ], node="grade_documents")
 
         text = raw.lower()
         label = "yes" if ("\"binary_score\":\"yes\"" in text or re.search(r"\byes\b", text)) else "no"
@@ -96,8 +97,7 @@ def grade_documents(state: AgentState) -> Literal["generate", "rewrite"]:
             weighted_yes += _rerank_score(d)
 
     # ✅ 상태 갱신
-    state["selected"] = selected
-    state["docs_text"] = "\n\n".join(f"[{i+1}] {d.page_content}" for i, d in enumerate(selected))
+    state["selected_ids"] = [d.id for d in selected]
 
     # === 🔍 결과 판단 ===
     total = max(1, len(docs))
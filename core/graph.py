@@ -0,0 +1,133 @@
+# core/graph.py
+from typing import Optional
+from langgraph.graph import StateGraph, END
+from langchain_core.messages import HumanMessage
+from core.agentstate import AgentState
+from core.retriever import retrieve_node
+from core.generate import generate
+from core.rewrite import rewrite
+from core.websearch import websearch
+from core.finalize_response import finalize_response
+from core.generation_grader import grade_generation
+from core.final_report import generate_accident_report_node, repair_report_node
+from core.report_grader import grade_report, route_report
+from core.confirm_retrieval import make_confirm_node, DEFAULT_CONFIRM_MODE
+from core.budget import new_budget, tracked, tracked_route
+from core.tracing import traced, traced_route
+
+
+def _node(name: str, fn):
+    """노드 공통 래퍼 (run 단위 사용량 집계 + span 기록)"""
+    return traced(name, tracked(name, fn))
+
+
+def _route(name: str, fn):
+    """라우팅 함수 공통 래퍼"""
+    return traced_route(name, tracked_route(name, fn))
+
+
+def build_graph(confirm_mode: Optional[str] = None) -> StateGraph:
+    """
+    에이전트 그래프 구성 (노드에는 '함수'를 넣어야 함!)
+    - confirm_mode: 검색 결과 확인 정책 ("interactive" / "auto" / "interrupt")
+      None이면 CONFIRM_MODE 환경 변수 또는 state["meta"]["confirm_mode"]를 따름
+    """
+    graph = StateGraph(AgentState)
+
+    graph.add_node("retrieve", _node("retrieve", retrieve_node))
+    graph.add_node("confirm_retrieval", _node("confirm_retrieval", make_confirm_node(confirm_mode)))
+    graph.add_node("generate", _node("generate", generate))
+    graph.add_node("rewrite", _node("rewrite", rewrite))
+    graph.add_node("websearch", _node("websearch", websearch))
+    graph.add_node("finalize_response", _node("finalize_response", finalize_response))
+    graph.add_node("generate_accident_report", _node("generate_accident_report", generate_accident_report_node))
+    graph.add_node("grade_report", _node("grade_report", grade_report))
+    graph.add_node("repair_report", _node("repair_report", repair_report_node))
+
+    graph.set_entry_point("retrieve")
+    # 검색 후 사용자 확인 단계로 이동
+    graph.add_edge("retrieve", "confirm_retrieval")
+
+    # 확인 결과(accept/reject)에 따라 다음 단계 결정
+    graph.add_conditional_edges(
+        "confirm_retrieval",
+        lambda s: s.get("route", "generate"),
+        {
+            "generate": "generate",
+            "rewrite": "rewrite"
+        },
+    )
+
+    # 이후 standard RAG 루프
+    graph.add_edge("rewrite", "retrieve")
+    graph.add_edge("websearch", "generate")
+
+    graph.add_conditional_edges(
+        "generate",
+        _route("grade_generation", grade_generation),
+        {
+            "generate": "generate",               # 환각 → 재생성
+            "rewrite": "rewrite",                 # 유용하지 않음 → 질문 리라이트
+            "websearch": "websearch",             # 최대 반복 도달 → 웹 보강
+            "finalize_response": "finalize_response",  # grounded + useful → 종료
+        },
+    )
+
+    # finalize_response 이후 보고서 생성 및 품질평가 연결
+    graph.add_edge("finalize_response", "generate_accident_report")
+
+    graph.add_edge("generate_accident_report", "grade_report")
+    graph.add_edge("repair_report", "grade_report")
+
+    graph.add_conditional_edges(
+        "grade_report",
+        _route("route_report", route_report),  # ✅ 섹션별 품질 평가 결과
+        {
+            "repair": "repair_report",    # 일부 섹션 부족 → 해당 섹션만 웹 보강 후 재생성
+            "insufficient": "websearch",  # 섹션 판정 불가 + 부족 → 웹검색 후 전체 보강
+            "adequate": END               # 충분 → 종료
+        },
+    )
+    return graph
+
+
+def build_app(confirm_mode: Optional[str] = None, checkpointer=None):
+    """
+    그래프 컴파일
+    - interrupt 정책은 중단 지점 저장이 필요하므로 checkpointer가 없으면 메모리 저장소 사용
+    """
+    if checkpointer is None and (confirm_mode or DEFAULT_CONFIRM_MODE) == "interrupt":
+        from langgraph.checkpoint.memory import MemorySaver
+        checkpointer = MemorySaver()
+    return build_graph(confirm_mode=confirm_mode).compile(checkpointer=checkpointer)
+
+
+def resume_confirmation(app, config: dict, accept: bool = True, exclude: Optional[list] = None):
+    """interrupt 정책으로 멈춘 실행을 사용자 결정과 함께 재개"""
+    from langgraph.types import Command
+    return app.invoke(Command(resume={"accept": accept, "exclude": exclude or []}), config)
+
+
+def make_init_state(question: str, budget: Optional[dict] = None, case_id: Optional[str] = None,
+                    profile=None) -> AgentState:
+    """
+    질의 1건에 대한 초기 상태
+    - budget 미지정 시 BUDGET_* 환경 변수 기본값 (미설정 항목은 무제한)
+    - case_id: trace span에 붙일 사례 ID (미지정 시 budget의 run_id)
+    - profile: 이 요청만 프로파일링할 노드/단계 (True = 전체, core/profiling.py)
+    """
+    state: AgentState = {
+        "messages": [HumanMessage(content=question)],
+        "query": question,
+        "retries": 0,
+        "web_fallback": True,
+        "budget": budget or new_budget(),
+    }
+    meta = {}
+    if case_id is not None:
+        meta["case_id"] = str(case_id)
+    if profile:
+        meta["profile"] = profile
+    if meta:
+        state["meta"] = meta
+    return state
@@ -1,7 +1,4 @@
 from typing import Optional
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
 
 KANANA_ID = "kakaocorp/kanana-1.5-8b-instruct-2505"
 
@@ -11,31 +8,40 @@ def make_kanana_llm(
     max_new_tokens: int = 512,
     top_p: float = 0.9,
     repetition_penalty: float = 1.05,
+    device: str = "cuda:1",
 ):
+    # torch/transformers는 실제로 모델을 만들 때만 import (import 시점 비용 제거)
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+    from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
+
     tok = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
     if tok.pad_token is None:
         tok.pad_token = tok.eos_token
 
-    # bf16 지원 안 하는 경우를 대비해 자동 폴백
-    try:
-        dtype = torch.bfloat16
-        _ = torch.zeros(1, device="cuda", dtype=dtype)  # 테스트
-    except Exception:
-        dtype = torch.float16
-
-    # GPU 0번으로 직접 로드 (단일 GPU 사용)
+    # bf16 지원 안 하는 경우를 대비해 자동 폴백 (CPU는 float32)
+    if device == "cpu":
+        dtype = torch.float32
+    else:
+        try:
+            dtype = torch.bfloat16
+            _ = torch.zeros(1, device=device, dtype=dtype)  # 테스트
+        except Exception:
+            dtype = torch.float16
+
+    # 지정한 장치로 직접 로드 (기본 cuda:1)
     model = AutoModelForCausalLM.from_pretrained(
         model_id,
         torch_dtype=dtype,
         trust_remote_code=True,
         low_cpu_mem_usage=True,
-    ).to("cuda:1")
+    ).to(device)
 
     gen = pipeline(
         task="text-generation",
         model=model,
         tokenizer=tok,
-        device=1,                     # 파이프라인도 GPU 0 사용
+        device=torch.device(device),  # 파이프라인도 같은 장치 사용
         return_full_text=False,
         do_sample=(temperature > 0),
         temperature=temperature,
@@ -46,7 +52,9 @@ def make_kanana_llm(
 
     return ChatHuggingFace(llm=HuggingFacePipeline(pipeline=gen))
 
-# ✅ Kanana ChatModel 객체 생성
-KANANA = make_kanana_llm()
-
-
+# ✅ KANANA: 레지스트리 모델 대리자 (처음 호출할 때 로드, 수명은 core/models.py 레지스트리가 관리)
+def __getattr__(name: str):
+    if name == "KANANA":
+        from core.models import MODELS, RegistryLLM
+        return RegistryLLM(MODELS, "kanana")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
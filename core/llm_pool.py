@@ -0,0 +1,197 @@
+# core/llm_pool.py
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import requests
+
+
+class Endpoint:
+    """
+    OpenAI 호환 LLM 엔드포인트 1개의 상태
+    - outstanding: 현재 처리 중인 요청 수 (least-outstanding 라우팅 기준)
+    - max_concurrency: 엔드포인트별 동시 요청 상한
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        model: str,
+        token: str = "token-abc123",
+        max_concurrency: int = 16,
+        tags: Sequence[str] = (),
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.token = token
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.tags = set(tags)
+
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.last_check = 0.0
+
+    def __repr__(self) -> str:
+        state = "up" if self.healthy else "down"
+        return f"Endpoint({self.name}, {self.base_url}, {self.outstanding}/{self.max_concurrency}, {state})"
+
+
+class EndpointPool:
+    """
+    여러 LLM 엔드포인트에 대한 least-outstanding-requests 로드밸런서
+
+    - routes: 노드 이름 → 태그(또는 엔드포인트 이름) 매핑
+      (예: {"generation_grader": "small", "generate_accident_report": "big"})
+    - 매칭되는 엔드포인트가 없으면 전체 풀을 사용
+    - 연속 실패가 쌓인 엔드포인트는 unhealthy로 빠지고, health_interval마다 /models로 재확인
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        routes: Optional[Dict[str, str]] = None,
+        health_interval: float = 30.0,
+        health_timeout: float = 3.0,
+        unhealthy_after: int = 2,
+        acquire_timeout: float = 600.0,
+    ):
+        if not endpoints:
+            raise ValueError("❌ 최소 1개의 LLM 엔드포인트가 필요합니다.")
+        self.endpoints = endpoints
+        self.routes = routes or {}
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.unhealthy_after = unhealthy_after
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+
+    # === 라우팅 ===
+    def candidates(self, node: Optional[str] = None) -> List[Endpoint]:
+        """노드 라우팅 규칙에 맞는 후보 엔드포인트 목록"""
+        target = self.routes.get(node) if node else None
+        if target is None:
+            target = self.routes.get("default")
+        if target is None:
+            return self.endpoints
+        matched = [ep for ep in self.endpoints if ep.name == target or target in ep.tags]
+        return matched or self.endpoints
+
+    def _pick(self, cands: List[Endpoint], exclude: Sequence[Endpoint]) -> Optional[Endpoint]:
+        free = [ep for ep in cands if ep not in exclude and ep.outstanding < ep.max_concurrency]
+        healthy = [ep for ep in free if ep.healthy]
+        # 시도할 수 있는 healthy 엔드포인트가 없으면(모두 unhealthy이거나 이미 실패해 제외됨)
+        # 요청을 버리기보다 남은 엔드포인트에 시도 (healthy가 바쁠 뿐이면 대기)
+        pool = healthy or (free if not any(ep.healthy for ep in cands if ep not in exclude) else [])
+        if not pool:
+            return None
+        return min(pool, key=lambda ep: (ep.outstanding / ep.max_concurrency, ep.outstanding))
+
+    @contextmanager
+    def acquire(self, node: Optional[str] = None, exclude: Sequence[Endpoint] = ()) -> Iterator[Endpoint]:
+        """가장 한가한 엔드포인트를 점유 (동시성 상한에 걸리면 대기)"""
+        cands = self.candidates(node)
+        self._recheck_unhealthy(cands)
+
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                ep = self._pick(cands, exclude)
+                if ep is not None:
+                    ep.outstanding += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"LLM 엔드포인트 대기 시간 초과 (node={node})")
+                self._cond.wait(timeout=min(remaining, 1.0))
+        try:
+            yield ep
+        finally:
+            with self._cond:
+                ep.outstanding -= 1
+                self._cond.notify_all()
+
+    # === 헬스 체크 ===
+    def report_success(self, ep: Endpoint):
+        ep.failures = 0
+        ep.healthy = True
+
+    def report_failure(self, ep: Endpoint):
+        ep.failures += 1
+        if ep.failures >= self.unhealthy_after and ep.healthy:
+            ep.healthy = False
+            ep.last_check = time.monotonic()
+            print(f"⚠️ LLM 엔드포인트 비활성화: {ep.name} ({ep.base_url})")
+
+    def check_health(self, ep: Endpoint) -> bool:
+        """GET {base_url}/models 로 엔드포인트 생존 여부 확인"""
+        ep.last_check = time.monotonic()
+        try:
+            r = requests.get(
+                f"{ep.base_url}/models",
+                headers={"Authorization": f"Bearer {ep.token}"},
+                timeout=self.health_timeout,
+            )
+            ok = r.status_code < 500
+        except Exception:
+            ok = False
+        if ok and not ep.healthy:
+            print(f"✅ LLM 엔드포인트 복구: {ep.name} ({ep.base_url})")
+        ep.healthy = ok
+        if ok:
+            ep.failures = 0
+        return ok
+
+    def _recheck_unhealthy(self, cands: List[Endpoint]):
+        now = time.monotonic()
+        for ep in cands:
+            if not ep.healthy and now - ep.last_check >= self.health_interval:
+                self.check_health(ep)
+
+    def check_all(self) -> Dict[str, bool]:
+        return {ep.name: self.check_health(ep) for ep in self.endpoints}
+
+    def start_health_checks(self) -> threading.Thread:
+        """health_interval 주기로 전체 엔드포인트를 점검하는 백그라운드 스레드"""
+        def _loop():
+            while True:
+                self.check_all()
+                time.sleep(self.health_interval)
+
+        t = threading.Thread(target=_loop, name="llm-health-check", daemon=True)
+        t.start()
+        return t
+
+
+def load_pool_from_env(environ, default_endpoint: Endpoint) -> EndpointPool:
+    """
+    환경 변수로 풀 구성
+    - MODEL_ENDPOINTS: JSON 리스트
+      [{"name": "big", "base_url": "...", "model": "...", "token": "...", "max_concurrency": 4, "tags": ["report"]}]
+    - MODEL_ROUTES: JSON 객체 {"노드 이름": "태그 또는 엔드포인트 이름", "default": "..."}
+    """
+    raw = environ.get("MODEL_ENDPOINTS")
+    if raw:
+        endpoints = []
+        for i, spec in enumerate(json.loads(raw)):
+            endpoints.append(Endpoint(
+                name=spec.get("name", f"ep{i}"),
+                base_url=spec["base_url"],
+                model=spec.get("model", default_endpoint.model),
+                token=spec.get("token", default_endpoint.token),
+                max_concurrency=spec.get("max_concurrency", default_endpoint.max_concurrency),
+                tags=spec.get("tags", ()),
+            ))
+    else:
+        endpoints = [default_endpoint]
+
+    routes = json.loads(environ.get("MODEL_ROUTES", "{}"))
+    return EndpointPool(
+        endpoints,
+        routes=routes,
+        health_interval=float(environ.get("MODEL_HEALTH_INTERVAL", 30)),
+    )
@@ -1,7 +1,11 @@
 # core/llm_utils.py
 import os
+import time
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from core.llm_pool import Endpoint, load_pool_from_env
+from core.budget import record_llm_call
+from core.tracing import span
 
 # === ✅ 환경 변수 기반 설정 (없으면 기본값으로 대체) ===
 API_KEY = os.environ.get("MODEL_TOKEN", "token-abc123")
@@ -13,11 +17,48 @@ LLM_BASE = BASE_URL.rstrip("/")  # 혹시 슬래시 중복 방지
 LLM_MODEL = MODEL_NAME
 LLM_TOKEN = API_KEY
 
+# === 멀티 엔드포인트 풀 (MODEL_ENDPOINTS 미설정 시 위 단일 엔드포인트만 사용) ===
+LLM_POOL = load_pool_from_env(
+    os.environ,
+    Endpoint(
+        name="default",
+        base_url=LLM_BASE,
+        model=LLM_MODEL,
+        token=LLM_TOKEN,
+        max_concurrency=int(os.environ.get("MODEL_MAX_CONCURRENCY", 16)),
+    ),
+)
+
+# === 노드가 사용할 LLM 백엔드 (core/models.py 레지스트리 이름) ===
+# 기본 qwen-remote는 위 엔드포인트 풀을 그대로 사용, stand-in / 로컬 hf 모델로 바꿔 GPU·서버 없이 실행 가능
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "qwen-remote")
+
+
+def _call_backend(name: str, messages, temperature, top_p, max_tokens, node) -> Optional[str]:
+    """레지스트리 백엔드 호출 (엔드포인트 풀을 쓰는 원격 기본 백엔드면 None)"""
+    from core.models import MODELS, RemoteBackend
+
+    backend = MODELS.get(name)
+    if isinstance(backend, RemoteBackend) and backend.base_url is None:
+        return None
+
+    t0 = time.perf_counter()
+    try:
+        with span(node or "llm", kind="llm", endpoint=name), MODELS.use(name) as backend:
+            text = backend.chat(messages, temperature=temperature, top_p=top_p, max_tokens=max_tokens).strip()
+        record_llm_call(None, time.perf_counter() - t0, node)
+        return text
+    except Exception as e:
+        record_llm_call(None, time.perf_counter() - t0, node)
+        print(f"⚠️ LLM 호출 실패 ({name}): {e}")
+        return "⚠️ 모델 응답 실패. 다시 시도해주세요."
+
 
 def call_llm(messages: List[Dict[str, str]],
              temperature: float = 0.3,
              top_p: float = 0.9,
-             max_tokens: int = 2000) -> str:
+             max_tokens: int = 2000,
+             node: Optional[str] = None) -> str:
     """
     모든 노드에서 사용할 공통 LLM 호출 유틸
     (LangChain 불필요 — 로컬 Qwen API 직접 호출)
@@ -27,45 +68,81 @@ def call_llm(messages: List[Dict[str, str]],
         temperature: 생성 다양성 조절
         top_p: nucleus sampling
         max_tokens: 최대 토큰 수
+        node: 호출한 노드 이름 (MODEL_ROUTES 라우팅 규칙에 사용)
+        (LLM_BACKEND 환경 변수로 core/models.py의 다른 백엔드를 선택 가능)
 
     Returns:
         LLM이 생성한 문자열 (content)
     """
-    payload = {
-        "model": LLM_MODEL,
-        "messages": messages,
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "top_p": top_p,
-    }
-
-    headers = {
-        "Authorization": f"Bearer {LLM_TOKEN}",
-        "Content-Type": "application/json",
-    }
+    if LLM_BACKEND != "qwen-remote":
+        text = _call_backend(LLM_BACKEND, messages, temperature, top_p, max_tokens, node)
+        if text is not None:
+            return text
 
-    try:
-        # ✅ 반드시 OpenAI 호환 엔드포인트로 요청
-        response = requests.post(
-            f"{LLM_BASE}/chat/completions"
-            if not LLM_BASE.endswith("/v1") else
-            f"{LLM_BASE}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=180
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"].strip()
+    tried = []
+    attempts = min(2, len(LLM_POOL.candidates(node)))
 
-    except Exception as e:
-        print(f"⚠️ LLM 호출 실패: {e}")
-        if "response" in locals():
-            print(f"서버 응답: {response.text}")
-        return "⚠️ 모델 응답 실패. 다시 시도해주세요."
+    for _ in range(attempts):
+        try:
+            with LLM_POOL.acquire(node, exclude=tried) as ep:
+                tried.append(ep)
+                payload = {
+                    "model": ep.model,
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "top_p": top_p,
+                }
+
+                headers = {
+                    "Authorization": f"Bearer {ep.token}",
+                    "Content-Type": "application/json",
+                }
+
+                response = None
+                t0 = time.perf_counter()
+                try:
+                    with span(node or "llm", kind="llm", endpoint=ep.name) as attrs:
+                        # ✅ 반드시 OpenAI 호환 엔드포인트로 요청
+                        response = requests.post(
+                            f"{ep.base_url}/chat/completions",
+                            headers=headers,
+                            json=payload,
+                            timeout=180
+                        )
+                        response.raise_for_status()
+                        data = response.json()
+                        # 응답 파싱까지 성공해야 성공으로 집계 (실패 시 아래 except에서 1회만 기록)
+                        content = data["choices"][0]["message"]["content"].strip()
+                        usage = data.get("usage") or {}
+                        attrs.update(prompt_tokens=usage.get("prompt_tokens"),
+                                     completion_tokens=usage.get("completion_tokens"))
+                    LLM_POOL.report_success(ep)
+                    # ✅ 요청 단위 예산/사용량 집계 (OpenAI 응답의 usage 필드)
+                    record_llm_call(data.get("usage"), time.perf_counter() - t0, node)
+                    return content
+
+                except Exception as e:
+                    record_llm_call(None, time.perf_counter() - t0, node)
+                    print(f"⚠️ LLM 호출 실패 ({ep.name}): {e}")
+                    if response is not None:
+                        print(f"서버 응답: {response.text}")
+                    # 연결 오류/5xx만 엔드포인트 장애로 간주 (4xx는 요청 문제)
+                    if response is None or response.status_code >= 500:
+                        LLM_POOL.report_failure(ep)
+                    else:
+                        break
+        except TimeoutError as e:
+            # 동시성 상한으로 엔드포인트를 확보하지 못함 → 예외 대신 실패 문자열 반환
+            print(f"⚠️ LLM 엔드포인트 확보 실패: {e}")
+            break
+
+    return "⚠️ 모델 응답 실패. 다시 시도해주세요."
 
 
-def simple_chat(prompt: str, system: str = "당신은 건설 안전 지침 전용 어시스턴트입니다.") -> str:
+def simple_chat(prompt: str,
+                system: str = "당신은 건설 안전 지침 전용 어시스턴트입니다.",
+                node: Optional[str] = None) -> str:
     """
     단일 프롬프트용 간단 호출 버전
     (예: rewrite, grader 등에서 간단히 사용 가능)
@@ -74,4 +151,4 @@ def simple_chat(prompt: str, system: str = "당신은 건설 안전 지침 전
         {"role": "system", "content": system},
         {"role": "user", "content": prompt},
     ]
-    return call_llm(messages)
+    return call_llm(messages, node=node)
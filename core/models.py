@@ -0,0 +1,326 @@
+# core/models.py
+"""
+LLM 백엔드 레지스트리 (이름으로 등록, 첫 사용 시 로드, 유휴 시 해제)
+
+백엔드 종류 (모두 chat(messages, temperature, top_p, max_tokens) -> str):
+    remote    OpenAI 호환 서버 (기본: core/llm_utils.py의 엔드포인트 풀)
+    hf        로컬 transformers 모델 (device="cpu"면 GPU 없이 실행, 소형 모델용)
+    stand-in  bench/mock_server.py의 응답 생성기를 프로세스 내에서 직접 사용 (서버 불필요)
+
+기본 등록:
+    qwen-remote   MODEL_BASE_URL / MODEL_NAME (call_llm 기본 경로)
+    kanana        kakaocorp/kanana-1.5-8b-instruct-2505 (KANANA_DEVICE, 기본 cuda:1)
+    qwen-local    Qwen/Qwen3-30B-A3B-GPTQ-Int4 (GPTQ, QWEN_DEVICE, 기본 cuda:0)
+    stand-in      결정적 스탠드인
+
+MODEL_REGISTRY 환경 변수(JSON)로 추가/덮어쓰기:
+    {"small-cpu": {"type": "hf", "model_id": "Qwen/Qwen2.5-0.5B-Instruct", "device": "cpu"},
+     "vllm-b":    {"type": "remote", "base_url": "http://host:8000/v1", "model": "...", "token": "..."}}
+
+사용 예:
+    from core.models import MODELS
+    text = MODELS.chat("kanana", [{"role": "user", "content": "..."}])
+    with MODELS.use("kanana") as backend:   # 여러 번 호출할 때 (블록 안에서는 해제되지 않음)
+        ...
+
+백엔드 수명은 레지스트리가 관리함: 유휴 해제(MODEL_IDLE_UNLOAD_S)는 사용 중(use 블록 안)인
+백엔드를 건너뛰므로, 백엔드나 내부 llm 객체를 블록 밖에서 오래 들고 있지 말 것.
+"""
+import abc
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+
+
+IDLE_UNLOAD_S = float(os.environ.get("MODEL_IDLE_UNLOAD_S", 900))
+
+
+# === 1️⃣ 백엔드 ===
+class ModelBackend(abc.ABC):
+    """공통 인터페이스"""
+    name: str = "?"
+
+    @abc.abstractmethod
+    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.3, top_p: float = 0.9,
+             max_tokens: int = 2000) -> str:
+        """대화 메시지 → 응답 텍스트"""
+
+    def unload(self):
+        """메모리(GPU 포함) 해제 (원격 백엔드는 할 일 없음)"""
+
+
+class RemoteBackend(ModelBackend):
+    """
+    OpenAI 호환 /chat/completions
+    - base_url 미지정 시 core.llm_utils.call_llm (엔드포인트 풀/라우팅/사용량 집계 포함)
+    """
+
+    def __init__(self, name: str, base_url: Optional[str] = None, model: Optional[str] = None,
+                 token: str = "token-abc123", timeout: float = 180):
+        self.name = name
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.model = model
+        self.token = token
+        self.timeout = timeout
+
+    def chat(self, messages, temperature=0.3, top_p=0.9, max_tokens=2000) -> str:
+        if self.base_url is None:
+            from core.llm_utils import call_llm
+            return call_llm(messages, temperature=temperature, top_p=top_p, max_tokens=max_tokens)
+
+        response = requests.post(
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"},
+            json={"model": self.model, "messages": messages, "max_tokens": max_tokens,
+                  "temperature": temperature, "top_p": top_p},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+
+class HFBackend(ModelBackend):
+    """
+    로컬 transformers 모델
+    - loader(device) -> LangChain 채팅/LLM 객체 (ChatHuggingFace, HuggingFacePipeline 등)
+    """
+
+    def __init__(self, name: str, loader: Callable[[str], Any], device: str = "cpu"):
+        self.name = name
+        self.device = device
+        self.llm = loader(device)
+
+    def chat(self, messages, temperature=0.3, top_p=0.9, max_tokens=2000) -> str:
+        # 호출별 생성 파라미터 → HuggingFacePipeline이 pipeline(..., **pipeline_kwargs)로 generate에 전달
+        gen = {"max_new_tokens": max_tokens, "do_sample": temperature > 0, "top_p": top_p}
+        if temperature > 0:
+            gen["temperature"] = temperature
+        out = self.llm.invoke([(m["role"], m["content"]) for m in messages], pipeline_kwargs=gen)
+        return (getattr(out, "content", out) or "").strip()
+
+    def unload(self):
+        self.llm = None
+        try:
+            import gc
+            import torch
+
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+class StandInBackend(ModelBackend):
+    """bench/mock_server.py의 스크립트 응답을 그대로 사용하는 결정적 백엔드 (지연 없음)"""
+
+    def __init__(self, name: str, config: Optional[Dict[str, Any]] = None):
+        from bench.mock_server import MockBackend
+
+        self.name = name
+        self.mock = MockBackend(config)
+
+    def chat(self, messages, temperature=0.3, top_p=0.9, max_tokens=2000) -> str:
+        return self.mock.reply(messages, max_tokens)
+
+
+def _hf_loader(model_id: str, **kwargs) -> Callable[[str], Any]:
+    """일반 transformers 채팅 모델 로더 (CPU 가능)"""
+    def _load(device: str):
+        from core.kanana import make_kanana_llm
+        return make_kanana_llm(model_id=model_id, device=device, **kwargs)
+    return _load
+
+
+def _kanana_loader(device: str):
+    from core.kanana import make_kanana_llm
+    return make_kanana_llm(device=device)
+
+
+def _qwen_local_loader(device: str):
+    from core.qwen import make_qwen_llm
+    return make_qwen_llm(device=device)
+
+
+# === 2️⃣ 레지스트리 ===
+class ModelRegistry:
+    def __init__(self, idle_unload_s: float = IDLE_UNLOAD_S):
+        self.idle_unload_s = idle_unload_s
+        self._factories: Dict[str, Callable[[], ModelBackend]] = {}
+        self._loaded: Dict[str, ModelBackend] = {}
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._reaper: Optional[threading.Thread] = None
+
+    def register(self, name: str, factory: Callable[[], ModelBackend]):
+        """이름 → 백엔드 생성 함수 (호출은 첫 get 시점)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._load_locks.setdefault(name, threading.Lock())
+            stale = self._loaded.pop(name, None)
+            busy = self._in_use.get(name, 0) > 0
+        # 사용 중인 이전 백엔드는 명시적으로 해제하지 않음 (호출이 끝나면 참조가 사라져 회수됨)
+        if stale is not None and not busy:
+            stale.unload()
+
+    def register_spec(self, name: str, spec: Dict[str, Any]):
+        """MODEL_REGISTRY JSON 항목 등록"""
+        kind = spec.get("type", "remote")
+        if kind == "remote":
+            self.register(name, lambda: RemoteBackend(name, spec.get("base_url"), spec.get("model"),
+                                                      spec.get("token", "token-abc123")))
+        elif kind == "hf":
+            loader = _hf_loader(spec["model_id"], **spec.get("generation", {}))
+            self.register(name, lambda: HFBackend(name, loader, spec.get("device", "cpu")))
+        elif kind == "stand-in":
+            self.register(name, lambda: StandInBackend(name, spec.get("config")))
+        else:
+            raise ValueError(f"알 수 없는 모델 백엔드 종류: {kind}")
+
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def loaded(self) -> List[str]:
+        return list(self._loaded)
+
+    def get(self, name: str) -> ModelBackend:
+        """이름으로 백엔드 반환 (처음이면 이때 로드)"""
+        backend = self._loaded.get(name)
+        if backend is None:
+            if name not in self._factories:
+                raise KeyError(f"등록되지 않은 모델: {name} (가능: {self.names()})")
+            with self._load_locks[name]:
+                backend = self._loaded.get(name)
+                if backend is None:
+                    t0 = time.perf_counter()
+                    print(f"📦 모델 로드: {name}")
+                    backend = self._factories[name]()
+                    self._loaded[name] = backend
+                    print(f"✅ 모델 로드 완료: {name} ({time.perf_counter() - t0:.1f}s)")
+            self._start_reaper()
+        self._last_used[name] = time.monotonic()
+        return backend
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[ModelBackend]:
+        """사용 중 표시 후 백엔드 반환 (블록이 끝날 때까지 해제되지 않음, 끝나면 마지막 사용 시각 갱신)"""
+        while True:
+            backend = self.get(name)
+            with self._lock:
+                # get 직후 해제됐을 수 있으므로 같은 객체가 아직 로드돼 있을 때만 점유
+                if self._loaded.get(name) is backend:
+                    self._in_use[name] = self._in_use.get(name, 0) + 1
+                    break
+        try:
+            yield backend
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                self._last_used[name] = time.monotonic()
+
+    def chat(self, name: str, messages: List[Dict[str, str]], **kwargs) -> str:
+        with self.use(name) as backend:
+            return backend.chat(messages, **kwargs)
+
+    def in_use(self, name: str) -> int:
+        return self._in_use.get(name, 0)
+
+    def _pop_if_unused(self, name: str, max_idle_s: Optional[float] = None) -> Optional[ModelBackend]:
+        with self._lock:
+            if self._in_use.get(name, 0) > 0:
+                return None
+            if max_idle_s is not None:
+                last = self._last_used.get(name, time.monotonic())
+                if time.monotonic() - last < max_idle_s:
+                    return None
+            return self._loaded.pop(name, None)
+
+    def unload(self, name: str) -> bool:
+        """해제 (사용 중이거나 등록되지 않은 이름이면 False)"""
+        load_lock = self._load_locks.get(name)
+        if load_lock is None:
+            return False
+        with load_lock:
+            backend = self._pop_if_unused(name)
+        if backend is None:
+            if self.in_use(name):
+                print(f"⏳ 사용 중인 모델은 해제하지 않음: {name}")
+            return False
+        backend.unload()
+        print(f"🧹 모델 해제: {name}")
+        return True
+
+    def unload_idle(self, max_idle_s: Optional[float] = None) -> List[str]:
+        """max_idle_s 동안 사용하지 않은 모델 해제 (사용 중인 모델 제외)"""
+        max_idle_s = self.idle_unload_s if max_idle_s is None else max_idle_s
+        idle = []
+        for name in list(self._loaded):
+            with self._load_locks.get(name, self._lock):
+                backend = self._pop_if_unused(name, max_idle_s)
+            if backend is not None:
+                backend.unload()
+                print(f"🧹 모델 해제 (유휴): {name}")
+                idle.append(name)
+        return idle
+
+    def _start_reaper(self):
+        if self.idle_unload_s <= 0 or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def _loop():
+                while True:
+                    time.sleep(max(1.0, self.idle_unload_s / 4))
+                    self.unload_idle()
+
+            self._reaper = threading.Thread(target=_loop, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+
+class RegistryLLM:
+    """
+    레지스트리 모델의 LangChain 객체 대리자 (core/kanana.py KANANA, core/qwen.py QWEN)
+    - 호출할 때마다 레지스트리에서 현재 백엔드를 꺼내 사용 중으로 표시 → 유휴 해제와 겹치지 않음
+    - 내부 llm 객체를 직접 보관하지 않으므로 해제 후 다음 호출에서 다시 로드 (GPU에 사본 2개가 남지 않음)
+    """
+
+    def __init__(self, registry: "ModelRegistry", name: str):
+        self._registry = registry
+        self._name = name
+
+    def invoke(self, *args, **kwargs):
+        with self._registry.use(self._name) as backend:
+            return backend.llm.invoke(*args, **kwargs)
+
+    def __getattr__(self, attr: str):
+        with self._registry.use(self._name) as backend:
+            value = getattr(backend.llm, attr)
+        if callable(value):
+            def _call(*args, **kwargs):
+                with self._registry.use(self._name) as current:
+                    return getattr(current.llm, attr)(*args, **kwargs)
+            return _call
+        return value
+
+    def __repr__(self) -> str:
+        return f"RegistryLLM({self._name})"
+
+
+MODELS = ModelRegistry()
+
+MODELS.register("qwen-remote", lambda: RemoteBackend("qwen-remote"))
+MODELS.register("kanana", lambda: HFBackend("kanana", _kanana_loader, os.environ.get("KANANA_DEVICE", "cuda:1")))
+MODELS.register("qwen-local", lambda: HFBackend("qwen-local", _qwen_local_loader, os.environ.get("QWEN_DEVICE", "cuda:0")))
+MODELS.register("stand-in", lambda: StandInBackend("stand-in"))
+
+for _name, _spec in json.loads(os.environ.get("MODEL_REGISTRY") or "{}").items():
+    MODELS.register_spec(_name, _spec)
@@ -0,0 +1,209 @@
+# core/profiling.py
+"""
+노드/리트리버 단계 온디맨드 프로파일링 (기본 꺼짐)
+
+켜는 방법:
+    - 환경 변수  PROFILE_NODES=generate,rerank    ("*" = 전체 노드/단계)
+    - 요청 단위  state["meta"]["profile"] = True 또는 ["confirm_retrieval", ...]
+                 (make_init_state(..., profile=...), 서비스 요청 body의 "profile")
+
+대상 블록마다 PROFILE_DIR/<case_id>/ 아래에 저장:
+    <iter>-<name>.prof        cProfile 덤프 (snakeviz, pstats로 열람)
+    <iter>-<name>.collapsed   샘플링 스택 (flamegraph.pl / speedscope 입력 형식)
+    <iter>-<name>.html        pyinstrument 설치 시 HTML 리포트
+그리고 PROFILE_DIR/profiles.jsonl 에 블록별 wall time / tracemalloc peak 기록
+
+주의:
+    - cProfile은 프로세스 전체에서 한 번에 하나만 활성화할 수 있어, 동시에 실행 중인
+      다른 블록이 있으면 해당 블록은 샘플링/메모리만 기록
+    - 샘플링은 블록을 실행한 스레드만 대상 (grader 병렬 스레드는 각자의 span에서 기록)
+    - tracemalloc peak은 프로세스 전역 값이므로 동시 실행 중에는 상한 추정치
+"""
+import contextlib
+import contextvars
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, Set, Union
+
+
+PROFILE_NODES = {n.strip() for n in os.environ.get("PROFILE_NODES", "").split(",") if n.strip()}
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles"),
+)
+SAMPLE_INTERVAL_S = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_S", 0.005))
+
+try:  # 선택 의존성
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:
+    _Pyinstrument = None
+
+# 요청 단위 프로파일 대상 (state["meta"]["profile"])
+_requested: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("profile_requested", default=None)
+
+_cprofile_lock = threading.Lock()
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_log_lock = threading.Lock()
+
+
+def _targets(spec: Union[bool, str, list, tuple, set, None]) -> Optional[Set[str]]:
+    if not spec:
+        return None
+    if spec is True:
+        return {"*"}
+    if isinstance(spec, str):
+        return {n.strip() for n in spec.split(",") if n.strip()}
+    return {str(n) for n in spec}
+
+
+@contextlib.contextmanager
+def request_scope(spec) -> Iterator[None]:
+    """요청(state["meta"]["profile"])에서 지정한 대상을 현재 컨텍스트에 설정"""
+    targets = _targets(spec)
+    if targets is None:
+        yield
+        return
+    token = _requested.set(targets)
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+def enabled_for(name: str) -> bool:
+    requested = _requested.get() or set()
+    return bool({"*", name} & (PROFILE_NODES | requested))
+
+
+# === 1️⃣ 표준 라이브러리 샘플링 프로파일러 ===
+class _StackSampler(threading.Thread):
+    """대상 스레드의 스택을 주기적으로 읽어 collapsed stack 카운트로 누적"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_S):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# === 2️⃣ tracemalloc (여러 블록이 겹쳐도 마지막 블록이 끝날 때만 중지) ===
+def _tracemalloc_acquire():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _tracemalloc_release() -> int:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+        return peak
+
+
+# === 3️⃣ 블록 프로파일링 ===
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+@contextlib.contextmanager
+def profile_block(name: str, case_id: Optional[str] = None, iteration: int = 0) -> Iterator[None]:
+    """
+    name이 프로파일 대상이면 cProfile + 샘플링 + tracemalloc을 붙여 실행
+    (대상이 아니면 아무것도 하지 않음)
+    """
+    if not enabled_for(name):
+        yield
+        return
+
+    out_dir = os.path.join(PROFILE_DIR, _safe(case_id or "no-case"))
+    os.makedirs(out_dir, exist_ok=True)
+    prefix = os.path.join(out_dir, f"{iteration:02d}-{_safe(name)}")
+
+    profiler = cProfile.Profile() if _cprofile_lock.acquire(blocking=False) else None
+    sampler = _StackSampler(threading.get_ident())
+    pyi = _Pyinstrument(async_mode="disabled") if _Pyinstrument is not None else None
+    base_mem = _tracemalloc_acquire()
+
+    t0 = time.perf_counter()
+    try:
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # 다른 프로파일러(sys.setprofile / sys.monitoring)가 이미 활성
+                _cprofile_lock.release()
+                profiler = None
+        if pyi is not None:
+            pyi.start()
+        sampler.start()
+        yield
+    finally:
+        wall = time.perf_counter() - t0
+        sampler.stop()
+        if pyi is not None:
+            pyi.stop()
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+        peak = _tracemalloc_release()
+
+        files = {}
+        if profiler is not None:
+            profiler.dump_stats(prefix + ".prof")
+            files["cprofile"] = prefix + ".prof"
+        if sampler.stacks:
+            sampler.write_collapsed(prefix + ".collapsed")
+            files["collapsed"] = prefix + ".collapsed"
+        if pyi is not None:
+            with open(prefix + ".html", "w", encoding="utf-8") as f:
+                f.write(pyi.output_html())
+            files["html"] = prefix + ".html"
+
+        record: Dict[str, Any] = {
+            "case_id": case_id,
+            "iteration": iteration,
+            "name": name,
+            "wall_s": round(wall, 6),
+            "samples": sum(sampler.stacks.values()),
+            "peak_mem_bytes": max(0, peak - base_mem),
+            "files": files,
+        }
+        with _log_lock:
+            with open(os.path.join(PROFILE_DIR, "profiles.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"🔬 프로파일 저장: {name} ({wall:.2f}s, peak {record['peak_mem_bytes'] / 2**20:.1f} MiB) → {prefix}.*")
@@ -1,27 +1,23 @@
 # 우리 : 공사종류(대분류) + 공종(중분류) + 작업프로세스 + 사고원인 조합
 # A3 : 공사종류(대분류) + 공종(중분류) + 사고원인 조합
 
-import pandas as pd
+# 하위 호환용 모듈: 실제 로드/캐시는 core/dataset.py 가 담당하며,
+# 아래 이름을 처음 참조할 때만 CSV(또는 parquet 캐시)를 읽는다.
+#   train, test            : 원본 CSV DataFrame (원래 열 이름)
+#   data_train             : process / construct_type / object_type / reason / situation
+#   query                  : Train 입력 데이터 (situation 리스트)
+#   construct_type_query   : pdf 뽑아낼 "공종(중분류)" 리스트
 
-train = pd.read_csv('/home/user/Desktop/jiseok/capstone/RAG/construction-safety-agent/data/train_preprocessing.csv')
-test = pd.read_csv('/home/user/Desktop/jiseok/capstone/RAG/construction-safety-agent/data/test_preprocessing.csv')
 
-data_train = train.apply(
-    lambda row: {
-        "process": row["작업프로세스"],
-        "construct_type": row["공종(중분류)"],
-        "object_type": row["사고객체(중분류)"],
-        "reason": row["사고원인"],
-        "situation": f"'{row['공사종류(대분류)']}' 공사 중 '{row['공종(중분류)']}'의 '{row['작업프로세스']}' 과정에서 '{row['사고원인']}'으로 인해 사고가 발생하였습니다.",
-    },
-    axis=1
-)
+def __getattr__(name: str):
+    from core import dataset
 
-# DataFrame으로 변환
-data_train = pd.DataFrame(list(data_train))
-
-# Train 입력 데이터 설정
-query = data_train["situation"].tolist()  # 질문 데이터 리스트로 변환
-
-# pdf 뽑아낼 construct_type_query 설정
-construct_type_query = data_train["construct_type"].tolist()  # "공종(중분류)"을 construct_type_query로 사용
\ No newline at end of file
+    if name in ("train", "test"):
+        return dataset.load_raw(name)
+    if name == "data_train":
+        return dataset.load_cases("train")[["process", "construct_type", "object_type", "reason", "situation"]]
+    if name == "query":
+        return dataset.situations("train")
+    if name == "construct_type_query":
+        return dataset.load_cases("train")["construct_type"].tolist()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
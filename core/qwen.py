@@ -1,25 +1,30 @@
 # qwen.py
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
-
-from transformers import AutoTokenizer
-from auto_gptq import AutoGPTQForCausalLM   # GPTQ ���� �δ�
-
 QWEN_ID = "Qwen/Qwen3-30B-A3B-GPTQ-Int4"
 
-def make_qwen_llm(model_id=QWEN_ID):
+def make_qwen_llm(model_id=QWEN_ID, device="cuda:0"):
+    # GPTQ 모델은 실제로 만들 때만 import (import 시점 비용 제거)
+    import torch
+    from transformers import AutoTokenizer, pipeline
+    from langchain_huggingface import HuggingFacePipeline
+    from auto_gptq import AutoGPTQForCausalLM   # GPTQ 모델 로더
+
     tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
     model = AutoGPTQForCausalLM.from_quantized(
         model_id,
-        device="cuda:0",
+        device=device,
         trust_remote_code=True,
         use_safetensors=True,
      )
     
-    # pipeline ���� (langchain-huggingface�� ȣȯ)
+    # pipeline 생성 (langchain-huggingface와 호환)
    
-    pipe = pipeline("text-generation", model=model, tokenizer=tokenizer, device=0)
+    pipe = pipeline("text-generation", model=model, tokenizer=tokenizer, device=torch.device(device))
     return HuggingFacePipeline(pipeline=pipe)
 
-QWEN = make_qwen_llm()
+
+# ✅ QWEN: 레지스트리 모델 대리자 (처음 호출할 때 로드, 수명은 core/models.py 레지스트리가 관리)
+def __getattr__(name: str):
+    if name == "QWEN":
+        from core.models import MODELS, RegistryLLM
+        return RegistryLLM(MODELS, "qwen-local")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
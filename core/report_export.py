@@ -0,0 +1,282 @@
+# core/report_export.py
+"""
+보고서 Word(.docx) 내보내기 (배치용)
+
+- 완료된 결과(batch.run_case 레코드)를 큐로 받아 워커 프로세스에서 병렬로 .docx 작성
+- 템플릿(.docx)은 워커마다 1회만 열어 두고 보고서마다 본문만 채워 저장 (스타일 id도 1회 조회)
+- 보고서 텍스트는 1회 파싱해 블록(제목/목록/문단) 목록으로 만든 뒤 그대로 렌더링
+  (마크다운 '#' 제목, 표준 목차 제목 줄, '-'/'•' 글머리, '1.'/'①'/'(1)' 번호, '**굵게**')
+- 선택: 작성된 파일을 zip 하나로 묶음
+
+사용 예 (배치 결과 JSONL에서 내보내기):
+    python -m core.report_export results/batch_results.jsonl --output-dir reports --zip reports.zip --workers 4
+
+배치 실행 중 내보내기:
+    python batch.py --export-dir reports --export-zip reports.zip
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from docx import Document
+
+
+REPORT_TITLE = "건설 사고 재발 방지 대책 보고서"
+REPORT_TEMPLATE = os.environ.get("REPORT_TEMPLATE")  # 미지정 시 python-docx 기본 템플릿
+EXPORT_WORKERS = int(os.environ.get("REPORT_EXPORT_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+
+Block = Tuple[str, int, str]  # (종류, 수준, 텍스트) 종류: heading / bullet / number / para
+
+
+# === 1️⃣ 파싱 ===
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_SUB_HEADING = re.compile(r"^\d+\.\d+\.?\s+\S")
+_BULLET = re.compile(r"^(?:[-*•·○▪]|□)\s+(.*)$")
+_NUMBERED = re.compile(r"^(?:\(\d+\)|\d+[.)]|[①-⑳])\s*(.*)$")
+_TABLE_RULE = re.compile(r"^\|?\s*:?-{3,}")
+_HEADING_MAX_CHARS = 40
+
+
+def _is_section_title(line: str) -> bool:
+    """'1. 사고 개요' 같은 표준 목차 제목 줄인지 (그 외 '1. …' 줄은 번호 목록)"""
+    from core.final_report import SECTION_TITLES  # 목차 정의는 보고서 생성 모듈이 원본
+
+    return line.strip().strip("*").strip().rstrip(":").strip() in SECTION_TITLES
+
+
+def parse_report(text: str) -> List[Block]:
+    """보고서 텍스트 → 블록 목록 (빈 줄/표 구분선 제외)"""
+    blocks: List[Block] = []
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line or _TABLE_RULE.match(line):
+            continue
+        m = _MD_HEADING.match(line)
+        if m:
+            blocks.append(("heading", min(len(m.group(1)), 3), m.group(2).strip("# ")))
+            continue
+        short = len(line) <= _HEADING_MAX_CHARS and not line.endswith(("다.", "다", "요."))
+        if short and _SUB_HEADING.match(line):
+            blocks.append(("heading", 2, line))
+            continue
+        if _is_section_title(line):
+            blocks.append(("heading", 1, line.replace("**", "").strip().rstrip(":")))
+            continue
+        m = _BULLET.match(line)
+        if m:
+            blocks.append(("bullet", 1 if raw[:1] in (" ", "\t") else 0, m.group(1)))
+            continue
+        m = _NUMBERED.match(line)
+        if m:
+            blocks.append(("number", 0, line))
+            continue
+        blocks.append(("para", 0, line))
+    return blocks
+
+
+# === 2️⃣ 렌더링 (워커 프로세스) ===
+# 워커마다 템플릿 Document를 1회 파싱해 두고, 보고서마다 본문만 채워 저장한 뒤 되돌림
+# (보고서마다 .docx 패키지를 다시 여는 비용 제거)
+_TEMPLATE_DOC = None
+_STYLE_IDS: Dict[str, str] = {}  # 스타일 이름 → id (문단마다 이름 조회 반복 방지)
+_RENDER_LOCK = threading.Lock()  # 같은 프로세스에서 write_docx를 동시에 호출하는 경우 대비
+
+
+def _init_worker(template_path: Optional[str]):
+    """워커 시작 시 템플릿을 1회 로드"""
+    global _TEMPLATE_DOC, _STYLE_IDS
+    _TEMPLATE_DOC = Document(template_path) if template_path else Document()
+    _STYLE_IDS = {s.name: s.style_id for s in _TEMPLATE_DOC.styles}
+
+
+def _add_paragraph(doc, text: str, style: str):
+    """문단 추가 ('**굵게**' 구간은 굵은 run, 템플릿에 없는 스타일은 기본 문단)"""
+    if "**" not in text:
+        paragraph = doc.add_paragraph(text)
+    else:
+        paragraph = doc.add_paragraph()
+        for i, part in enumerate(text.split("**")):
+            if part:
+                paragraph.add_run(part).bold = (i % 2 == 1)
+    style_id = _STYLE_IDS.get(style)
+    if style_id:
+        paragraph._p.style = style_id
+    return paragraph
+
+
+def render_docx(blocks: List[Block], path: str, title: str = REPORT_TITLE,
+                meta: Optional[Dict[str, str]] = None) -> str:
+    with _RENDER_LOCK:
+        if _TEMPLATE_DOC is None:
+            _init_worker(REPORT_TEMPLATE)
+        doc = _TEMPLATE_DOC
+        body = doc.element.body
+        original = set(body)
+        props = doc.core_properties
+        props.title = title
+        props.subject = (meta or {}).get("id", "")
+        props.comments = (meta or {}).get("situation", "")
+        try:
+            _add_paragraph(doc, title, "Title")
+            for kind, level, text in blocks:
+                if kind == "heading":
+                    _add_paragraph(doc, text.replace("**", ""), f"Heading {level}")
+                elif kind == "bullet":
+                    _add_paragraph(doc, text, "List Bullet 2" if level else "List Bullet")
+                elif kind == "number":
+                    _add_paragraph(doc, text, "List Number")
+                else:
+                    _add_paragraph(doc, text, "Normal")
+
+            tmp = path + ".tmp"
+            doc.save(tmp)
+            os.replace(tmp, path)
+        finally:
+            # 템플릿 원래 본문만 남김
+            for child in list(body):
+                if child not in original:
+                    body.remove(child)
+    return path
+
+
+def _export_one(text: str, path: str, title: str, meta: Dict[str, str]) -> str:
+    return render_docx(parse_report(text), path, title=title, meta=meta)
+
+
+def write_docx(report_text: str, path: str, title: str = REPORT_TITLE) -> str:
+    """보고서 1건을 현재 프로세스에서 바로 저장 (대화형 실행용)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return render_docx(parse_report(report_text), path, title=title)
+
+
+# === 3️⃣ 큐 기반 내보내기 ===
+_SAFE_NAME = re.compile(r"[^\w.-]+")
+
+
+def report_filename(case_id: str) -> str:
+    return f"{_SAFE_NAME.sub('_', str(case_id)).strip('_') or 'report'}.docx"
+
+
+class ReportExporter:
+    """
+    결과 레코드 큐 → 워커 프로세스 풀에서 .docx 작성
+    - submit(record): 배치 워커 스레드에서 호출 (블로킹 최소화, 큐가 가득 차면 대기)
+    - close(): 남은 작업 완료 대기 후 (선택) zip 생성, 요약 반환
+    """
+
+    def __init__(self, output_dir: str, workers: int = EXPORT_WORKERS, zip_path: Optional[str] = None,
+                 template: Optional[str] = REPORT_TEMPLATE, title: str = REPORT_TITLE, max_queue: int = 256):
+        self.output_dir = output_dir
+        self.zip_path = zip_path
+        self.title = title
+        os.makedirs(output_dir, exist_ok=True)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template,))
+        self._futures: List[Tuple[str, Future]] = []
+        self._written: List[str] = []
+        self._failed: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._consumer = threading.Thread(target=self._consume, name="report-export", daemon=True)
+        self._consumer.start()
+
+    def submit(self, record: Dict[str, Any]):
+        """status=ok 이고 보고서가 있는 레코드만 내보냄"""
+        if record.get("status", "ok") == "ok" and record.get("report"):
+            self._queue.put(record)
+
+    def _consume(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            # 제출 실패(워커 풀 손상 등)로 소비 스레드가 죽으면 큐가 차서 submit()이 영원히 대기하므로 실패로 기록하고 계속
+            try:
+                path = os.path.join(self.output_dir, report_filename(record["id"]))
+                meta = {"id": str(record["id"]), "situation": record.get("situation") or ""}
+                future = self._pool.submit(_export_one, record["report"], path, self.title, meta)
+            except Exception as e:
+                with self._lock:
+                    self._failed.append((record["id"], f"{type(e).__name__}: {e}"))
+                print(f"⚠️ 보고서 내보내기 제출 실패 ({record['id']}): {e}")
+                continue
+            with self._lock:
+                self._futures.append((record["id"], future))
+            future.add_done_callback(lambda f, cid=record["id"]: self._done(cid, f))
+
+    def _done(self, case_id: str, future: Future):
+        with self._lock:
+            try:
+                self._written.append(future.result())
+            except Exception as e:
+                self._failed.append((case_id, f"{type(e).__name__}: {e}"))
+                print(f"⚠️ 보고서 내보내기 실패 ({case_id}): {e}")
+
+    def close(self) -> Dict[str, Any]:
+        self._queue.put(None)
+        self._consumer.join()
+        self._pool.shutdown(wait=True)
+
+        written = sorted(self._written)
+        if self.zip_path and written:
+            os.makedirs(os.path.dirname(os.path.abspath(self.zip_path)), exist_ok=True)
+            # .docx는 이미 압축된 형식이므로 재압축하지 않음
+            with zipfile.ZipFile(self.zip_path, "w", compression=zipfile.ZIP_STORED) as zf:
+                for path in written:
+                    zf.write(path, arcname=os.path.basename(path))
+
+        spent = time.perf_counter() - self._t0
+        summary = {
+            "written": len(written),
+            "failed": len(self._failed),
+            "seconds": round(spent, 3),
+            "reports_per_s": round(len(written) / spent, 2) if spent > 0 else None,
+            "output_dir": self.output_dir,
+            "zip": self.zip_path if self.zip_path and written else None,
+        }
+        print(f"📄 보고서 내보내기 완료: {summary['written']}건 ({summary['failed']}건 실패), "
+              f"{summary['seconds']}s, {summary['reports_per_s']}건/s")
+        return summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_jsonl(results_path: str, output_dir: str, workers: int = EXPORT_WORKERS,
+                 zip_path: Optional[str] = None, template: Optional[str] = REPORT_TEMPLATE) -> Dict[str, Any]:
+    """배치 결과 JSONL → .docx (같은 ID가 여러 번 있으면 마지막 레코드)"""
+    latest: Dict[str, Dict[str, Any]] = {}
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                latest[rec["id"]] = rec
+    exporter = ReportExporter(output_dir, workers=workers, zip_path=zip_path, template=template)
+    for rec in latest.values():
+        exporter.submit(rec)
+    return exporter.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="배치 결과 보고서 Word 내보내기")
+    parser.add_argument("results", help="batch.py 결과 JSONL")
+    parser.add_argument("--output-dir", default="./reports")
+    parser.add_argument("--zip", default=None, help="결과 .docx를 묶을 zip 경로")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS)
+    parser.add_argument("--template", default=REPORT_TEMPLATE, help="기반 .docx 템플릿 (스타일/머리글 등)")
+    args = parser.parse_args()
+    export_jsonl(args.results, args.output_dir, workers=args.workers, zip_path=args.zip, template=args.template)
+
+
+if __name__ == "__main__":
+    main()
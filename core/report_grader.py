@@ -1,36 +1,133 @@
 # core/report_grader.py
+import json
 import re
 from core.llm_utils import call_llm  # ✅ 공용 LLM 호출 유틸 사용
+from core.budget import budget_exhausted
+from core.final_report import REPORT_MAX_REPAIRS, split_report_sections
 
-def grade_report_quality(state: dict) -> str:
+
+def _verdict_of(raw: str) -> str:
     """
-    생성된 보고서의 품질을 평가하는 함수 (Qwen 기반)
+    LLM 응답 → "adequate" / "insufficient"
+    - "verdict" 값이 있으면 그 값으로 판정
+    - 없으면 부정어(insufficient/inadequate)가 하나라도 있을 때 insufficient ("inadequate"가 adequate로 읽히지 않게)
     """
-    report = state.get("report") or state.get("candidate_answer", "")
-    if not report:
+    text = (raw or "").lower()
+    m = re.search(r'"verdict"\s*:\s*"([^"]*)"', text)
+    if m:
+        text = m.group(1)
+    if re.search(r"\b(?:insufficient|inadequate)\b", text):
         return "insufficient"
+    if re.search(r"\badequate\b", text):
+        return "adequate"
+    return "insufficient"
 
+
+def _grade_whole(report: str) -> dict:
+    """섹션 구분이 없는 보고서: 전체 1회 판정 (기존 방식)"""
     question = (
         "다음 건설안전 보고서가 충분히 완전한가? "
         "주요 항목(사고 개요, 위험 요인, 즉시 조치, 관련 규정)이 모두 다뤄졌는지 평가하라. "
         "부족하면 'insufficient', 충분하면 'adequate'로만 JSON 형식으로 출력하라. "
         "예시: {\"verdict\": \"adequate\"}"
     )
-
-    # ✅ LLM 호출 (공용 함수 사용)
     messages = [
         {"role": "system", "content": "당신은 건설안전 보고서 품질 평가자입니다."},
         {"role": "user", "content": f"{question}\n\n보고서:\n{report}"}
     ]
-    raw = call_llm(messages)
-
-    # ✅ 결과 파싱
-    if re.search(r"adequate", raw.lower()):
-        verdict = "adequate"
-    elif re.search(r"insufficient", raw.lower()):
-        verdict = "insufficient"
-    else:
-        verdict = "insufficient"
-
-    print(f"🧾 보고서 품질 평가 결과: {verdict.upper()}")
-    return verdict
+    raw = call_llm(messages, node="report_grader")
+    return {"verdict": _verdict_of(raw), "sections": []}
+
+
+def _grade_sections(report: str, sections: list) -> dict:
+    """섹션별 판정 (LLM 호출 1회, 응답에 없는 섹션은 adequate)"""
+    outline = "\n".join(f"{i}. {sec['title']}" for i, sec in enumerate(sections, start=1))
+    question = (
+        "다음 건설안전 보고서의 각 섹션이 충분히 완전한지 섹션 번호별로 평가하라. "
+        "보고서 전체에서 주요 항목(사고 개요, 위험 요인, 즉시 조치, 관련 규정)이 빠졌거나 근거가 부족하면 "
+        "가장 관련 있는 섹션을 'insufficient'로 표시하고 reason에 보강할 내용을 한 문장으로 적어라. "
+        "나머지는 'adequate'로 표시하라. JSON 형식으로만 출력하라. "
+        "예시: {\"sections\": [{\"index\": 1, \"verdict\": \"adequate\", \"reason\": \"\"}]}"
+    )
+    messages = [
+        {"role": "system", "content": "당신은 건설안전 보고서 품질 평가자입니다."},
+        {"role": "user", "content": f"{question}\n\n섹션 목록:\n{outline}\n\n보고서:\n{report}"}
+    ]
+    raw = call_llm(messages, node="report_grader")
+
+    m = re.search(r"\{.*\}", raw or "", re.S)
+    try:
+        data = json.loads(m.group(0)) if m else None
+    except json.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict) or "sections" not in data:
+        # 섹션별 판정을 못 읽으면 전체 판정으로 처리 (부족 시 기존 웹 보강 경로)
+        return {"verdict": _verdict_of(raw), "sections": []}
+
+    judged = {}
+    for item in data.get("sections") or []:
+        try:
+            judged[int(item["index"])] = item
+        except (KeyError, TypeError, ValueError):
+            continue
+    results = []
+    for i, sec in enumerate(sections, start=1):
+        item = judged.get(i, {})
+        results.append({
+            "index": i,
+            "title": sec["title"],
+            "verdict": _verdict_of(str(item.get("verdict", "adequate"))),
+            "reason": str(item.get("reason") or ""),
+        })
+    ok = all(r["verdict"] == "adequate" for r in results)
+    return {"verdict": "adequate" if ok else "insufficient", "sections": results}
+
+
+def grade_report(state: dict) -> dict:
+    """
+    생성된 보고서의 품질을 평가하는 노드 (Qwen 기반)
+    - 섹션('## 제목' / '1. 제목')이 2개 이상이면 섹션별 판정 → 부족한 섹션만 repair_report에서 재생성
+    - 결과는 state["report_review"]에 저장하고 route_report가 다음 경로 결정
+    """
+    report = state.get("report") or state.get("candidate_answer", "")
+    if not report:
+        return {"report_review": {"verdict": "insufficient", "sections": []}}
+
+    # ✅ 예산 소진 시 보강 루프로 돌아가지 않음
+    reason = budget_exhausted(state)
+    if reason:
+        print(f"⏱️ 예산 소진({reason}) → 보고서 보강 생략")
+        return {"report_review": {"verdict": "adequate", "sections": [], "skipped": reason}}
+
+    _, sections = split_report_sections(report)
+    review = _grade_sections(report, sections) if len(sections) >= 2 else _grade_whole(report)
+
+    weak = [s["title"] for s in review["sections"] if s["verdict"] == "insufficient"]
+    print(f"🧾 보고서 품질 평가 결과: {review['verdict'].upper()}" + (f" (부족: {weak})" if weak else ""))
+    return {"report_review": review}
+
+
+def route_report(state: dict) -> str:
+    """
+    채점 결과 → 다음 경로
+    - adequate: 종료
+    - repair: 부족한 섹션만 보강 (REPORT_MAX_REPAIRS회까지, 이후엔 종료)
+    - insufficient: 섹션 판정이 없을 때 기존 경로(웹검색 → 재생성)
+    """
+    review = state.get("report_review") or {}
+    if review.get("verdict") == "adequate":
+        return "adequate"
+    _, sections = split_report_sections(state.get("report") or "")
+    # 현재 보고서에 있는 섹션 번호만 보강 대상 (범위 밖 번호만 있으면 repair_report가 할 일이 없음)
+    if any(s["verdict"] == "insufficient" and 1 <= s.get("index", 0) <= len(sections)
+           for s in review.get("sections", [])):
+        if state.get("report_repairs", 0) >= REPORT_MAX_REPAIRS:
+            print(f"⏹️ 섹션 보강 {REPORT_MAX_REPAIRS}회 도달 → 현재 보고서로 종료")
+            return "adequate"
+        return "repair"
+    return "insufficient"
+
+
+def grade_report_quality(state: dict) -> str:
+    """보고서 전체 판정만 필요할 때 ('adequate' / 'insufficient')"""
+    return grade_report(state)["report_review"]["verdict"]
@@ -0,0 +1,385 @@
+# core/reranker.py
+"""
+Cross-Encoder 리랭커 백엔드 (RerankRetriever.cross_encoder)
+
+RERANKER_BACKEND:
+    hf          langchain HuggingFaceCrossEncoder (기존 방식, fp32 PyTorch) — 기본값
+    torch       transformers fp32 + 길이순 배치/동적 패딩
+    torch-int8  위 모델의 Linear 층 동적 int8 양자화 (torch.quantization.quantize_dynamic)
+    onnx        onnxruntime (RERANKER_ONNX_DIR에 model.onnx가 없으면 1회 export)
+    onnx-int8   onnxruntime + 동적 int8 양자화 모델 (model.int8.onnx, 없으면 1회 생성)
+
+공통 옵션:
+    RERANKER_THREADS     intra-op 스레드 수 (0 = 라이브러리 기본값)
+    RERANKER_BATCH_SIZE  배치 크기 (길이가 비슷한 쌍끼리 묶어 배치마다 가장 긴 쌍에 맞춰 패딩)
+    RERANKER_MAX_LENGTH  (질의, 본문) 쌍 최대 토큰 수
+
+점수는 HuggingFaceCrossEncoder와 같이 sigmoid(logit) (0~1, confirm_retrieval 임계값 기준).
+hf 이외 백엔드는 청크 토큰 캐시(core/token_cache.py)가 있으면 질의만 토큰화 (score_query).
+
+도입 전 일치도 확인 (fp32 hf 대비 질의별 Spearman 순위 상관, top-1 일치율, 속도):
+    python -m core.reranker check --backend onnx-int8 --queries 50
+"""
+import abc
+import argparse
+import os
+import threading
+import time
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+RERANKER_BACKEND = os.environ.get("RERANKER_BACKEND", "hf")
+RERANKER_THREADS = int(os.environ.get("RERANKER_THREADS", 0))
+RERANKER_BATCH_SIZE = int(os.environ.get("RERANKER_BATCH_SIZE", 16))
+RERANKER_MAX_LENGTH = int(os.environ.get("RERANKER_MAX_LENGTH", 512))
+RERANKER_DEVICE = os.environ.get("RERANKER_DEVICE", "cpu")
+RERANKER_ONNX_DIR = os.environ.get(
+    "RERANKER_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "reranker-onnx"),
+)
+
+# 도입 기준 (check 명령)
+MIN_SPEARMAN = float(os.environ.get("RERANKER_MIN_SPEARMAN", 0.95))
+MIN_TOP1_AGREEMENT = float(os.environ.get("RERANKER_MIN_TOP1", 0.90))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# === 1️⃣ 배치 실행 공통 ===
+class BatchedCrossEncoder(abc.ABC):
+    """
+    (질의, 본문) 쌍 점수 계산
+    - 토큰화 후 길이순 정렬 → batch_size씩 묶어 배치별 최장 길이에 맞춰 패딩 → 원래 순서로 복원
+    - 하위 클래스는 _logits(batch: dict[str, np.ndarray]) -> np.ndarray 구현
+    """
+    name = "?"
+
+    def __init__(self, model_name: str, batch_size: int = RERANKER_BATCH_SIZE,
+                 max_length: int = RERANKER_MAX_LENGTH):
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._lock = threading.Lock()  # 세션/모델 1개를 여러 스레드가 공유
+
+    @abc.abstractmethod
+    def _logits(self, batch: Dict[str, np.ndarray]) -> np.ndarray:
+        """패딩된 배치 → (배치 크기, 1) 또는 (배치 크기, 클래스 수) logit"""
+
+    def encode(self, pairs: Sequence[Tuple[str, str]]) -> List[Dict[str, List[int]]]:
+        """쌍 → 패딩 없는 토큰 특징 (input_ids, attention_mask 등)"""
+        enc = self.tokenizer(
+            [q for q, _ in pairs], [t for _, t in pairs],
+            truncation=True, max_length=self.max_length, padding=False,
+        )
+        keys = list(enc.keys())
+        return [{k: enc[k][i] for k in keys} for i in range(len(pairs))]
+
+    def score_features(self, features: List[Dict[str, List[int]]]) -> List[float]:
+        if not features:
+            return []
+        order = sorted(range(len(features)), key=lambda i: len(features[i]["input_ids"]))
+        scores = np.empty(len(features), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad([features[i] for i in idx], padding="longest", return_tensors="np")
+            with self._lock:
+                logits = self._logits({k: np.asarray(v, dtype=np.int64) for k, v in batch.items()})
+            logits = np.asarray(logits, dtype=np.float32)
+            scores[idx] = _sigmoid(logits[:, 0] if logits.ndim == 2 and logits.shape[1] == 1
+                                   else logits.reshape(len(idx), -1)[:, -1])
+        return scores.tolist()
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """HuggingFaceCrossEncoder.score와 같은 인터페이스"""
+        return self.score_features(self.encode(pairs))
+
+    def pair_features(self, query_ids: List[int], doc_ids: List[int]) -> Dict[str, List[int]]:
+        """
+        미리 토큰화한 질의/본문 id → 쌍 입력 (fast 토크나이저의 tokenizer(q, d, truncation=True)와 같은 결과)
+        - longest_first 절단 (tokenizers TruncationStrategy::LongestFirst):
+          긴 쪽만 잘라 맞출 수 있으면 긴 쪽만 자르고, 둘 다 잘라야 하면
+          짧은 쪽(길이가 같으면 질의)이 budget // 2, 긴 쪽이 나머지를 가짐
+        - 어느 쪽이 긴지가 결과를 바꾸므로 긴 쪽만 max_length에서 잘린 id여야 함
+          (둘 다 잘린 id면 길이 비교가 달라질 수 있음)
+        """
+        tok = self.tokenizer
+        budget = self.max_length - tok.num_special_tokens_to_add(pair=True)
+        a, b = len(query_ids), len(doc_ids)
+        if a + b > budget:
+            short, long_ = min(a, b), max(a, b)
+            long_ = short if short > budget else max(short, budget - short)
+            if short + long_ > budget:
+                short, long_ = budget // 2, budget - budget // 2
+            a, b = (long_, short) if a > b else (short, long_)
+        q, d = list(query_ids[:a]), list(doc_ids[:b])
+        input_ids, type_ids = [], []
+        for seq, token, type_id in self._pair_layout:
+            ids = [token] if seq is None else (q if seq == 0 else d)
+            input_ids.extend(ids)
+            type_ids.extend([type_id] * len(ids))
+        feat = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+        if "token_type_ids" in tok.model_input_names:
+            feat["token_type_ids"] = type_ids
+        return feat
+
+    @cached_property
+    def _pair_layout(self) -> List[Tuple[Optional[int], Optional[int], int]]:
+        """
+        쌍 입력의 특수 토큰 배치 (토크나이저 post-processor 기준, 1회 계산)
+        - (None, 특수 토큰 id, type id) 또는 (0=질의 / 1=본문, None, type id)
+        - build_inputs_with_special_tokens가 없는 transformers 5 fast 토크나이저에서도 동작
+        """
+        probe = self.tokenizer(self.tokenizer.unk_token, self.tokenizer.unk_token, return_token_type_ids=True)
+        type_ids = probe.get("token_type_ids") or [0] * len(probe["input_ids"])
+        layout, prev = [], None
+        for token, seq, type_id in zip(probe["input_ids"], probe.sequence_ids(0), type_ids):
+            if seq is None:
+                layout.append((None, token, type_id))
+            elif seq != prev:
+                layout.append((seq, None, type_id))
+            prev = seq
+        return layout
+
+    def score_query(self, query: str, docs: Sequence, token_cache=None) -> List[float]:
+        """
+        질의 1개 × 문서 여러 개 점수
+        - token_cache(core/token_cache.py)에 있는 청크는 저장된 id 사용 → 질의만 토큰화
+        - 없는 문서(웹 문서 등)는 기존처럼 (질의, 본문) 쌍 토큰화
+        - 캐시는 max_length에서 잘려 있으므로 질의가 max_length 이상이면 (어느 쪽이 긴지 알 수 없음) 쌍 토큰화
+        """
+        if token_cache is None:
+            return self.score([(query, d.page_content) for d in docs])
+        query_ids = self.tokenizer(query, add_special_tokens=False)["input_ids"]
+        if len(query_ids) >= self.max_length:
+            return self.score([(query, d.page_content) for d in docs])
+        features: List[Optional[Dict[str, List[int]]]] = []
+        missing = []
+        for i, doc in enumerate(docs):
+            cached = token_cache.get(getattr(doc, "id", None))
+            if cached is None:
+                missing.append(i)
+                features.append(None)
+            else:
+                features.append(self.pair_features(query_ids, cached))
+        if missing:
+            for i, feat in zip(missing, self.encode([(query, docs[i].page_content) for i in missing])):
+                features[i] = feat
+        return self.score_features(features)
+
+
+# === 2️⃣ PyTorch (fp32 / 동적 int8) ===
+class TorchCrossEncoder(BatchedCrossEncoder):
+    def __init__(self, model_name: str, quantize: bool = False, threads: int = RERANKER_THREADS,
+                 device: str = RERANKER_DEVICE, **kwargs):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        super().__init__(model_name, **kwargs)
+        if threads > 0:
+            torch.set_num_threads(threads)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        if quantize:
+            # 동적 양자화는 CPU 전용
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            device = "cpu"
+        self.name = "torch-int8" if quantize else "torch"
+        self.device = device
+        self.model = model.to(device)
+        self._torch = torch
+
+    def _logits(self, batch):
+        torch = self._torch
+        inputs = {k: torch.from_numpy(v).to(self.device) for k, v in batch.items()}
+        with torch.inference_mode():
+            return self.model(**inputs).logits.float().cpu().numpy()
+
+
+# === 3️⃣ ONNX Runtime (fp32 / 동적 int8) ===
+def export_onnx(model_name: str, out_dir: str = RERANKER_ONNX_DIR, opset: int = 17) -> str:
+    """transformers 모델 → model.onnx (배치/시퀀스 길이 동적 축), 토크나이저도 같은 폴더에 저장"""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "model.onnx")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["질의"], ["본문"], return_tensors="pt")
+    names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    dynamic = {k: {0: "batch", 1: "sequence"} for k in names}
+    dynamic["logits"] = {0: "batch"}
+    print(f"📦 ONNX export: {model_name} → {path}")
+    with torch.inference_mode():
+        torch.onnx.export(
+            model, tuple(sample[k] for k in names), path,
+            input_names=names, output_names=["logits"], dynamic_axes=dynamic, opset_version=opset,
+        )
+    tokenizer.save_pretrained(out_dir)
+    return path
+
+
+def quantize_onnx(src: str, dst: str) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"📦 ONNX 동적 int8 양자화: {src} → {dst}")
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    return dst
+
+
+class OnnxCrossEncoder(BatchedCrossEncoder):
+    def __init__(self, model_name: str, quantize: bool = False, onnx_dir: str = RERANKER_ONNX_DIR,
+                 threads: int = RERANKER_THREADS, **kwargs):
+        import onnxruntime as ort
+
+        fp32 = os.path.join(onnx_dir, "model.onnx")
+        if not os.path.exists(fp32):
+            export_onnx(model_name, onnx_dir)
+        path = fp32
+        if quantize:
+            path = os.path.join(onnx_dir, "model.int8.onnx")
+            if not os.path.exists(path):
+                quantize_onnx(fp32, path)
+
+        super().__init__(onnx_dir if os.path.exists(os.path.join(onnx_dir, "tokenizer_config.json")) else model_name,
+                         **kwargs)
+        opts = ort.SessionOptions()
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.model_name = model_name
+
+    def _logits(self, batch):
+        feed = {k: v for k, v in batch.items() if k in self.input_names}
+        return self.session.run(None, feed)[0]
+
+
+# === 4️⃣ 생성 ===
+def make_reranker(model_name: str, backend: Optional[str] = None):
+    """RERANKER_BACKEND(또는 backend 인자)에 맞는 리랭커 생성"""
+    backend = backend or RERANKER_BACKEND
+    t0 = time.perf_counter()
+    if backend == "hf":
+        from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+        reranker = HuggingFaceCrossEncoder(model_name=model_name)
+    elif backend in ("torch", "torch-int8"):
+        reranker = TorchCrossEncoder(model_name, quantize=backend == "torch-int8")
+    elif backend in ("onnx", "onnx-int8"):
+        reranker = OnnxCrossEncoder(model_name, quantize=backend == "onnx-int8")
+    else:
+        raise ValueError(f"알 수 없는 리랭커 백엔드: {backend} (가능: hf, torch, torch-int8, onnx, onnx-int8)")
+    print(f"✅ 리랭커 로드: {backend} ({time.perf_counter() - t0:.1f}s)")
+    return reranker
+
+
+# === 5️⃣ 일치도 확인 ===
+def _ranks(x: np.ndarray) -> np.ndarray:
+    """평균 순위 (동점은 같은 순위)"""
+    order = np.argsort(x, kind="mergesort")
+    ranks = np.empty(len(x), dtype=np.float64)
+    ranks[order] = np.arange(len(x), dtype=np.float64)
+    for v in np.unique(x):
+        tie = x == v
+        if tie.sum() > 1:
+            ranks[tie] = ranks[tie].mean()
+    return ranks
+
+
+def spearman(a: Sequence[float], b: Sequence[float]) -> float:
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    if len(a) < 2:
+        return 1.0
+    ra, rb = _ranks(a), _ranks(b)
+    ra -= ra.mean()
+    rb -= rb.mean()
+    denom = np.sqrt((ra ** 2).sum() * (rb ** 2).sum())
+    return float((ra * rb).sum() / denom) if denom > 0 else 1.0
+
+
+def agreement(reference, candidate, groups: List[Tuple[str, List[str]]], top_k: int = 8) -> Dict[str, Any]:
+    """
+    질의별 후보 문서 점수 비교
+    - groups: [(질의, [후보 본문, ...]), ...]
+    - 반환: Spearman 평균/최소, top-1 일치율, top-k 겹침 비율, 평균 지연(ms)
+    """
+    rhos, top1, overlap = [], [], []
+    times = {"reference": 0.0, "candidate": 0.0}
+    for query, texts in groups:
+        if not texts:
+            continue
+        pairs = [(query, t) for t in texts]
+        t0 = time.perf_counter()
+        ref = np.asarray(reference.score(pairs), dtype=np.float64)
+        t1 = time.perf_counter()
+        cand = np.asarray(candidate.score(pairs), dtype=np.float64)
+        t2 = time.perf_counter()
+        times["reference"] += t1 - t0
+        times["candidate"] += t2 - t1
+
+        rhos.append(spearman(ref, cand))
+        top1.append(float(np.argmax(ref) == np.argmax(cand)))
+        k = min(top_k, len(texts))
+        overlap.append(len(set(np.argsort(-ref)[:k]) & set(np.argsort(-cand)[:k])) / k)
+
+    n = len(rhos)
+    if not n:
+        raise ValueError("비교할 질의가 없습니다.")
+    result = {
+        "queries": n,
+        "spearman_mean": round(float(np.mean(rhos)), 4),
+        "spearman_min": round(float(np.min(rhos)), 4),
+        "top1_agreement": round(float(np.mean(top1)), 4),
+        f"top{top_k}_overlap": round(float(np.mean(overlap)), 4),
+        "reference_ms": round(times["reference"] / n * 1000, 2),
+        "candidate_ms": round(times["candidate"] / n * 1000, 2),
+    }
+    result["speedup"] = round(result["reference_ms"] / result["candidate_ms"], 2) if result["candidate_ms"] else None
+    result["adopt"] = result["spearman_mean"] >= MIN_SPEARMAN and result["top1_agreement"] >= MIN_TOP1_AGREEMENT
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="리랭커 백엔드 일치도/속도 확인")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    chk = sub.add_parser("check", help="fp32(hf) 대비 순위 상관/top-1 일치율/지연 비교")
+    chk.add_argument("--backend", required=True)
+    chk.add_argument("--reference", default="hf")
+    chk.add_argument("--model", default="BAAI/bge-reranker-v2-m3")
+    chk.add_argument("--queries", type=int, default=50, help="학습 데이터 상황 문장 중 앞에서 N개")
+    chk.add_argument("--top-k", type=int, default=8)
+    exp = sub.add_parser("export", help="ONNX 모델 미리 생성 (--int8: 양자화 모델도)")
+    exp.add_argument("--model", default="BAAI/bge-reranker-v2-m3")
+    exp.add_argument("--out", default=RERANKER_ONNX_DIR)
+    exp.add_argument("--int8", action="store_true")
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        path = export_onnx(args.model, args.out)
+        if args.int8:
+            quantize_onnx(path, os.path.join(args.out, "model.int8.onnx"))
+        return
+
+    from core.dataset import situations
+    from core.retriever import retriever_instance
+
+    queries = situations("train")[: args.queries]
+    groups = [(q, [d.page_content for d in retriever_instance.hybrid_candidates(q)]) for q in queries]
+    result = agreement(make_reranker(args.model, args.reference), make_reranker(args.model, args.backend),
+                       groups, top_k=args.top_k)
+    print(f"\n📊 {args.backend} vs {args.reference}: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+    print("✅ 도입 가능" if result["adopt"] else
+          f"❌ 기준 미달 (Spearman ≥ {MIN_SPEARMAN}, top-1 ≥ {MIN_TOP1_AGREEMENT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,21 @@
 import os
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.retrievers import BM25Retriever
 from langchain.retrievers.ensemble import EnsembleRetriever
-from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
-from langchain.retrievers.document_compressors import CrossEncoderReranker
+from core.tracing import span
+from core.chunk_store import CHUNKS, with_score
+from core.reranker import make_reranker
+from core.token_cache import load_token_cache
+
+
+# 공유 리트리버 서비스 주소 (설정 시 이 프로세스는 인덱스를 올리지 않고 클라이언트만 사용, core/retriever_service.py)
+RETRIEVER_URL = os.environ.get("RETRIEVER_URL", "")
+# FAISS 인덱스를 mmap으로 읽기 (읽기 전용, 여러 프로세스가 페이지 캐시 공유)
+RETRIEVER_MMAP = os.environ.get("RETRIEVER_MMAP", "0") == "1"
 
 
 # === Qwen API 기반 Embedding 클래스 ===
@@ -15,9 +23,9 @@ def get_qwen_api_embeddings():
     """
     Qwen3-Embedding-4B API 호출 기반 Embedding
     """
-    embedder_model_name = "Qwen/Qwen3-Embedding-4B"
-    embedder_base_url = "http://211.47.56.71:15653/v1"
-    embedder_api_key = "token-abc123"
+    embedder_model_name = os.environ.get("EMBEDDING_MODEL", "Qwen/Qwen3-Embedding-4B")
+    embedder_base_url = os.environ.get("EMBEDDING_BASE_URL", "http://211.47.56.71:15653/v1")
+    embedder_api_key = os.environ.get("EMBEDDING_TOKEN", "token-abc123")
 
     print(f"🌐 Qwen Embedding API 연결 중: {embedder_base_url}")
     embeddings = OpenAIEmbeddings(
@@ -40,12 +48,19 @@ class RerankRetriever:
         reranker_model: str = "BAAI/bge-reranker-v2-m3",
         top_k: int = 10,
         ensemble_weights: tuple = (0.5, 0.5),
+        mmap: bool = RETRIEVER_MMAP,
     ):
         self.faiss_db_path = faiss_db_path
         self.reranker_model = reranker_model
         self.top_k = top_k
         self.ensemble_weights = ensemble_weights
-        self.retriever = None
+        self.mmap = mmap
+        self.hybrid_retriever = None
+        self.cross_encoder = None
+        self.token_cache = None
+        self.docstore = None
+        self.content_db = None
+        self.sparse_retriever = None
 
         print(f"🔍 RerankRetriever 초기화 중 (top_k={self.top_k})")
         self._setup()
@@ -59,11 +74,15 @@ class RerankRetriever:
         if not os.path.exists(self.faiss_db_path):
             raise FileNotFoundError(f"❌ DB 경로를 찾을 수 없습니다: {self.faiss_db_path}")
 
-        content_db = FAISS.load_local(
-            self.faiss_db_path,
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
+        content_db = self._load_faiss(embeddings)
+
+        # 청크 id 고정: BM25/FAISS 결과가 같은 id를 갖도록 docstore 키를 Document.id로 사용
+        for doc_id, doc in content_db.docstore._dict.items():
+            if not doc.id:
+                doc.id = doc_id
+        self.docstore = content_db.docstore
+        self.content_db = content_db
+        CHUNKS.attach(self.docstore)
 
         # === 3️⃣ Dense Retriever (FAISS) ===
         dense_retriever = content_db.as_retriever(
@@ -75,45 +94,171 @@ class RerankRetriever:
         all_docs = list(content_db.docstore._dict.values())
         sparse_retriever = BM25Retriever.from_documents(all_docs)
         sparse_retriever.k = self.top_k
+        self.sparse_retriever = sparse_retriever
 
         # === 5️⃣ Hybrid Retriever (Dense + Sparse) ===
-        hybrid_retriever = EnsembleRetriever(
+        self.hybrid_retriever = EnsembleRetriever(
             retrievers=[sparse_retriever, dense_retriever],
             weights=list(self.ensemble_weights),
         )
 
-        # === 6️⃣ Cross-Encoder Reranker ===
-        cross_encoder = HuggingFaceCrossEncoder(model_name=self.reranker_model)
-        compressor = CrossEncoderReranker(model=cross_encoder, top_n=self.top_k)
+        # === 6️⃣ Cross-Encoder Reranker (RERANKER_BACKEND: hf / torch / torch-int8 / onnx / onnx-int8) ===
+        self.cross_encoder = make_reranker(self.reranker_model)
+
+        # === 7️⃣ 청크 토큰 캐시 (hf 이외 백엔드: 질의만 토큰화) ===
+        if hasattr(self.cross_encoder, "score_query"):
+            self.token_cache = load_token_cache(
+                self.faiss_db_path, self.reranker_model,
+                self.cross_encoder.max_length, self.cross_encoder.tokenizer,
+            )
+
+    def _load_faiss(self, embeddings) -> FAISS:
+        if self.mmap:
+            try:
+                import faiss
+                import pickle
 
-        # === 7️⃣ Contextual Compression Retriever ===
-        self.retriever = ContextualCompressionRetriever(
-            base_retriever=hybrid_retriever,
-            base_compressor=compressor,
+                # IO_FLAG_MMAP_IFC: 벡터 배열을 복사하지 않고 파일에 매핑 (faiss ≥ 1.8)
+                flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                index = faiss.read_index(os.path.join(self.faiss_db_path, "index.faiss"), flags)
+                with open(os.path.join(self.faiss_db_path, "index.pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                print(f"🗺️ FAISS 인덱스 mmap 로드 ({index.ntotal}개 벡터)")
+                return FAISS(embeddings, index, docstore, index_to_docstore_id)
+            except Exception as e:
+                print(f"⚠️ FAISS mmap 로드 실패 → 일반 로드 ({type(e).__name__}: {e})")
+        return FAISS.load_local(
+            self.faiss_db_path,
+            embeddings,
+            allow_dangerous_deserialization=True
         )
 
+    @staticmethod
+    def _with_score(doc: Document, score: float) -> Document:
+        return with_score(doc, score)
+
+    def get_documents(self, ids: List[str]) -> List[Document]:
+        """청크 id → Document"""
+        docs = [self.docstore.search(i) for i in ids]
+        return [d for d in docs if isinstance(d, Document)]
+
+    def hybrid_candidates(self, query: str) -> List[Document]:
+        """
+        hybrid_retriever.invoke(query)와 같은 결과를 단계별 span으로 나눠 실행
+        (embedding → FAISS → BM25 → RRF fusion)
+        """
+        with span("embedding"):
+            vector = self.content_db.embedding_function.embed_query(query)
+        with span("faiss", k=self.top_k):
+            dense = self.content_db.similarity_search_by_vector(vector, k=self.top_k)
+        with span("bm25", k=self.top_k):
+            sparse = self.sparse_retriever.invoke(query)
+        with span("fusion") as attrs:
+            candidates = self.hybrid_retriever.weighted_reciprocal_rank([sparse, dense])
+            attrs["candidates"] = len(candidates)
+        return candidates
+
+    def _score(self, query: str, docs: List[Document]) -> List[float]:
+        with span("rerank", pairs=len(docs), backend=getattr(self.cross_encoder, "name", "hf")):
+            if self.token_cache is not None:
+                return self.cross_encoder.score_query(query, docs, self.token_cache)
+            return self.cross_encoder.score([(query, d.page_content) for d in docs])
+
+    def rerank(self, query: str, docs: List[Document], top_n: Optional[int] = None) -> List[Document]:
+        """Cross-Encoder 점수로 재정렬 후 상위 top_n 반환"""
+        if not docs:
+            return []
+        scores = self._score(query, docs)
+        ranked = sorted(zip(docs, scores), key=lambda x: x[1], reverse=True)[: top_n or self.top_k]
+        return [self._with_score(d, score) for d, score in ranked]
+
     def retrieve(self, query: str) -> List[Document]:
         print(f"\n📝 입력 쿼리: {query}")
-        return self.retriever.get_relevant_documents(query)
+        candidates = self.hybrid_candidates(query)
+        return self.rerank(query, candidates)
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        """여러 쿼리 검색 (RetrieverClient와 같은 인터페이스)"""
+        return [self.retrieve(q) for q in queries]
+
+    def retrieve_incremental(
+        self, query: str, pool: Optional[Dict[str, float]] = None, pool_query: Optional[str] = None
+    ) -> Tuple[List[Document], Dict[str, float]]:
+        """
+        rewrite 루프용 검색
+        - pool: 이전 검색까지의 후보 청크 id → rerank 점수 (pool_query 기준 점수)
+        - 새 쿼리의 hybrid 후보에 이전 후보를 더해 모두 새 쿼리로 점수화 (다른 쿼리의 점수와 섞어 정렬하지 않음)
+        - pool_query가 query와 같으면(같은 쿼리 재검색) 저장된 점수를 재사용하고 신규 후보만 점수화
+        - 반환: (상위 top_k 문서, 갱신된 pool — 모든 점수가 query 기준)
+        """
+        pool = dict(pool or {})
+        print(f"\n📝 입력 쿼리: {query}")
+        candidates = self.hybrid_candidates(query)
+
+        by_id = {d.id: d for d in candidates}
+        carried = [i for i in pool if i not in by_id]
+        by_id.update({d.id: d for d in self.get_documents(carried)})
+
+        reuse = pool if pool_query == query else {}
+        scores = {i: s for i, s in reuse.items() if i in by_id}
+        fresh = [d for i, d in by_id.items() if i not in scores]
+        if fresh:
+            scores.update({d.id: float(s) for d, s in zip(fresh, self._score(query, fresh))})
+        if carried or len(scores) > len(fresh):
+            print(f"♻️ 후보 {len(candidates)}개 + 이전 후보 {len(carried)}개 → 점수화 {len(fresh)}개 (pool {len(scores)}개)")
+
+        top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[: self.top_k]
+        docs = [self._with_score(by_id[i], s) for i, s in top]
+        return docs, scores
 
 
 # === LangGraph용 Node 함수 ===
-retriever_instance = RerankRetriever(
-    faiss_db_path="/home/user/Desktop/jiseok/capstone/RAG/construction-safety-agent/DB",
-    reranker_model="BAAI/bge-reranker-v2-m3",
-    top_k=8,
-    ensemble_weights=(0.5, 0.5),
-)
+def make_retriever(local: bool = False, mmap: bool = RETRIEVER_MMAP):
+    """
+    RETRIEVER_URL이 있으면 공유 서비스 클라이언트, 없으면 이 프로세스에 인덱스/리랭커 로드
+    - local=True: RETRIEVER_URL과 관계없이 항상 로컬 로드 (리트리버 서비스 자신, core/retriever_service.py)
+    """
+    if RETRIEVER_URL and not local:
+        from core.retriever_service import RetrieverClient
+        client = RetrieverClient(RETRIEVER_URL)
+        CHUNKS.attach(client.docstore)
+        return client
+    return RerankRetriever(
+        faiss_db_path="/home/user/Desktop/jiseok/capstone/RAG/construction-safety-agent/DB",
+        reranker_model="BAAI/bge-reranker-v2-m3",
+        top_k=8,
+        ensemble_weights=(0.5, 0.5),
+        mmap=mmap,
+    )
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_retriever():
+    """프로세스 공용 리트리버 (처음 사용할 때 make_retriever()로 생성)"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = make_retriever()
+    return _instance
+
+
+def __getattr__(name: str):
+    # 하위 호환: from core.retriever import retriever_instance
+    # (import만으로는 생성하지 않으므로 서비스가 make_retriever(local=True)를 따로 쓸 수 있음)
+    if name == "retriever_instance":
+        return get_retriever()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
     query = state["query"]
-    docs = retriever_instance.retrieve(query)
-
-    # 본문 + 파일명/페이지 같이 표시
-    docs_text = "\n\n".join(
-        f"[{i+1}] ({doc.metadata.get('filename','?')} p.{doc.metadata.get('page','?')})\n{doc.page_content}"
-        for i, doc in enumerate(docs)
+    # rewrite 후 재검색이면 이전 후보 pool을 재사용해 신규 후보만 rerank
+    docs, pool = get_retriever().retrieve_incremental(
+        query, state.get("retrieval_pool"), state.get("retrieval_pool_query")
     )
 
     # sources 정리
@@ -126,9 +271,12 @@ def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
         for i, doc in enumerate(docs)
     ]
 
+    # state에는 청크 id만 저장 (본문/점수는 chunk_store.resolve로 조회)
+    ids = [doc.id for doc in docs]
     return {
-        "retrieved": docs,
-        "selected": docs,
-        "docs_text": docs_text,
+        "retrieved_ids": ids,
+        "selected_ids": ids,
         "sources": sources,
+        "retrieval_pool": pool,
+        "retrieval_pool_query": query,
     }
@@ -0,0 +1,283 @@
+# core/retriever_service.py
+"""
+공유 리트리버 서비스 (aiohttp) + 워커용 클라이언트
+
+배치/서비스 워커를 프로세스로 늘리면 프로세스마다 FAISS 인덱스, BM25, Cross-Encoder 가중치를
+각자 올려 메모리가 워커 수에 비례해 늘어남. 서비스 모드에서는 리트리버 프로세스 1개가
+인덱스(FAISS는 mmap, 읽기 전용)와 리랭커를 갖고, 워커는 RETRIEVER_URL로 접속하는 얇은 클라이언트만 사용.
+
+엔드포인트 (JSON):
+    POST /v1/retrieve           {"query", "pool"?, "pool_query"?} → {"docs", "pool"}   (retrieve_incremental)
+    POST /v1/retrieve_many      {"queries": [...]}          → {"results": [{"docs"}, ...]}
+    POST /v1/candidates         {"query"}                   → {"docs"}           (hybrid_candidates, rerank 전)
+    POST /v1/rerank             {"query", "docs", "top_n"?} → {"docs"}
+    POST /v1/documents          {"ids": [...]}              → {"docs"}
+    GET  /healthz                                           → {"status", "chunks"}
+
+실행 예:
+    python -m core.retriever_service --unix /tmp/retriever.sock       # 워커: RETRIEVER_URL=unix:///tmp/retriever.sock
+    python -m core.retriever_service --host 127.0.0.1 --port 8765     # 워커: RETRIEVER_URL=http://127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from langchain.schema import Document
+
+from core.tracing import span
+
+
+SERVICE_THREADS = int(os.environ.get("RETRIEVER_SERVICE_THREADS", 4))
+CLIENT_TIMEOUT_S = float(os.environ.get("RETRIEVER_TIMEOUT_S", 60))
+CLIENT_DOC_CACHE = int(os.environ.get("RETRIEVER_DOC_CACHE", 4096))
+
+
+def doc_to_json(doc: Document) -> Dict[str, Any]:
+    return {"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata}
+
+
+def doc_from_json(obj: Dict[str, Any]) -> Document:
+    return Document(id=obj.get("id"), page_content=obj["page_content"], metadata=obj.get("metadata") or {})
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+# === 1️⃣ 서버 ===
+def make_app(retriever=None, threads: int = SERVICE_THREADS):
+    """리트리버 1개를 공유하는 aiohttp 앱 (점수 계산은 스레드 풀에서 실행)"""
+    from aiohttp import web
+
+    if retriever is None:
+        # 서버 자신은 항상 로컬 인덱스를 사용 (RETRIEVER_URL이 설정돼 있어도 자기 자신에 접속하지 않음)
+        # FAISS는 RETRIEVER_MMAP=0으로 끄지 않는 한 mmap
+        from core.retriever import make_retriever
+        retriever = make_retriever(local=True, mmap=os.environ.get("RETRIEVER_MMAP", "1") == "1")
+
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="retriever")
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["retriever"] = retriever
+
+    async def run(fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    def reply(obj: Any):
+        return web.Response(body=_dumps(obj), content_type="application/json")
+
+    async def healthz(request):
+        return reply({"status": "ok", "chunks": len(retriever.docstore._dict)})
+
+    async def retrieve(request):
+        body = await request.json()
+        docs, new_pool = await run(retriever.retrieve_incremental, body["query"], body.get("pool"),
+                                   body.get("pool_query"))
+        return reply({"docs": [doc_to_json(d) for d in docs], "pool": new_pool})
+
+    async def retrieve_many(request):
+        body = await request.json()
+        results = await asyncio.gather(*(run(retriever.retrieve, q) for q in body["queries"]))
+        return reply({"results": [{"docs": [doc_to_json(d) for d in docs]} for docs in results]})
+
+    async def candidates(request):
+        body = await request.json()
+        docs = await run(retriever.hybrid_candidates, body["query"])
+        return reply({"docs": [doc_to_json(d) for d in docs]})
+
+    async def rerank(request):
+        body = await request.json()
+        docs = [doc_from_json(d) for d in body["docs"]]
+        ranked = await run(retriever.rerank, body["query"], docs, body.get("top_n"))
+        return reply({"docs": [doc_to_json(d) for d in ranked]})
+
+    async def documents(request):
+        body = await request.json()
+        docs = await run(retriever.get_documents, body["ids"])
+        return reply({"docs": [doc_to_json(d) for d in docs]})
+
+    async def on_cleanup(_app):
+        pool.shutdown(wait=False)
+
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_post("/v1/retrieve", retrieve)
+    app.router.add_post("/v1/retrieve_many", retrieve_many)
+    app.router.add_post("/v1/candidates", candidates)
+    app.router.add_post("/v1/rerank", rerank)
+    app.router.add_post("/v1/documents", documents)
+    return app
+
+
+# === 2️⃣ 클라이언트 ===
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.unix_path)
+        self.sock = sock
+
+
+class RemoteDocstore:
+    """docstore.search(id) 인터페이스 (ChunkStore.attach용), 받은 문서는 LRU 캐시"""
+
+    def __init__(self, client: "RetrieverClient", capacity: int = CLIENT_DOC_CACHE):
+        self.client = client
+        self.capacity = capacity
+        self._cache: "OrderedDict[str, Document]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, docs: List[Document]):
+        with self._lock:
+            for doc in docs:
+                if doc.id:
+                    # rerank_score는 요청마다 다르므로 원본 형태로 보관
+                    meta = {k: v for k, v in doc.metadata.items() if k != "rerank_score"}
+                    self._cache[doc.id] = Document(id=doc.id, page_content=doc.page_content, metadata=meta)
+                    self._cache.move_to_end(doc.id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def search(self, doc_id: str):
+        with self._lock:
+            doc = self._cache.get(doc_id)
+        if doc is not None:
+            return doc
+        docs = self.client.get_documents([doc_id])
+        return docs[0] if docs else f"ID {doc_id} not found."
+
+
+class RetrieverClient:
+    """
+    RerankRetriever와 같은 메서드를 원격 호출 (retriever_instance 대체)
+    - url: "unix:///tmp/retriever.sock" 또는 "http://127.0.0.1:8765"
+    - 스레드별 keep-alive 연결 1개
+    """
+
+    def __init__(self, url: str, timeout: float = CLIENT_TIMEOUT_S):
+        self.url = url
+        self.timeout = timeout
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            self._target: Tuple[str, Any] = ("unix", parsed.path)
+        elif parsed.scheme in ("http", ""):
+            self._target = ("http", (parsed.hostname or "127.0.0.1", parsed.port or 80))
+        else:
+            raise ValueError(f"지원하지 않는 RETRIEVER_URL: {url} (unix:///path 또는 http://host:port)")
+        self._local = threading.local()
+        self.docstore = RemoteDocstore(self)
+
+        try:
+            info = self._call("GET", "/healthz")
+        except OSError as e:
+            raise ConnectionError(
+                f"❌ 리트리버 서비스에 연결할 수 없습니다: {url} ({e}) → python -m core.retriever_service 먼저 실행"
+            ) from e
+        print(f"✅ 리트리버 서비스 연결: {url} (청크 {info.get('chunks')}개)")
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            kind, target = self._target
+            if kind == "unix":
+                conn = _UnixHTTPConnection(target, self.timeout)
+            else:
+                conn = http.client.HTTPConnection(*target, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, method: str, path: str, payload: Optional[dict] = None) -> Dict[str, Any]:
+        body = _dumps(payload) if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # keep-alive 연결이 끊긴 경우 1회 재연결
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+                continue
+            if resp.status != 200:
+                raise RuntimeError(f"리트리버 서비스 오류 {resp.status} ({path}): {data[:200]!r}")
+            return json.loads(data)
+        raise RuntimeError("unreachable")
+
+    def _docs(self, items: List[Dict[str, Any]]) -> List[Document]:
+        docs = [doc_from_json(d) for d in items]
+        self.docstore.remember(docs)
+        return docs
+
+    # --- RerankRetriever 호환 메서드 ---
+    def retrieve_incremental(self, query: str, pool: Optional[Dict[str, float]] = None,
+                             pool_query: Optional[str] = None):
+        with span("retriever_rpc", kind="rpc", op="retrieve"):
+            out = self._call("POST", "/v1/retrieve", {"query": query, "pool": pool or {}, "pool_query": pool_query})
+        return self._docs(out["docs"]), out["pool"]
+
+    def retrieve(self, query: str) -> List[Document]:
+        return self.retrieve_many([query])[0]
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        with span("retriever_rpc", kind="rpc", op="retrieve_many", queries=len(queries)):
+            out = self._call("POST", "/v1/retrieve_many", {"queries": list(queries)})
+        return [self._docs(r["docs"]) for r in out["results"]]
+
+    def hybrid_candidates(self, query: str) -> List[Document]:
+        with span("retriever_rpc", kind="rpc", op="candidates"):
+            out = self._call("POST", "/v1/candidates", {"query": query})
+        return self._docs(out["docs"])
+
+    def rerank(self, query: str, docs: List[Document], top_n: Optional[int] = None) -> List[Document]:
+        if not docs:
+            return []
+        with span("retriever_rpc", kind="rpc", op="rerank", pairs=len(docs)):
+            out = self._call("POST", "/v1/rerank",
+                             {"query": query, "docs": [doc_to_json(d) for d in docs], "top_n": top_n})
+        return [doc_from_json(d) for d in out["docs"]]
+
+    def get_documents(self, ids: List[str]) -> List[Document]:
+        if not ids:
+            return []
+        out = self._call("POST", "/v1/documents", {"ids": list(ids)})
+        return self._docs(out["docs"])
+
+
+def main():
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="공유 리트리버 서비스")
+    parser.add_argument("--unix", default=None, help="Unix 소켓 경로 (지정 시 host/port 대신 사용)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--threads", type=int, default=SERVICE_THREADS)
+    args = parser.parse_args()
+
+    app = make_app(threads=args.threads)
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        print(f"🚀 리트리버 서비스: unix://{args.unix}")
+        web.run_app(app, path=args.unix)
+    else:
+        print(f"🚀 리트리버 서비스: http://{args.host}:{args.port}")
+        web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
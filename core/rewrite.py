@@ -57,7 +57,7 @@ def rewrite(state: AgentState):
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"입력:\n{q}\n출력:"}
     ]
-    base = _clean(call_llm(messages) or q)
+    base = _clean(call_llm(messages, node="rewrite") or q)
 
     # ✅ 부스팅 쿼리 생성
     suffix_ko = " 법규 기준 지침 체크리스트 조항"
@@ -70,7 +70,7 @@ def rewrite(state: AgentState):
         boosted = _clean(q + suffix_ko)
 
     return {
-        "messages": state["messages"] + [HumanMessage(content=base)],
+        "messages": [HumanMessage(content=base)],
         "query": base,
         "query_candidates": [base, boosted],
         "retries": state.get("retries", 0) + 1,
@@ -0,0 +1,38 @@
+# core/text_render.py
+"""
+청크 미리보기 렌더링 (confirm_retrieval 미리보기 / interrupt payload)
+
+- display_text: 사람이 읽는 미리보기용 (HTML 제거, 중간점/글머리 정리, 문장 단위 줄바꿈)
+- 렌더링 결과는 저장하지 않고 조회할 때 계산, 같은 본문은 메모리 캐시로 1회만 계산
+  (청크 metadata/체크포인트 크기는 그대로)
+- LLM 프롬프트, Cross-Encoder/BM25/임베딩은 page_content(원문)를 그대로 사용
+"""
+import functools
+import re
+
+from bs4 import BeautifulSoup
+from langchain.schema import Document
+
+
+# === 1️⃣ 렌더링 ===
+def _prettify_text(text: str) -> str:
+    """표·기호 구조가 깨진 텍스트를 사람이 읽기 좋게 재정렬"""
+    text = re.sub(r"[\u2027•․·]+", "·", text)        # 중간점 통일
+    text = re.sub(r"\s+", " ", text)                 # 과도한 공백 제거
+    text = re.sub(r"(\.)([가-힣])", r"\1\n\2", text) # 문장 구분시 줄바꿈 추가
+    text = re.sub(r"(·\s*)", r"\n- ", text)          # · 기호를 리스트 형식으로 변환
+    text = re.sub(r"([가-힣])(\s*:\s*)", r"\1\n", text)
+    text = text.strip()
+    return text
+
+
+@functools.lru_cache(maxsize=8192)
+def render_display(raw: str) -> str:
+    """HTML 태그 제거 및 줄바꿈 유지 후 미리보기용 정리"""
+    soup = BeautifulSoup(raw.strip(), "html.parser")
+    return _prettify_text(soup.get_text(separator="\n", strip=True))
+
+
+# === 2️⃣ 조회 (요청 경로) ===
+def display_text(doc: Document) -> str:
+    return render_display(doc.page_content)
@@ -0,0 +1,147 @@
+# core/token_cache.py
+"""
+Cross-Encoder 입력용 청크 토큰 캐시 (빌드 시 1회 토큰화)
+
+청크 본문은 질의마다 바뀌지 않으므로 리랭커 토크나이저의 토큰 id를 미리 저장하고,
+요청 시에는 질의만 토큰화해 [CLS/<s>] 질의 [SEP] 청크 [SEP] 형태로 이어 붙임.
+
+FAISS DB 폴더에 저장 (memmap으로 열어 전체를 메모리에 올리지 않음):
+    rerank_tokens.ids.npy      모든 청크 토큰 id를 이어 붙인 int32 배열
+    rerank_tokens.offsets.npy  청크 i의 토큰 = ids[offsets[i]:offsets[i+1]] (int64, 길이 N+1)
+    rerank_tokens.json         모델/최대 길이/청크 id 순서
+
+리랭커 백엔드가 torch / torch-int8 / onnx / onnx-int8일 때 사용 (hf는 내부에서 직접 토큰화).
+캐시에 없는 청크(웹 문서, 캐시 이후 추가된 청크)는 기존처럼 요청 시 토큰화.
+
+기존 DB에 캐시 생성:
+    python -m core.token_cache build --db /path/to/DB
+"""
+import argparse
+import json
+import os
+import pickle
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+CACHE_VERSION = 1
+PREFIX = "rerank_tokens"
+DEFAULT_MODEL = "BAAI/bge-reranker-v2-m3"
+
+
+def _paths(db_dir: str) -> Tuple[str, str, str]:
+    base = os.path.join(db_dir, PREFIX)
+    return base + ".ids.npy", base + ".offsets.npy", base + ".json"
+
+
+# === 1️⃣ 빌드 ===
+def build_token_cache(items: Iterable[Tuple[str, str]], tokenizer, db_dir: str,
+                      model_name: str, max_length: int) -> int:
+    """(청크 id, 본문) → 토큰 id 캐시 저장, 저장한 청크 수 반환"""
+    ids_path, off_path, meta_path = _paths(db_dir)
+    doc_ids, chunks, offsets = [], [], [0]
+    for doc_id, text in items:
+        tokens = tokenizer(text, add_special_tokens=False, truncation=True, max_length=max_length)["input_ids"]
+        doc_ids.append(doc_id)
+        chunks.append(np.asarray(tokens, dtype=np.int32))
+        offsets.append(offsets[-1] + len(tokens))
+
+    flat = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    for path, arr in ((ids_path, flat), (off_path, np.asarray(offsets, dtype=np.int64))):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+    meta = {
+        "version": CACHE_VERSION,
+        "model": model_name,
+        "max_length": max_length,
+        "vocab_size": len(tokenizer),
+        "ids": doc_ids,
+    }
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(meta_path + ".tmp", meta_path)
+    print(f"✅ 리랭커 토큰 캐시 저장: {len(doc_ids)}개 청크, {len(flat)}개 토큰 ({ids_path})")
+    return len(doc_ids)
+
+
+def build_for_docstore(docstore, db_dir: str, model_name: str = DEFAULT_MODEL,
+                       max_length: Optional[int] = None) -> int:
+    from transformers import AutoTokenizer
+    from core.reranker import RERANKER_MAX_LENGTH
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    items = ((doc_id, doc.page_content) for doc_id, doc in docstore._dict.items())
+    return build_token_cache(items, tokenizer, db_dir, model_name, max_length or RERANKER_MAX_LENGTH)
+
+
+def build_for_faiss_dir(db_dir: str, model_name: str = DEFAULT_MODEL, index_name: str = "index",
+                        max_length: Optional[int] = None) -> int:
+    """FAISS.save_local 폴더의 docstore(<index_name>.pkl)로 캐시 생성 (임베딩 불필요)"""
+    with open(os.path.join(db_dir, f"{index_name}.pkl"), "rb") as f:
+        docstore, _ = pickle.load(f)
+    return build_for_docstore(docstore, db_dir, model_name, max_length)
+
+
+# === 2️⃣ 조회 (요청 경로) ===
+class TokenCache:
+    def __init__(self, db_dir: str):
+        ids_path, off_path, meta_path = _paths(db_dir)
+        with open(meta_path, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.ids = np.load(ids_path, mmap_mode="r")
+        self.offsets = np.load(off_path, mmap_mode="r")
+        self.row: Dict[str, int] = {doc_id: i for i, doc_id in enumerate(self.meta["ids"])}
+
+    def __len__(self) -> int:
+        return len(self.row)
+
+    def get(self, doc_id: Optional[str]) -> Optional[list]:
+        i = self.row.get(doc_id)
+        if i is None:
+            return None
+        return self.ids[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    def compatible(self, model_name: str, max_length: int, tokenizer=None) -> Optional[str]:
+        """사용할 수 없으면 이유, 가능하면 None"""
+        if self.meta.get("version") != CACHE_VERSION:
+            return f"캐시 버전 {self.meta.get('version')} ≠ {CACHE_VERSION}"
+        if self.meta.get("model") != model_name:
+            return f"모델 {self.meta.get('model')} ≠ {model_name}"
+        if self.meta.get("max_length", 0) < max_length:
+            return f"max_length {self.meta.get('max_length')} < {max_length}"
+        if tokenizer is not None and self.meta.get("vocab_size") != len(tokenizer):
+            return "토크나이저 어휘 크기 불일치"
+        return None
+
+
+def load_token_cache(db_dir: str, model_name: str, max_length: int, tokenizer=None) -> Optional[TokenCache]:
+    """캐시가 없거나 현재 리랭커와 맞지 않으면 None (요청 시 토큰화로 동작)"""
+    if not os.path.exists(_paths(db_dir)[2]):
+        print(f"⚠️ 리랭커 토큰 캐시 없음 → python -m core.token_cache build --db {db_dir}")
+        return None
+    cache = TokenCache(db_dir)
+    reason = cache.compatible(model_name, max_length, tokenizer)
+    if reason:
+        print(f"⚠️ 리랭커 토큰 캐시 사용 안 함 ({reason}) → python -m core.token_cache build --db {db_dir}")
+        return None
+    print(f"✅ 리랭커 토큰 캐시 로드: {len(cache)}개 청크")
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-Encoder 입력용 청크 토큰 캐시")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="FAISS DB 폴더에 토큰 캐시 생성")
+    b.add_argument("--db", required=True, help="FAISS.save_local 폴더")
+    b.add_argument("--model", default=DEFAULT_MODEL)
+    b.add_argument("--index-name", default="index")
+    b.add_argument("--max-length", type=int, default=None)
+    args = parser.parse_args()
+    build_for_faiss_dir(args.db, args.model, args.index_name, args.max_length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# core/tracing.py
+"""
+노드/단계별 실행 시간 계측 (span)
+
+- span(name, kind): 소요 시간 측정 + 사례 ID(case_id) / 루프 회차(iteration) 태깅
+- TRACE_FILE 환경 변수가 있으면 span을 JSONL로 기록 (1줄 = span 1개)
+- 프로세스 내 히스토그램을 Prometheus text 형식으로 내보냄 (service.py의 /metrics)
+
+kind:
+    node      LangGraph 노드
+    route     조건부 엣지(라우팅 함수)
+    stage     리트리버 내부 단계 (embedding / faiss / bm25 / fusion / rerank)
+              (node / route / stage는 PROFILE_NODES 대상이면 core/profiling.py로 프로파일링)
+    llm       call_llm 1회 (엔드포인트 시도 단위)
+    web       웹 검색
+
+요약 예:
+    python -m core.tracing traces.jsonl
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core import profiling
+
+
+TRACE_FILE = os.environ.get("TRACE_FILE")
+
+# 초 단위 히스토그램 버킷 (LLM 호출은 수십 초까지 걸림)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_current_case: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_case", default=None)
+_current_iteration: contextvars.ContextVar[int] = contextvars.ContextVar("trace_iteration", default=0)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_span", default=None)
+
+
+# === 1️⃣ Prometheus 히스토그램 ===
+class _Histograms:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, kind: str, name: str, seconds: float, status: str = "ok"):
+        with self._lock:
+            row = self._series.get((kind, name, status))
+            if row is None:
+                row = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[(kind, name, status)] = row
+            for i, b in enumerate(self.buckets):
+                if seconds <= b:
+                    row["counts"][i] += 1
+            row["sum"] += seconds
+            row["count"] += 1
+
+    def render(self) -> str:
+        metric = "agent_span_duration_seconds"
+        lines = [
+            f"# HELP {metric} Duration of graph nodes and pipeline stages.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(k, {"counts": list(v["counts"]), "sum": v["sum"], "count": v["count"]}) for k, v in series]
+        for (kind, name, status), row in series:
+            labels = f'kind="{kind}",name="{name}",status="{status}"'
+            for b, c in zip(self.buckets, row["counts"]):
+                lines.append(f'{metric}_bucket{{{labels},le="{b}"}} {c}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {row["count"]}')
+            lines.append(f"{metric}_sum{{{labels}}} {row['sum']:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+
+HISTOGRAMS = _Histograms()
+
+
+# === 2️⃣ JSONL 내보내기 ===
+class _JsonlExporter:
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._fh = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        if not self.path:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write(line)
+            self._fh.flush()
+
+
+EXPORTER = _JsonlExporter(TRACE_FILE)
+
+
+def configure(trace_file: Optional[str]):
+    """JSONL 출력 경로 변경 (None이면 파일 기록 끔)"""
+    global EXPORTER
+    EXPORTER = _JsonlExporter(trace_file)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition (0.0.4)"""
+    return HISTOGRAMS.render()
+
+
+# === 3️⃣ span ===
+_PROFILED_KINDS = ("node", "route", "stage")
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str = "stage", **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    코드 블록 1개의 소요 시간 기록
+    - 반환된 dict에 값을 넣으면 span 속성(attrs)으로 함께 기록됨
+    """
+    span_id = uuid.uuid4().hex[:16]
+    token = _current_span.set(span_id)
+    extra: Dict[str, Any] = dict(attrs)
+    status = "ok"
+    start = time.time()
+    t0 = time.perf_counter()
+    block = (
+        profiling.profile_block(name, _current_case.get(), _current_iteration.get())
+        if kind in _PROFILED_KINDS else contextlib.nullcontext()
+    )
+    try:
+        with block:
+            yield extra
+    except BaseException as e:
+        status = "error"
+        extra.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        _current_span.reset(token)
+        HISTOGRAMS.observe(kind, name, elapsed, status)
+        EXPORTER.write({
+            "case_id": _current_case.get(),
+            "iteration": _current_iteration.get(),
+            "span_id": span_id,
+            "parent_id": _current_span.get(),
+            "kind": kind,
+            "name": name,
+            "start": round(start, 6),
+            "duration_s": round(elapsed, 6),
+            "status": status,
+            "thread": threading.current_thread().name,
+            "attrs": extra,
+        })
+
+
+def case_id_of(state: Dict[str, Any]) -> Optional[str]:
+    """span에 붙일 사례 ID (meta.case_id → budget.run_id 순)"""
+    meta = state.get("meta") or {}
+    if meta.get("case_id"):
+        return str(meta["case_id"])
+    return (state.get("budget") or {}).get("run_id")
+
+
+def _traced(kind: str, name: str, fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(state):
+        tokens = (
+            _current_case.set(case_id_of(state)),
+            _current_iteration.set(int(state.get("retries") or 0)),
+        )
+        try:
+            with profiling.request_scope((state.get("meta") or {}).get("profile")), span(name, kind=kind):
+                return fn(state)
+        finally:
+            _current_case.reset(tokens[0])
+            _current_iteration.reset(tokens[1])
+
+    return wrapper
+
+
+def traced(name: str, fn: Callable) -> Callable:
+    """노드 래퍼: 사례 ID/루프 회차를 컨텍스트에 설정하고 노드 전체를 span으로 기록"""
+    return _traced("node", name, fn)
+
+
+def traced_route(name: str, fn: Callable) -> Callable:
+    """라우팅 함수 래퍼"""
+    return _traced("route", name, fn)
+
+
+# === 4️⃣ JSONL 요약 ===
+def summarize(path: str) -> List[Dict[str, Any]]:
+    """TRACE_FILE을 읽어 (kind, name)별 호출 수/합계/평균/사례당 평균 시간"""
+    rows: Dict[Tuple[str, str], List[float]] = {}
+    cases = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows.setdefault((rec["kind"], rec["name"]), []).append(rec["duration_s"])
+            if rec.get("case_id"):
+                cases.add(rec["case_id"])
+    n_cases = max(1, len(cases))
+    out = []
+    for (kind, name), ds in rows.items():
+        ds.sort()
+        out.append({
+            "kind": kind,
+            "name": name,
+            "count": len(ds),
+            "total_s": round(sum(ds), 3),
+            "mean_s": round(sum(ds) / len(ds), 3),
+            "p95_s": round(ds[min(len(ds) - 1, int(0.95 * len(ds)))], 3),
+            "per_case_s": round(sum(ds) / n_cases, 3),
+        })
+    return sorted(out, key=lambda r: r["total_s"], reverse=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="span JSONL 요약 (단계별 소요 시간)")
+    parser.add_argument("trace_file", nargs="?", default=TRACE_FILE)
+    args = parser.parse_args()
+    if not args.trace_file:
+        parser.error("trace_file 또는 TRACE_FILE 환경 변수가 필요합니다.")
+
+    print(f"{'kind':<6} {'name':<28} {'count':>6} {'total_s':>10} {'mean_s':>8} {'p95_s':>8} {'/case_s':>8}")
+    for r in summarize(args.trace_file):
+        print(
+            f"{r['kind']:<6} {r['name']:<28} {r['count']:>6} {r['total_s']:>10.3f} "
+            f"{r['mean_s']:>8.3f} {r['p95_s']:>8.3f} {r['per_case_s']:>8.3f}"
+        )
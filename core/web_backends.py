@@ -0,0 +1,261 @@
+# core/web_backends.py
+"""
+웹 검색 백엔드 (websearch 노드에서 사용)
+
+- WebSearchBackend.search(query, k) -> List[Document] 공통 인터페이스
+    tavily   Tavily API (retriever 객체는 프로세스당 1개만 생성)
+    local    로컬 문서 폴더(.md/.txt) BM25 검색 — 네트워크 없는 환경용 스탠드인
+- WEB_BACKENDS 환경 변수로 선택 (쉼표 구분, 기본 tavily)
+  설정이 없는 백엔드(예: TAVILY_API_KEY 미설정 tavily)는 처음 검색할 때 경고 1회 후 건너뜀
+- 결과 캐시: SQLite, (백엔드, 정규화된 질의, k) 키, WEB_CACHE_TTL_S 동안 재사용
+- search_all(): (백엔드 × 질의) 조합을 동시에 호출하고 WEB_TIMEOUT_S 초과분은 버림
+"""
+import abc
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain.schema import Document
+
+from core.budget import submit_with_context
+from core.tracing import span
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WEB_BACKENDS = [b.strip() for b in os.environ.get("WEB_BACKENDS", "tavily").split(",") if b.strip()]
+WEB_TIMEOUT_S = float(os.environ.get("WEB_TIMEOUT_S", 10))
+WEB_CACHE_DB = os.environ.get("WEB_CACHE_DB", os.path.join(_ROOT, "checkpoints", "websearch.sqlite"))
+WEB_CACHE_TTL_S = float(os.environ.get("WEB_CACHE_TTL_S", 7 * 86400))
+WEB_LOCAL_DIR = os.environ.get("WEB_LOCAL_DIR", os.path.join(_ROOT, "data", "data_md"))
+
+_WEB_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("WEB_WORKERS", 4)),
+    thread_name_prefix="websearch",
+)
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키용 질의 정규화 (대소문자/공백/기호 차이 무시)"""
+    q = re.sub(r"[^\w\s]", " ", (query or "").lower())
+    return re.sub(r"\s+", " ", q).strip()
+
+
+# === 1️⃣ 백엔드 ===
+class BackendNotConfigured(RuntimeError):
+    """필요한 설정(API 키 등)이 없어 만들 수 없는 백엔드"""
+
+
+class WebSearchBackend(abc.ABC):
+    name = "?"
+
+    @abc.abstractmethod
+    def search(self, query: str, k: int) -> List[Document]:
+        """질의 → 상위 k개 문서"""
+
+
+class TavilyBackend(WebSearchBackend):
+    name = "tavily"
+
+    def __init__(self, api_key: Optional[str] = None, search_depth: str = "advanced"):
+        self.api_key = api_key or os.environ.get("TAVILY_API_KEY")
+        if not self.api_key:
+            raise BackendNotConfigured("❌ TAVILY_API_KEY 환경 변수가 필요합니다. (네트워크 없이 쓰려면 WEB_BACKENDS=local)")
+        self.search_depth = search_depth
+        self._retrievers: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def _retriever(self, k: int):
+        with self._lock:
+            if k not in self._retrievers:
+                from langchain_community.retrievers import TavilySearchAPIRetriever
+                self._retrievers[k] = TavilySearchAPIRetriever(
+                    api_key=self.api_key,
+                    k=k,  # 가져올 문서 개수
+                    search_depth=self.search_depth,  # 기본보다 깊게 검색 (선택)
+                )
+            return self._retrievers[k]
+
+    def search(self, query: str, k: int) -> List[Document]:
+        return self._retriever(k).invoke(query)
+
+
+class LocalFolderBackend(WebSearchBackend):
+    """
+    로컬 문서 폴더를 문단 단위로 나눠 BM25로 검색 (처음 검색할 때 1회 색인)
+    - metadata: source(파일명), section(문단 첫 줄)
+    """
+    name = "local"
+
+    def __init__(self, folder: str = WEB_LOCAL_DIR, max_chars: int = 1500):
+        self.folder = folder
+        self.max_chars = max_chars
+        self._bm25 = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[Document]:
+        docs = []
+        for root, _, files in os.walk(self.folder):
+            for fname in sorted(files):
+                if not fname.endswith((".md", ".txt")):
+                    continue
+                with open(os.path.join(root, fname), "r", encoding="utf-8", errors="ignore") as f:
+                    text = f.read()
+                for para in re.split(r"\n\s*\n", text):
+                    para = para.strip()
+                    if len(para) < 40:
+                        continue
+                    docs.append(Document(
+                        page_content=para[: self.max_chars],
+                        metadata={"source": fname, "section": para.splitlines()[0][:80], "backend": self.name},
+                    ))
+        return docs
+
+    def _index(self):
+        with self._lock:
+            if self._bm25 is None:
+                from langchain_community.retrievers import BM25Retriever
+                docs = self._load()
+                if not docs:
+                    raise FileNotFoundError(f"로컬 웹 검색 폴더에 문서가 없습니다: {self.folder}")
+                self._bm25 = BM25Retriever.from_documents(docs)
+                print(f"📚 로컬 웹 검색 색인: {len(docs)}개 문단 ({self.folder})")
+            return self._bm25
+
+    def search(self, query: str, k: int) -> List[Document]:
+        # 공유 retriever의 .k를 바꾸지 않고 호출마다 k 지정 (동시 검색 시 서로 덮어쓰지 않음)
+        bm25 = self._index()
+        return bm25.vectorizer.get_top_n(bm25.preprocess_func(query), bm25.docs, n=k)
+
+
+BACKENDS: Dict[str, Callable[[], WebSearchBackend]] = {
+    "tavily": TavilyBackend,
+    "local": LocalFolderBackend,
+}
+_instances: Dict[str, WebSearchBackend] = {}
+_unconfigured: Dict[str, str] = {}  # 이름 → 설정 누락 사유 (경고는 1회만)
+_instances_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[], WebSearchBackend]):
+    """사용자 정의 웹 검색 백엔드 등록"""
+    BACKENDS[name] = factory
+
+
+def get_backend(name: str) -> WebSearchBackend:
+    """백엔드 싱글턴 (검색마다 새로 만들지 않음)"""
+    with _instances_lock:
+        if name not in _instances:
+            if name not in BACKENDS:
+                raise ValueError(f"알 수 없는 웹 검색 백엔드: {name} (가능: {list(BACKENDS)})")
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+
+def active_backends(names: Sequence[str]) -> List[str]:
+    """
+    검색에 쓸 수 있는 백엔드 이름만 반환
+    - 설정이 없는 백엔드는 경고 1회 후 제외 (질의마다 예외를 반복하지 않음)
+    - 알 수 없는 이름은 ValueError (오타를 조용히 넘기지 않음)
+    """
+    active = []
+    for name in names:
+        try:
+            get_backend(name)
+        except BackendNotConfigured as e:
+            with _instances_lock:
+                first = name not in _unconfigured
+                _unconfigured[name] = str(e)
+            if first:
+                print(f"⚠️ 웹 검색 백엔드 '{name}' 설정 없음 → 이 백엔드는 건너뜀: {e}")
+            continue
+        active.append(name)
+    return active
+
+
+# === 2️⃣ 결과 캐시 ===
+class WebSearchCache:
+    def __init__(self, path: str = WEB_CACHE_DB, ttl_s: float = WEB_CACHE_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS web_cache ("
+                " backend TEXT, query TEXT, k INTEGER, created REAL, docs TEXT,"
+                " PRIMARY KEY (backend, query, k))"
+            )
+        return self._conn
+
+    def get(self, backend: str, query: str, k: int) -> Optional[List[Document]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT created, docs FROM web_cache WHERE backend = ? AND query = ? AND k = ?",
+                (backend, normalize_query(query), k),
+            ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl_s:
+            return None
+        return [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in json.loads(row[1])]
+
+    def put(self, backend: str, query: str, k: int, docs: List[Document]):
+        payload = json.dumps(
+            [{"page_content": d.page_content, "metadata": d.metadata} for d in docs],
+            ensure_ascii=False, default=str,
+        )
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO web_cache VALUES (?, ?, ?, ?, ?)",
+                (backend, normalize_query(query), k, time.time(), payload),
+            )
+            db.commit()
+
+
+CACHE = WebSearchCache()
+
+
+def _cached_search(backend_name: str, query: str, k: int) -> List[Document]:
+    cached = CACHE.get(backend_name, query, k)
+    if cached is not None:
+        with span(backend_name, kind="web", cache="hit", results=len(cached)):
+            return cached
+    with span(backend_name, kind="web", cache="miss") as attrs:
+        docs = get_backend(backend_name).search(query, k)
+        attrs["results"] = len(docs)
+    CACHE.put(backend_name, query, k, docs)
+    return docs
+
+
+# === 3️⃣ 동시 검색 ===
+def search_all(queries: Sequence[str], k: int = 5, backends: Optional[Sequence[str]] = None,
+               timeout: float = WEB_TIMEOUT_S) -> List[Document]:
+    """
+    (백엔드 × 질의)를 동시에 검색해 결과를 이어 붙임
+    - 전체 대기 시간 상한 timeout (늦은 호출/실패는 건너뜀)
+    """
+    backends = active_backends(list(backends or WEB_BACKENDS))
+    jobs = {
+        (b, q): submit_with_context(_WEB_POOL, _cached_search, b, q, k)
+        for b in backends for q in dict.fromkeys(queries)
+    }
+    deadline = time.monotonic() + timeout
+    docs: List[Document] = []
+    for (b, q), future in jobs.items():
+        try:
+            docs.extend(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeout:
+            future.cancel()
+            print(f"⏱️ 웹 검색 시간 초과 ({b}): {q}")
+        except Exception as e:
+            print(f"⚠️ 웹 검색 실패 ({b}): {type(e).__name__}: {e}")
+    return docs
@@ -1,8 +1,14 @@
 # core/websearch.py
+import os
+from typing import List, Tuple
+
 from core.agentstate import AgentState
 from core.retriever import retriever_instance   # ✅ 추가
-import os
-from langchain_community.retrievers import TavilySearchAPIRetriever
+from core.chunk_store import resolve, web_doc_id
+from core.web_backends import search_all
+from langchain.schema import Document
+
+WEB_TOP_K = int(os.environ.get("WEB_TOP_K", 5))  # rerank 후 state에 추가할 웹 문서 상한
 
 # 이전 버전 
 # def websearch(state: AgentState):
@@ -17,45 +23,68 @@ from langchain_community.retrievers import TavilySearchAPIRetriever
 #         "web_fallback": False
 #     }
 
-def websearch(state: AgentState) -> AgentState:
+def collect_web_docs(state: AgentState, queries: List[str], rerank_query: str) -> Tuple[List[Document], int, int]:
     """
-    Tavily API를 이용한 웹 검색 노드
-    - 기존 query 또는 마지막 메시지 내용을 기반으로 웹 검색 수행
-    - TavilySearchAPIRetriever로 관련 웹 문서를 가져옴
-    - 기존 retrieved 문서와 병합
+    웹 검색 → 중복 제거 → Cross-Encoder 재정렬 (websearch / repair_report 공용)
+    - 본문 해시로 중복 제거 (이미 검색된 코퍼스 청크/웹 문서와 같은 본문도 제외)
+    - 반환: (상위 WEB_TOP_K 문서(id = 본문 해시), 검색 결과 수, 중복 제외 수)
     """
+    # 웹 검색 수행 (백엔드별 span은 web_backends에서 기록)
+    docs_web = search_all(queries, k=WEB_TOP_K)
+
+    # 중복 제거: 같은 본문은 같은 id
+    known = {web_doc_id(d) for d in resolve(state, "retrieved_ids")}
+    unique = {}
+    for d in docs_web:
+        doc_id = web_doc_id(d)
+        if doc_id in known or doc_id in unique:
+            continue
+        unique[doc_id] = Document(id=doc_id, page_content=d.page_content, metadata=d.metadata)
+
+    # Cross-Encoder 재정렬 (점수는 metadata["rerank_score"]에 남음)
+    ranked = retriever_instance.rerank(rerank_query, list(unique.values()), top_n=WEB_TOP_K)
+    return ranked, len(docs_web), len(docs_web) - len(unique)
 
-    os.environ["TAVILY_API_KEY"] = "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"
+
+def merge_web_docs(state: AgentState, ranked: List[Document]) -> dict:
+    """웹 문서를 state["web_docs"]에 보관하고 id만 retrieved/selected에 병합"""
+    web_docs = dict(state.get("web_docs") or {})
+    new_ids = []
+    for d in ranked:
+        web_docs[d.id] = d
+        new_ids.append(d.id)
+    prev_ids = state.get("retrieved_ids", [])
+    merged_ids = prev_ids + [i for i in new_ids if i not in prev_ids]
+    return {
+        "retrieved_ids": merged_ids,
+        "selected_ids": merged_ids,
+        "web_docs": web_docs,
+    }
+
+
+def websearch(state: AgentState) -> dict:
+    """
+    웹 검색 노드 (백엔드: core/web_backends.py, WEB_BACKENDS로 선택)
+    - 기존 query 또는 마지막 메시지 내용을 기반으로 웹 검색 수행 (캐시 우선, 백엔드 동시 호출)
+    - 중복 제거 후 코퍼스와 같은 Cross-Encoder로 재정렬해 상위 WEB_TOP_K건만 병합
+      (웹 문서는 state["web_docs"]에 보관하고 id만 병합)
+    """
 
     # 2️⃣ 검색 쿼리 결정
     query_text = state.get("query") or state["messages"][-1].content
     expanded_query = query_text + " 관련 법규 및 안전 기준"
 
-    #  Tavily retriever 초기화
-    tavily_retriever = TavilySearchAPIRetriever(
-        api_key=os.environ["TAVILY_API_KEY"],
-        k=5,  # 가져올 문서 개수
-        search_depth="advanced",  # 기본보다 깊게 검색 (선택)
-    )
-
-    # Tavily 웹 검색 수행
-    docs_web = tavily_retriever.get_relevant_documents(expanded_query)
-
-    # 기존 retrieved 문서와 병합
-    prev_docs = state.get("retrieved", [])
-    merged_docs = prev_docs + docs_web
-
-    #  상태 업데이트
-    state["retrieved"] = merged_docs
-    state["selected"] = merged_docs
-    state["web_fallback"] = False  # 웹 보강 이후 추가 fallback 방지
-
-    #  메시지 로그 추가 (선택)
-    state["messages"].append(
-        {
-            "role": "system",
-            "content": f"Tavily 검색 결과 {len(docs_web)}건 추가됨.",
-        }
-    )
-
-    return state
\ No newline at end of file
+    ranked, n_found, n_dup = collect_web_docs(state, [expanded_query], query_text)
+
+    #  변경된 키만 반환
+    return {
+        **merge_web_docs(state, ranked),
+        "web_fallback": False,  # 웹 보강 이후 추가 fallback 방지
+        #  메시지 로그 추가 (선택)
+        "messages": [
+            {
+                "role": "system",
+                "content": f"웹 검색 결과 {n_found}건 중 {len(ranked)}건 추가됨 (중복 {n_dup}건 제외).",
+            }
+        ],
+    }
@@ -7,6 +7,7 @@ from tqdm import tqdm
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain.schema import Document
+from core.token_cache import build_for_docstore  # 리랭커 입력 토큰 사전 계산
 
 # ===== 1️⃣ 경로 설정 =====
 base_dir = "/home/user/Desktop/jiseok/capstone/RAG/construction-safety-agent"
@@ -66,6 +67,9 @@ db = FAISS.from_documents(docs, embedding_model)
 os.makedirs(save_dir, exist_ok=True)
 db.save_local(save_dir)
 
+# ===== 6️⃣-1 리랭커 토큰 캐시 저장 (질의 시 청크 재토큰화 생략) =====
+build_for_docstore(db.docstore, save_dir)
+
 print(f"\n✅ RAG 벡터 DB 구축 완료!")
 print(f"📁 저장 위치: {save_dir}")
 print(f"🧩 총 청크 수: {len(docs)}")
@@ -0,0 +1,361 @@
+# service.py
+"""
+건설 사고 에이전트 HTTP 서비스 (aiohttp)
+
+- 리트리버/모델/그래프는 프로세스 시작 시 1회만 로드
+- 동시 실행 상한(SERVICE_MAX_CONCURRENCY) + 대기열 상한(SERVICE_MAX_QUEUE)
+  초과 시 429 + Retry-After
+- 노드 단위 진행 상황, 답변, 보고서를 NDJSON으로 스트리밍
+
+엔드포인트:
+    POST /v1/cases                      {"situation": "...", "case_id"?: "...", "budget"?: {...}, "profile"?: [...], "stream"?: true}
+                                        (같은 case_id가 실행 중이거나 확인 대기 중이면 409)
+    POST /v1/cases/{thread_id}/resume   {"accept": true, "exclude": [2, 5]}   (confirm 정책이 interrupt일 때)
+    GET  /healthz                       프로세스 생존 여부
+    GET  /readyz                        그래프 로드 완료 + LLM 엔드포인트 가용 여부
+    GET  /metrics                       노드/단계별 소요 시간 히스토그램 (Prometheus text)
+
+실행 예:
+    python service.py --port 8080
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set
+
+from aiohttp import web
+
+
+MAX_CONCURRENCY = int(os.environ.get("SERVICE_MAX_CONCURRENCY", 4))
+MAX_QUEUE = int(os.environ.get("SERVICE_MAX_QUEUE", 16))
+CONFIRM_MODE = os.environ.get("SERVICE_CONFIRM_MODE", "auto")
+
+
+class AgentService:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 confirm_mode: str = CONFIRM_MODE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.confirm_mode = confirm_mode
+        self.app = None
+        self.ready = False
+        self.load_error: Optional[str] = None
+
+        self.running = 0
+        self.waiting = 0
+        self.active: Set[str] = set()  # 실행 중(대기 포함)인 thread_id — 같은 체크포인트 스레드 동시 실행 방지
+        self.avg_case_s = 60.0  # Retry-After 추정용 (지수 이동 평균)
+        self.sem = asyncio.Semaphore(max_concurrency)
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent")
+
+    # === 1️⃣ 시작 시 1회 로드 ===
+    def _load(self):
+        from core.graph import build_app
+        from core.checkpoint import open_checkpointer
+
+        self.app = build_app(confirm_mode=self.confirm_mode, checkpointer=open_checkpointer())
+
+    async def load(self):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._load)
+            self.ready = True
+            print(f"✅ 에이전트 그래프 로드 완료 (동시 {self.max_concurrency}, 대기열 {self.max_queue})")
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            print(f"❌ 에이전트 그래프 로드 실패: {self.load_error}")
+
+    # === 2️⃣ 수용 제어 ===
+    def admit(self) -> Optional[int]:
+        """수용 가능하면 None, 과부하면 Retry-After(초)"""
+        if self.running + self.waiting >= self.max_concurrency + self.max_queue:
+            backlog = self.waiting + 1
+            return max(1, int(self.avg_case_s * backlog / self.max_concurrency))
+        return None
+
+    # === 3️⃣ 그래프 실행 (스레드) → 이벤트 큐 (이벤트 루프) ===
+    def _budget_state(self, state, graph_input, config) -> Dict[str, Any]:
+        """예산 장부 키(run_id)를 찾기 위한 최소 state (실패로 state가 비어 있어도 입력/체크포인트에서 조회)"""
+        budget = state.get("budget")
+        if budget is None and isinstance(graph_input, dict):
+            budget = graph_input.get("budget")
+        if budget is None:
+            try:
+                budget = self.app.get_state(config).values.get("budget")
+            except Exception:
+                budget = None
+        return {"budget": budget} if budget else {}
+
+    def _run_graph(self, graph_input, config, emit):
+        from core.budget import release
+
+        thread_id = config["configurable"]["thread_id"]
+        t0 = last = time.perf_counter()
+        state: Dict[str, Any] = {}
+        paused = False
+        try:
+            for mode, chunk in self.app.stream(graph_input, config, stream_mode=["updates", "values"]):
+                now = time.perf_counter()
+                if mode == "values":
+                    state = chunk
+                    continue
+                for node, update in chunk.items():
+                    if node == "__interrupt__":
+                        emit({"event": "interrupt", "thread_id": thread_id,
+                              "payload": [getattr(i, "value", i) for i in update]})
+                        continue
+                    emit({"event": "node", "node": node, "elapsed_s": round(now - last, 3)})
+                    update = update or {}
+                    if update.get("candidate_answer"):
+                        emit({"event": "answer", "answer": update["candidate_answer"]})
+                    if update.get("report"):
+                        emit({"event": "report", "report": update["report"]})
+                last = now
+
+            snapshot = self.app.get_state(config)
+            total_s = time.perf_counter() - t0
+            if snapshot.next:
+                # interrupt 정책: 사람의 확인을 기다리는 중 (resume 엔드포인트로 재개, 예산/체크포인트 유지)
+                paused = True
+                return {
+                    "event": "paused",
+                    "thread_id": thread_id,
+                    "next": list(snapshot.next),
+                    "payload": [i.value for t in snapshot.tasks for i in getattr(t, "interrupts", ())],
+                }
+
+            self.avg_case_s = 0.8 * self.avg_case_s + 0.2 * total_s
+            return {
+                "event": "done",
+                "thread_id": thread_id,
+                "answer": state.get("candidate_answer"),
+                "report": state.get("report"),
+                "sources": json.loads(json.dumps(state.get("sources", []), ensure_ascii=False, default=str)),
+                "usage": release(state),
+                "total_s": round(total_s, 3),
+            }
+        finally:
+            # 예산 장부 항목은 항상 정리 (release는 이미 반환된 run이면 아무것도 안 함)
+            # 확인 대기(paused)는 재개 시 체크포인트의 state["usage"]로 장부가 복원되므로 여기서 비워도 됨
+            release(self._budget_state(state, graph_input, config))
+            if not paused:
+                try:
+                    self.app.checkpointer.delete_thread(thread_id)
+                except Exception as e:
+                    print(f"⚠️ 체크포인트 삭제 실패 ({thread_id}): {e}")
+
+    def _release_slot(self, thread_id: str, task=None):
+        """실행 슬롯과 thread_id 반환 (그래프 실행이 실제로 끝났을 때만)"""
+        if task is not None and not task.cancelled():
+            task.exception()  # 미확인 예외 경고 방지 (결과는 핸들러가 읽음)
+        self.active.discard(thread_id)
+        self.running -= 1
+        self.sem.release()
+
+    async def execute(self, request: web.Request, graph_input, config, stream: bool) -> web.StreamResponse:
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self.active:
+            return web.json_response({"error": "a run for this thread is already in progress",
+                                      "thread_id": thread_id}, status=409)
+        retry_after = self.admit()
+        if retry_after is not None:
+            return web.json_response(
+                {"error": "overloaded", "running": self.running, "waiting": self.waiting},
+                status=429, headers={"Retry-After": str(retry_after)},
+            )
+        self.active.add(thread_id)
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def emit(ev):
+            loop.call_soon_threadsafe(events.put_nowait, ev)
+
+        resp = None
+        if stream:
+            resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await resp.prepare(request)
+
+        async def send(ev):
+            if resp is not None:
+                await resp.write((json.dumps(ev, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        self.waiting += 1
+        try:
+            await send({"event": "queued", "position": self.waiting})
+            await self.sem.acquire()
+        except BaseException:
+            self.active.discard(thread_id)
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        task = None
+        try:
+            await send({"event": "started", "thread_id": thread_id})
+            task = loop.run_in_executor(self.pool, self._run_graph, graph_input, config, emit)
+            # 클라이언트가 끊겨 핸들러가 먼저 끝나도 그래프 실행이 끝날 때까지 슬롯 유지 (429 판단이 실제 부하 반영)
+            task.add_done_callback(functools.partial(self._release_slot, thread_id))
+            while not task.done() or not events.empty():
+                getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await send(getter.result())
+                else:
+                    getter.cancel()
+            try:
+                final = task.result()
+            except Exception as e:
+                final = {"event": "error", "error": f"{type(e).__name__}: {e}"}
+        finally:
+            if task is None:
+                self._release_slot(thread_id)
+
+        if resp is None:
+            status = 500 if final["event"] == "error" else 200
+            return web.json_response(final, status=status)
+        await send(final)
+        await resp.write_eof()
+        return resp
+
+
+# === 4️⃣ HTTP 핸들러 ===
+class BadRequest(ValueError):
+    """잘못된 요청 본문 (400)"""
+
+
+async def _read_body(request: web.Request) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except ValueError:  # json.JSONDecodeError, 빈 본문
+        raise BadRequest("request body must be a JSON object")
+    if not isinstance(body, dict):
+        raise BadRequest("request body must be a JSON object")
+    return body
+
+
+def _parse_budget(raw: Any) -> Optional[Dict[str, Any]]:
+    """요청의 budget 필드 → new_budget (숫자가 아닌 값/알 수 없는 키는 400)"""
+    from core.budget import new_budget
+
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise BadRequest("budget must be an object")
+    for key, value in raw.items():
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+            raise BadRequest(f"budget.{key} must be a non-negative number")
+    try:
+        return new_budget(**raw)
+    except TypeError:
+        raise BadRequest(f"unknown budget fields: {sorted(raw)}")
+
+
+SERVICE_KEY = web.AppKey("service", AgentService)
+
+
+def make_app(service: Optional[AgentService] = None) -> web.Application:
+    service = service or AgentService()
+    app = web.Application()
+    app[SERVICE_KEY] = service
+
+    async def on_startup(_app):
+        asyncio.get_running_loop().create_task(service.load())
+
+    async def healthz(request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def readyz(request: web.Request) -> web.Response:
+        if not service.ready:
+            return web.json_response({"ready": False, "error": service.load_error}, status=503)
+        from core.llm_utils import LLM_POOL
+        endpoints = {ep.name: ep.healthy for ep in LLM_POOL.endpoints}
+        ok = any(endpoints.values())
+        return web.json_response(
+            {"ready": ok, "llm_endpoints": endpoints, "running": service.running, "waiting": service.waiting},
+            status=200 if ok else 503,
+        )
+
+    async def metrics(request: web.Request) -> web.Response:
+        from core.tracing import render_metrics
+        body = render_metrics()
+        body += (
+            "# HELP agent_requests_running Graph runs currently executing.\n"
+            "# TYPE agent_requests_running gauge\n"
+            f"agent_requests_running {service.running}\n"
+            "# HELP agent_requests_waiting Requests waiting for a concurrency slot.\n"
+            "# TYPE agent_requests_waiting gauge\n"
+            f"agent_requests_waiting {service.waiting}\n"
+        )
+        return web.Response(text=body, content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def create_case(request: web.Request) -> web.StreamResponse:
+        if not service.ready:
+            return web.json_response({"error": "not ready"}, status=503, headers={"Retry-After": "5"})
+        try:
+            body = await _read_body(request)
+            budget = _parse_budget(body.get("budget"))
+        except BadRequest as e:
+            return web.json_response({"error": str(e)}, status=400)
+        situation = body.get("situation")
+        if not isinstance(situation, str) or not situation.strip():
+            return web.json_response({"error": "situation is required"}, status=400)
+        situation = situation.strip()
+
+        from core.checkpoint import thread_config
+
+        case_id = body.get("case_id") or uuid.uuid4().hex
+        if not isinstance(case_id, str):
+            return web.json_response({"error": "case_id must be a string"}, status=400)
+        config = thread_config(case_id)
+        if case_id in service.active or service.app.get_state(config).next:
+            # 같은 thread_id를 쓰면 체크포인트를 공유하고, 먼저 끝난 실행이 다른 실행의 체크포인트를 지움
+            return web.json_response({"error": "case_id is already running or waiting for confirmation",
+                                      "thread_id": case_id}, status=409)
+
+        from core.graph import make_init_state
+        init_state = make_init_state(situation, budget=budget, case_id=case_id, profile=body.get("profile"))
+        return await service.execute(request, init_state, config, stream=body.get("stream", True))
+
+    async def resume_case(request: web.Request) -> web.StreamResponse:
+        if not service.ready:
+            return web.json_response({"error": "not ready"}, status=503, headers={"Retry-After": "5"})
+        from langgraph.types import Command
+        from core.checkpoint import thread_config
+
+        try:
+            body = await _read_body(request)
+        except BadRequest as e:
+            return web.json_response({"error": str(e)}, status=400)
+        config = thread_config(request.match_info["thread_id"])
+        if not service.app.get_state(config).next:
+            return web.json_response({"error": "no paused run for this thread"}, status=404)
+        command = Command(resume={"accept": body.get("accept", True), "exclude": body.get("exclude", [])})
+        return await service.execute(request, command, config, stream=body.get("stream", True))
+
+    app.on_startup.append(on_startup)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_post("/v1/cases", create_case)
+    app.router.add_post("/v1/cases/{thread_id}/resume", resume_case)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="건설 사고 에이전트 HTTP 서비스")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    web.run_app(make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
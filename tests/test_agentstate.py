@@ -0,0 +1,33 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from core import agentstate
+from core.agentstate import add_messages_capped
+
+
+def test_keeps_question_and_latest_messages(monkeypatch):
+    monkeypatch.setattr(agentstate, "MAX_MESSAGES", 4)
+    messages = [HumanMessage(content="질문", id="q")]
+    for i in range(6):
+        messages = add_messages_capped(messages, [AIMessage(content=f"답변 {i}", id=f"a{i}")])
+
+    assert [m.content for m in messages] == ["질문", "답변 3", "답변 4", "답변 5"]
+
+
+def test_update_by_id_and_unlimited(monkeypatch):
+    monkeypatch.setattr(agentstate, "MAX_MESSAGES", 0)
+    messages = add_messages_capped([HumanMessage(content="질문", id="q")], [AIMessage(content="초안", id="a")])
+    messages = add_messages_capped(messages, [AIMessage(content="수정", id="a")])
+
+    assert [m.content for m in messages] == ["질문", "수정"]
+    for i in range(10):
+        messages = add_messages_capped(messages, [AIMessage(content=str(i))])
+    assert len(messages) == 12
+
+
+def test_cap_of_one_keeps_question_and_latest(monkeypatch):
+    monkeypatch.setattr(agentstate, "MAX_MESSAGES", 1)
+    messages = [HumanMessage(content="질문", id="q")]
+    for i in range(5):
+        messages = add_messages_capped(messages, [AIMessage(content=f"답변 {i}", id=f"a{i}")])
+
+    assert [m.content for m in messages] == ["질문", "답변 4"]
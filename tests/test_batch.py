@@ -0,0 +1,123 @@
+import sys
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+import batch
+from core.budget import LEDGER, new_budget
+from core.dataset import normalize_situation
+
+
+def _init_state(situation, case_id=None, **_):
+    return {"query": situation, "budget": new_budget(), "meta": {"case_id": case_id}}
+
+
+class FailingGraph:
+    checkpointer = None
+
+    def stream(self, graph_input, config, stream_mode=None):
+        yield "values", graph_input
+        LEDGER.add(graph_input["budget"]["run_id"], "generate", llm_calls=1)
+        raise RuntimeError("boom")
+
+
+def test_run_case_releases_ledger_on_failure(monkeypatch):
+    # core.graph는 리트리버/DB를 로드하므로 make_init_state만 대체
+    monkeypatch.setitem(sys.modules, "core.graph", SimpleNamespace(make_init_state=_init_state))
+    before = set(LEDGER._runs)
+    with pytest.raises(RuntimeError):
+        batch.run_case(FailingGraph(), {"id": "c1", "situation": "s"})
+    assert set(LEDGER._runs) == before
+
+
+def test_normalize_situation_ignores_spacing_width_and_quotes():
+    a = "'건축' 공사 중 '철근콘크리트공사'의 '타설작업' 과정에서 '부주의'로 인해 사고가 발생하였습니다."
+    b = "‘건축’ 공사 중  ‘철근콘크리트 공사’의 ‘타설작업’ 과정에서 ‘부주의’로 인해 사고가 발생하였습니다．"
+    assert normalize_situation(a) == normalize_situation(b)
+    assert normalize_situation(a) != normalize_situation(a.replace("부주의", "확인 미흡"))
+    assert normalize_situation(None) == ""
+
+
+def _case(case_id, situation="'건축' 공사 중 '토공사'의 '굴착' 과정에서 '부주의'로 인해 사고가 발생하였습니다."):
+    return {"id": case_id, "situation": situation}
+
+
+def _ok(case_id):
+    return {"id": case_id, "status": "ok", "report": "r",
+            "usage": {"total": {"llm_calls": 3, "prompt_tokens": 10, "completion_tokens": 5, "llm_seconds": 1.0}},
+            "timings": {"total_s": 2.0, "nodes": {}}}
+
+
+def _dedup(n_cases):
+    key = normalize_situation(_case("x")["situation"])
+    return batch._Dedup(Counter({key: n_cases}), {}), key
+
+
+def test_dedup_copies_leader_result_to_followers():
+    shared, key = _dedup(3)
+    a, b, c = _case("A"), _case("B"), _case("C")
+    assert shared.claim(a) == ("run", None)
+    assert shared.claim(b) == ("wait", None)
+
+    followers, retry = shared.finish(a, _ok("A"))
+    assert followers == [b] and retry is None
+    copied = shared.copy(_ok("A"), b)
+    assert copied["id"] == "B" and copied["dedup_of"] == "A" and copied["usage"] == {}
+
+    # 대기하지 않고 나중에 온 같은 상황 → 보관 결과 복사, 마지막 사례 후 결과 해제
+    action, leader = shared.claim(c)
+    assert action == "copy" and leader["id"] == "A"
+    assert key not in shared.results and key not in shared.pending
+    assert shared.report()["executed"] == 1
+    assert shared.report()["saved"]["llm_calls"] == 3
+
+
+def test_dedup_failed_leader_promotes_next_case():
+    shared, key = _dedup(2)
+    a, b = _case("A"), _case("B")
+    shared.claim(a)
+    shared.claim(b)
+
+    followers, retry = shared.finish(a, {"id": "A", "status": "error"})
+    assert followers == [] and retry == b
+    assert shared.finish(b, _ok("B")) == ([], None)
+    assert shared.executed == 2
+    assert key not in shared.results
+
+
+class AnswerGraph:
+    checkpointer = None
+
+    def stream(self, graph_input, config, stream_mode=None):
+        yield "values", {**graph_input, "candidate_answer": "ok", "report": "r"}
+
+
+def test_emit_failure_does_not_drop_waiting_followers(tmp_path, monkeypatch):
+    import json
+    import time
+
+    # 대표(A) 실행이 끝나기 전에 B, C가 같은 상황으로 대기하도록 run_case를 잠시 붙잡음
+    real_run_case = batch.run_case
+
+    def slow_run_case(app, case):
+        time.sleep(0.2)
+        return real_run_case(app, case)
+
+    def flaky_update(self, ok, case_id, elapsed):
+        if case_id == "A":
+            raise OSError("progress 출력 실패")
+
+    monkeypatch.setitem(sys.modules, "core.graph", SimpleNamespace(
+        make_init_state=_init_state, build_app=lambda **_: AnswerGraph()))
+    monkeypatch.setattr(batch, "run_case", slow_run_case)
+    monkeypatch.setattr(batch._Progress, "update", flaky_update)
+    monkeypatch.setattr(batch, "iter_cases", lambda path: iter([_case("A"), _case("B"), _case("C")]))
+
+    output = tmp_path / "out.jsonl"
+    batch.run_batch("in.csv", str(output), concurrency=1)
+
+    with open(output, encoding="utf-8") as f:
+        records = {r["id"]: r for r in map(json.loads, f)}
+    assert set(records) == {"A", "B", "C"}
+    assert records["B"]["dedup_of"] == "A" and records["C"]["dedup_of"] == "A"
@@ -0,0 +1,53 @@
+import operator
+from typing import Annotated, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from core.checkpoint import compact, open_checkpointer, thread_config
+
+
+class _State(TypedDict):
+    steps: Annotated[list, operator.add]
+
+
+def _graph(saver):
+    g = StateGraph(_State)
+    for name in ("a", "b", "c"):
+        g.add_node(name, lambda s, name=name: {"steps": [name]})
+    g.add_edge(START, "a")
+    g.add_edge("a", "b")
+    g.add_edge("b", "c")
+    g.add_edge("c", END)
+    return g.compile(checkpointer=saver)
+
+
+def _count(saver, table, thread_id):
+    return saver.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+def test_compact_keeps_last_checkpoint_per_thread(tmp_path):
+    saver = open_checkpointer(str(tmp_path / "graph.sqlite"))
+    app = _graph(saver)
+    for tid in ("t1", "t2"):
+        app.invoke({"steps": []}, thread_config(tid))
+    assert _count(saver, "checkpoints", "t1") > 1
+
+    stats = compact(saver, keep_last=1)
+
+    assert stats["threads_dropped"] == 0 and stats["checkpoints_deleted"] > 0
+    for tid in ("t1", "t2"):
+        assert _count(saver, "checkpoints", tid) == 1
+        # 남은 마지막 체크포인트로 최종 상태 조회 가능
+        assert app.get_state(thread_config(tid)).values["steps"] == ["a", "b", "c"]
+
+
+def test_compact_drops_threads_older_than_max_age(tmp_path):
+    saver = open_checkpointer(str(tmp_path / "graph.sqlite"))
+    app = _graph(saver)
+    app.invoke({"steps": []}, thread_config("old"))
+
+    stats = compact(saver, max_age_days=-1, vacuum=False)  # 모든 스레드가 기준보다 오래됨
+
+    assert stats["threads_dropped"] == 1
+    assert _count(saver, "checkpoints", "old") == 0
+    assert _count(saver, "writes", "old") == 0
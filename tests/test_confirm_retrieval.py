@@ -0,0 +1,33 @@
+from langchain.schema import Document
+
+from core.confirm_retrieval import confirm_retrieval
+
+
+def test_auto_rejection_drops_rejected_ids_from_pool():
+    web = {i: Document(id=i, page_content=f"문서 {i}") for i in ("a", "b")}
+    state = {
+        "retrieved_ids": ["a", "b"],
+        "web_docs": web,
+        "retrieval_pool": {"a": 0.1, "b": 0.05, "c": 0.01},
+        "retries": 0,
+    }
+    update = confirm_retrieval(state, mode="auto")
+    assert update["route"] == "rewrite"
+    assert update["retrieval_pool"] == {"c": 0.01}
+
+
+def test_interrupt_preview_is_rendered_without_storing_it(monkeypatch):
+    import langgraph.types
+
+    payloads = []
+    monkeypatch.setattr(langgraph.types, "interrupt", lambda payload: payloads.append(payload) or {"accept": True})
+    raw = "<table><tr><td>안전난간</td><td>설치 기준</td></tr></table>"
+    web = {"a": Document(id="a", page_content=raw, metadata={"source": "kosha.md"})}
+    state = {"retrieved_ids": ["a"], "web_docs": web}
+
+    update = confirm_retrieval(state, mode="interrupt")
+    assert update["route"] == "generate"
+    assert payloads[0]["documents"][0]["preview"] == "안전난간 설치 기준"
+    # 미리보기는 metadata에 저장하지 않고, 본문(프롬프트 원천)도 그대로
+    assert web["a"].metadata == {"source": "kosha.md"}
+    assert web["a"].page_content == raw
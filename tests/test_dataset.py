@@ -0,0 +1,55 @@
+import pandas as pd
+
+from core import dataset
+
+
+def _write_split(tmp_path, monkeypatch):
+    df = pd.DataFrame({
+        "ID": ["TRAIN_000", "TRAIN_001"],
+        "공사종류(대분류)": ["건축", "토목"],
+        "공종(중분류)": ["철근콘크리트공사", "토공사"],
+        "작업프로세스": ["타설작업", None],
+        "사고객체(중분류)": ["거푸집", "굴착기"],
+        "사고원인": ["부주의", "확인 미흡"],
+    })
+    df.to_csv(tmp_path / "train_preprocessing.csv", index=False, encoding="utf-8-sig")
+    monkeypatch.setattr(dataset, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(dataset, "CACHE_DIR", str(tmp_path / ".cache"))
+
+
+def test_query_shim_train_is_raw_csv(tmp_path, monkeypatch):
+    _write_split(tmp_path, monkeypatch)
+    from core import query
+
+    train = query.train
+    assert train["작업프로세스"].iloc[0] == "타설작업"
+    assert "situation" not in train.columns
+    assert query.data_train["process"].iloc[0] == "타설작업"
+
+
+def test_missing_cells_render_the_same_in_train_and_batch(tmp_path, monkeypatch):
+    _write_split(tmp_path, monkeypatch)
+
+    expected = "'토목' 공사 중 '토공사'의 '' 과정에서 '확인 미흡'으로 인해 사고가 발생하였습니다."
+    assert dataset.situations("train")[1] == expected
+    cases = list(dataset.iter_cases("train"))
+    assert [c["situation"] for c in cases] == dataset.situations("train")
+
+
+def test_csv_is_rehashed_only_when_it_changes(tmp_path, monkeypatch):
+    _write_split(tmp_path, monkeypatch)
+    hashed = []
+    real_hash = dataset.file_hash
+    monkeypatch.setattr(dataset, "file_hash", lambda path: hashed.append(path) or real_hash(path))
+
+    first = dataset.load_cases("train")
+    for _ in range(3):
+        assert dataset.load_cases("train") is first
+        dataset.load_raw("train")
+    assert len(hashed) == 1
+
+    path = tmp_path / "train_preprocessing.csv"
+    path.write_text(path.read_text(encoding="utf-8-sig") + "TRAIN_002,건축,조적공사,쌓기,벽돌,부주의\n",
+                    encoding="utf-8-sig")
+    assert len(dataset.load_cases("train")) == 3
+    assert len(hashed) == 2
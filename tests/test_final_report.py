@@ -0,0 +1,116 @@
+from core import final_report
+from core.budget import LEDGER, new_budget
+
+
+def _state(**limits):
+    budget = new_budget(**limits)
+    return {"budget": budget}
+
+
+def test_speculation_allowed_without_limits():
+    assert final_report.can_afford_speculation(_state())
+    assert final_report.can_afford_speculation(None)
+
+
+def test_speculation_skipped_when_calls_are_tight():
+    state = _state(max_llm_calls=3)
+    assert not final_report.can_afford_speculation(state)
+    state = _state(max_llm_calls=50)
+    assert final_report.can_afford_speculation(state)
+
+
+def test_speculation_skipped_after_half_the_token_budget():
+    state = _state(max_completion_tokens=1000)
+    run_id = state["budget"]["run_id"]
+    LEDGER.add(run_id, "generate", completion_tokens=600)
+    try:
+        assert not final_report.can_afford_speculation(state)
+    finally:
+        LEDGER.pop(run_id)
+
+
+def test_start_speculative_report_does_not_submit_when_unaffordable(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(final_report, "submit_with_context", lambda *a, **k: submitted.append(a))
+    final_report.start_speculative_report("rag output", _state(max_llm_calls=1))
+    assert submitted == []
+
+
+REPORT = """보고서 머리말
+
+## 1. 사고 개요
+개요 본문
+
+## 2. 사고 원인 분석
+### 직접 원인
+- 원인 A
+"""
+
+
+def test_split_and_join_report_sections_roundtrip():
+    preamble, sections = final_report.split_report_sections(REPORT)
+    assert preamble == "보고서 머리말"
+    assert [s["title"] for s in sections] == ["1. 사고 개요", "2. 사고 원인 분석"]
+    assert sections[1]["body"] == "### 직접 원인\n- 원인 A"  # '###' 소제목은 섹션 경계가 아님
+    again = final_report.split_report_sections(final_report.join_report_sections(preamble, sections))
+    assert again == (preamble, sections)
+
+
+NUMBERED_REPORT = """# 건설 사고 재발 방지 대책 보고서
+
+**1. 사고 개요**
+개요 본문
+
+## 4. 재발 방지 대책
+다음 대책을 단계별로 시행한다.
+1. 안전난간 설치
+2. 작업발판 점검
+3. 안전교육 실시
+
+## 5. 관련 법규 및 기준
+- 산업안전보건기준에 관한 규칙 제13조
+"""
+
+
+def test_numbered_list_items_are_not_sections():
+    preamble, sections = final_report.split_report_sections(NUMBERED_REPORT)
+    assert preamble == "# 건설 사고 재발 방지 대책 보고서"  # '#' 문서 제목은 섹션이 아님
+    assert [s["title"] for s in sections] == ["1. 사고 개요", "4. 재발 방지 대책", "5. 관련 법규 및 기준"]
+    assert sections[1]["body"] == "다음 대책을 단계별로 시행한다.\n1. 안전난간 설치\n2. 작업발판 점검\n3. 안전교육 실시"
+
+
+def test_failed_section_marker_is_shared():
+    text = f"## 3. 즉시 조치 사항\n{final_report.SECTION_FAILED_NOTE}"
+    assert final_report.section_failed(text)
+    assert not final_report.section_failed("## 3. 즉시 조치 사항\n본문")
+
+
+def test_repair_with_out_of_range_sections_does_nothing():
+    state = {
+        "report": REPORT,
+        "query": "q",
+        "report_review": {"verdict": "insufficient",
+                          "sections": [{"index": 7, "title": "?", "verdict": "insufficient", "reason": ""}]},
+    }
+    assert final_report.repair_report_node(state) == {}
+
+
+def test_route_report_ignores_out_of_range_sections():
+    from core.report_grader import route_report
+
+    review = {"verdict": "insufficient", "sections": [{"index": 7, "verdict": "insufficient"}]}
+    assert route_report({"report": REPORT, "report_review": review}) == "insufficient"
+    review["sections"][0]["index"] = 2
+    assert route_report({"report": REPORT, "report_review": review}) == "repair"
+
+
+def test_verdict_inadequate_is_not_adequate():
+    from core.report_grader import _verdict_of
+
+    assert _verdict_of('{"verdict": "adequate"}') == "adequate"
+    assert _verdict_of('{"verdict": "inadequate"}') == "insufficient"
+    # JSON을 못 읽은 원문 응답: 두 단어가 함께 나와도 부정 판정 우선
+    assert _verdict_of("The report is inadequate: not adequate coverage of 관련 규정") == "insufficient"
+    assert _verdict_of("판정: adequate") == "adequate"
+    assert _verdict_of("{'verdict': 'insufficient', 'note': 'adequate sections exist'}") == "insufficient"
+    assert _verdict_of("") == "insufficient"
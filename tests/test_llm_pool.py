@@ -0,0 +1,67 @@
+from core.llm_pool import Endpoint, EndpointPool
+
+
+def _pool(*endpoints, **kwargs):
+    kwargs.setdefault("health_interval", 1e9)  # 테스트 중 헬스 체크 요청 없음
+    return EndpointPool(list(endpoints), **kwargs)
+
+
+def test_pick_prefers_least_outstanding_healthy():
+    a, b = Endpoint("a", "http://a", "m"), Endpoint("b", "http://b", "m")
+    a.outstanding = 3
+    assert _pool(a, b)._pick([a, b], exclude=[]) is b
+
+
+def test_retry_falls_back_to_unhealthy_when_healthy_one_is_excluded():
+    # a는 1회 실패(아직 healthy), b는 unhealthy → 재시도에서 a를 제외하면 b라도 사용
+    a, b = Endpoint("a", "http://a", "m"), Endpoint("b", "http://b", "m")
+    b.healthy = False
+    pool = _pool(a, b, acquire_timeout=0.5)
+    with pool.acquire(exclude=[a]) as ep:
+        assert ep is b
+
+
+def test_busy_healthy_endpoint_is_waited_for_not_skipped():
+    a, b = Endpoint("a", "http://a", "m", max_concurrency=1), Endpoint("b", "http://b", "m")
+    b.healthy = False
+    a.outstanding = 1
+    assert _pool(a, b)._pick([a, b], exclude=[]) is None
+
+
+def test_call_llm_returns_failure_message_on_acquire_timeout(monkeypatch):
+    from contextlib import contextmanager
+    from core import llm_utils
+
+    @contextmanager
+    def _timeout(node=None, exclude=()):
+        raise TimeoutError("busy")
+        yield
+
+    monkeypatch.setattr(llm_utils, "LLM_BACKEND", "qwen-remote")
+    monkeypatch.setattr(llm_utils.LLM_POOL, "acquire", _timeout)
+    out = llm_utils.call_llm([{"role": "user", "content": "hi"}])
+    assert out.startswith("⚠️ 모델 응답 실패")
+
+
+def test_call_llm_records_malformed_response_once(monkeypatch):
+    from core import llm_utils
+
+    class _Response:
+        status_code = 200
+        text = '{"usage": {}}'
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"usage": {"prompt_tokens": 3, "completion_tokens": 0}}  # choices 없음
+
+    recorded = []
+    ep = Endpoint("a", "http://a", "m")
+    monkeypatch.setattr(llm_utils, "LLM_BACKEND", "qwen-remote")
+    monkeypatch.setattr(llm_utils, "LLM_POOL", _pool(ep))
+    monkeypatch.setattr(llm_utils.requests, "post", lambda *a, **k: _Response())
+    monkeypatch.setattr(llm_utils, "record_llm_call", lambda usage, seconds, node: recorded.append(usage))
+    out = llm_utils.call_llm([{"role": "user", "content": "hi"}])
+    assert out.startswith("⚠️ 모델 응답 실패")
+    assert recorded == [None]
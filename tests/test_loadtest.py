@@ -0,0 +1,46 @@
+import pytest
+
+from bench.loadtest import _percentiles, find_saturation, load_situations
+
+
+def _level(concurrency, throughput_cpm, offered_rate=None):
+    return {"concurrency": concurrency, "throughput_cpm": throughput_cpm, "offered_rate": offered_rate}
+
+
+def test_percentiles():
+    assert _percentiles([]) == {"p50": None, "p90": None, "p95": None, "p99": None, "mean": None}
+    stats = _percentiles([float(i) for i in range(1, 101)])
+    assert stats["p50"] == pytest.approx(50.5)
+    assert stats["p99"] == pytest.approx(99.01)
+    assert stats["mean"] == pytest.approx(50.5)
+    assert _percentiles([2.0]) == {"p50": 2.0, "p90": 2.0, "p95": 2.0, "p99": 2.0, "mean": 2.0}
+
+
+def test_saturation_at_last_level_that_still_gained():
+    levels = [_level(1, 10.0), _level(2, 19.0), _level(4, 20.0), _level(8, 30.0)]
+    sat = find_saturation(levels)
+    assert sat["concurrency"] == 2
+    assert "concurrency 4" in sat["reason"]
+    # 기준을 낮추면 +5.3%도 증가로 인정 → 측정 범위 내 포화 없음
+    assert find_saturation(levels, gain=0.05) is None
+
+
+def test_saturation_gain_threshold_and_offered_rate():
+    levels = [_level(1, 10.0), _level(2, 10.8), _level(4, 20.0)]
+    assert find_saturation(levels, gain=0.10)["concurrency"] == 1
+    assert find_saturation(levels, gain=0.05) is None
+    assert find_saturation([]) is None
+    # open loop: 제시 부하(1건/s = 60건/min)의 90%에 못 미치면 그 단계에서 포화
+    open_loop = [_level(1, 59.0, offered_rate=1.0), _level(2, 50.0, offered_rate=1.0)]
+    assert find_saturation(open_loop) == {"concurrency": 2, "reason": "throughput below offered rate"}
+
+
+def test_load_situations_query_applies_limit(monkeypatch):
+    import pandas as pd
+
+    from core import dataset
+
+    cases = pd.DataFrame({"situation": [f"상황 {i}" for i in range(10)]})
+    monkeypatch.setattr(dataset, "load_cases", lambda split: cases)
+    assert load_situations("query", limit=3) == ["상황 0", "상황 1", "상황 2"]
+    assert len(load_situations("query")) == 10
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from core.models import ModelBackend, ModelRegistry, RegistryLLM
+
+
+class FakeLLM:
+    def invoke(self, messages):
+        return "ok"
+
+
+class FakeBackend(ModelBackend):
+    loads = 0
+
+    def __init__(self, name):
+        FakeBackend.loads += 1
+        self.name = name
+        self.llm = FakeLLM()
+        self.unloaded = False
+
+    def chat(self, messages, temperature=0.3, top_p=0.9, max_tokens=2000):
+        return self.llm.invoke(messages)
+
+    def unload(self):
+        self.unloaded = True
+        self.llm = None
+
+
+def _registry():
+    reg = ModelRegistry(idle_unload_s=0)  # reaper 스레드 없이 unload_idle 직접 호출
+    reg.register("m", lambda: FakeBackend("m"))
+    return reg
+
+
+def test_backend_in_use_is_never_unloaded():
+    reg = _registry()
+    with reg.use("m") as backend:
+        assert reg.unload_idle(max_idle_s=0) == []
+        assert reg.unload("m") is False
+        assert backend.chat([]) == "ok"
+    assert reg.unload_idle(max_idle_s=0) == ["m"]
+    assert backend.unloaded
+
+
+def test_chat_refreshes_last_used():
+    reg = _registry()
+    reg.chat("m", [])
+    assert reg.unload_idle(max_idle_s=3600) == []
+    assert reg.loaded() == ["m"]
+
+
+def test_registry_llm_proxy_follows_reload():
+    reg = _registry()
+    proxy = RegistryLLM(reg, "m")
+    before = FakeBackend.loads
+    assert proxy.invoke([]) == "ok"
+    reg.unload("m")
+    assert proxy.invoke([]) == "ok"  # 해제 후 다음 호출에서 다시 로드 (이전 객체를 붙잡지 않음)
+    assert FakeBackend.loads == before + 2
+
+
+def test_concurrent_use_and_reaper():
+    reg = _registry()
+    errors = []
+
+    def _worker():
+        for _ in range(200):
+            try:
+                reg.chat("m", [])
+            except Exception as e:  # 해제된 백엔드로 호출하면 AttributeError
+                errors.append(e)
+
+    threads = [threading.Thread(target=_worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for _ in range(200):
+        reg.unload_idle(max_idle_s=0)
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ModelBackend()
+
+
+def test_unload_unknown_name_returns_false():
+    reg = ModelRegistry(idle_unload_s=0)
+    done = []
+    t = threading.Thread(target=lambda: done.append(reg.unload("nope")), daemon=True)
+    t.start()
+    t.join(timeout=2)
+    assert done == [False]
+
+
+def test_hf_backend_passes_generation_parameters():
+    from core.models import HFBackend
+
+    class PipelineLLM:
+        def invoke(self, messages, **kwargs):
+            self.kwargs = kwargs
+            return "답변"
+
+    backend = HFBackend("local", lambda device: PipelineLLM())
+    assert backend.chat([{"role": "user", "content": "q"}], temperature=0.7, top_p=0.8, max_tokens=64) == "답변"
+    assert backend.llm.kwargs["pipeline_kwargs"] == {
+        "max_new_tokens": 64, "do_sample": True, "top_p": 0.8, "temperature": 0.7,
+    }
+    backend.chat([{"role": "user", "content": "q"}], temperature=0)
+    assert backend.llm.kwargs["pipeline_kwargs"]["do_sample"] is False
+    assert "temperature" not in backend.llm.kwargs["pipeline_kwargs"]
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("docx")
+
+from core.report_export import ReportExporter, parse_report
+
+
+def test_numbered_lines_are_list_items_unless_section_titles():
+    text = "\n".join([
+        "# 건설 사고 재발 방지 대책 보고서",
+        "**1. 사고 개요**",
+        "1. 안전난간 설치",
+        "2. 작업 전 TBM 실시",
+        "## 2. 사고 원인 분석",
+        "- 추락 방지망 미설치",
+        "재발 방지 대책:",
+        "(1) 교육 강화",
+    ])
+    assert parse_report(text) == [
+        ("heading", 1, "건설 사고 재발 방지 대책 보고서"),
+        ("heading", 1, "1. 사고 개요"),
+        ("number", 0, "1. 안전난간 설치"),
+        ("number", 0, "2. 작업 전 TBM 실시"),
+        ("heading", 2, "2. 사고 원인 분석"),
+        ("bullet", 0, "추락 방지망 미설치"),
+        ("heading", 1, "재발 방지 대책"),
+        ("number", 0, "(1) 교육 강화"),
+    ]
+
+
+class _BrokenPool:
+    def submit(self, *args, **kwargs):
+        raise RuntimeError("pool broken")
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def test_submit_does_not_block_when_pool_submit_fails(tmp_path):
+    exporter = ReportExporter(str(tmp_path), workers=1, max_queue=1)
+    exporter._pool.shutdown()
+    exporter._pool = _BrokenPool()
+    for i in range(5):
+        exporter.submit({"id": f"c{i}", "status": "ok", "report": "본문"})
+    summary = exporter.close()
+    assert summary["written"] == 0 and summary["failed"] == 5
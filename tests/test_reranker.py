@@ -0,0 +1,103 @@
+import pytest
+
+pytest.importorskip("tokenizers")
+pytest.importorskip("transformers")
+
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import PreTrainedTokenizerFast
+
+from core.reranker import BatchedCrossEncoder
+
+
+def _tokenizer(type_ids: bool = False):
+    """bge-reranker(XLM-R)와 같은 <s> A </s></s> B </s> 배치의 작은 fast 토크나이저"""
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    vocab.update({f"w{i}": len(vocab) + i for i in range(300)})
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    backend.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>",
+        pair="<s> $A </s> </s> $B:1 </s>:1",
+        special_tokens=[("<s>", 0), ("</s>", 2)],
+    )
+    names = ["input_ids", "token_type_ids", "attention_mask"] if type_ids else ["input_ids", "attention_mask"]
+    return PreTrainedTokenizerFast(
+        tokenizer_object=backend, model_input_names=names,
+        bos_token="<s>", eos_token="</s>", sep_token="</s>", cls_token="<s>",
+        pad_token="<pad>", unk_token="<unk>",
+    )
+
+
+class _Encoder(BatchedCrossEncoder):
+    def __init__(self, tokenizer, max_length):
+        # 모델 허브 접근 없이 토크나이저만 주입
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def _logits(self, batch):
+        raise AssertionError("점수 계산은 테스트하지 않음")
+
+    def score_features(self, features):
+        # 점수 대신 모델 입력을 그대로 반환
+        return features
+
+
+def _text(start, n):
+    return " ".join(f"w{i}" for i in range(start, start + n))
+
+
+@pytest.mark.parametrize("type_ids", [False, True])
+@pytest.mark.parametrize("max_length", [16, 17, 32, 33, 512])
+@pytest.mark.parametrize("q_len,d_len", [
+    (3, 5),       # 절단 없음
+    (4, 200),     # 본문만 절단
+    (200, 4),     # 질의만 절단
+    (40, 40),     # 같은 길이 둘 다 절단
+    (40, 60),     # 둘 다 절단, 본문이 더 김
+    (60, 40),     # 둘 다 절단, 질의가 더 김
+    (9, 10),      # 홀수 초과분
+    (10, 9),
+])
+def test_pair_features_matches_fast_tokenizer(type_ids, max_length, q_len, d_len):
+    tok = _tokenizer(type_ids)
+    enc = _Encoder(tok, max_length)
+    query, doc = _text(0, q_len), _text(100, d_len)
+
+    query_ids = tok(query, add_special_tokens=False)["input_ids"]
+    doc_ids = tok(doc, add_special_tokens=False)["input_ids"]
+    expected = tok(query, doc, truncation=True, max_length=max_length)
+
+    got = enc.pair_features(query_ids, doc_ids)
+    assert got == {k: expected[k] for k in got}
+    assert set(got) == set(expected)
+
+
+class _Doc:
+    def __init__(self, id, page_content):
+        self.id = id
+        self.page_content = page_content
+
+
+@pytest.mark.parametrize("q_len", [5, 40, 60, 200])
+def test_score_query_with_token_cache_matches_pair_encoding(q_len):
+    max_length = 33
+    tok = _tokenizer()
+    enc = _Encoder(tok, max_length)
+    docs = [_Doc("a", _text(100, 40)), _Doc("b", _text(100, 4)), _Doc("web", _text(150, 70))]
+    # core/token_cache.py와 같이 청크 id를 max_length에서 잘라 저장
+    cache = {d.id: tok(d.page_content, add_special_tokens=False, truncation=True,
+                       max_length=max_length)["input_ids"] for d in docs[:2]}
+
+    query = _text(0, q_len)
+    got = enc.score_query(query, docs, cache)
+    expected = enc.encode([(query, d.page_content) for d in docs])
+    assert got == expected
+
+
+def test_backend_must_implement_logits():
+    class NoLogits(BatchedCrossEncoder):
+        def __init__(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoLogits()
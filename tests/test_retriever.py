@@ -0,0 +1,84 @@
+import pytest
+
+retriever = pytest.importorskip("core.retriever")
+
+
+class FakeRetriever:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+def test_local_factory_ignores_retriever_url(monkeypatch):
+    monkeypatch.setattr(retriever, "RETRIEVER_URL", "unix:///nonexistent.sock")
+    monkeypatch.setattr(retriever, "RerankRetriever", FakeRetriever)
+
+    local = retriever.make_retriever(local=True, mmap=True)
+    assert isinstance(local, FakeRetriever)
+    assert local.kwargs["mmap"] is True
+
+
+def test_shared_instance_is_created_on_first_use(monkeypatch):
+    created = []
+    monkeypatch.setattr(retriever, "_instance", None)
+    monkeypatch.setattr(retriever, "make_retriever", lambda: created.append(1) or FakeRetriever())
+
+    assert created == []  # import만으로는 생성하지 않음
+    first = retriever.retriever_instance
+    assert retriever.get_retriever() is first
+    assert created == [1]
+
+
+def _small_retriever(tmp_path, monkeypatch, cross_encoder=None):
+    from langchain.schema import Document
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    topics = ["추락 안전난간", "감전 전기설비", "붕괴 흙막이", "협착 크레인", "화재 용접"]
+    docs = [Document(page_content=f"{t} 사고 예방 대책 {i}번 문단", metadata={"filename": f"{i}.pdf"})
+            for i, t in enumerate(topics * 4)]
+    FAISS.from_documents(docs, embeddings).save_local(str(tmp_path))
+    monkeypatch.setattr(retriever, "get_qwen_api_embeddings", lambda: embeddings)
+    monkeypatch.setattr(retriever, "make_reranker", lambda name: cross_encoder or object())
+    return retriever.RerankRetriever(faiss_db_path=str(tmp_path), top_k=4, mmap=False)
+
+
+def test_hybrid_candidates_match_ensemble_invoke(tmp_path, monkeypatch):
+    r = _small_retriever(tmp_path, monkeypatch)
+    for query in ("추락 안전난간 사고", "용접 화재", "없는 단어"):
+        # 단계별 span으로 나눈 검색(weighted_reciprocal_rank)이 EnsembleRetriever.invoke와 같은 순서
+        expected = [d.id for d in r.hybrid_retriever.invoke(query)]
+        assert [d.id for d in r.hybrid_candidates(query)] == expected
+
+
+class CountingCrossEncoder:
+    def __init__(self):
+        self.pairs = 0
+
+    def score(self, pairs):
+        self.pairs += len(pairs)
+        return [len(set(q.split()) & set(d.split())) / 10 for q, d in pairs]
+
+
+def test_rewrite_rescores_carried_candidates_with_new_query(tmp_path, monkeypatch):
+    ce = CountingCrossEncoder()
+    r = _small_retriever(tmp_path, monkeypatch, ce)
+
+    docs, pool = r.retrieve_incremental("추락 안전난간 사고")
+    first = ce.pairs
+    assert first == len(pool) and len(docs) <= r.top_k
+
+    # 같은 쿼리 재검색: 저장된 점수 재사용
+    again, pool2 = r.retrieve_incremental("추락 안전난간 사고", pool, "추락 안전난간 사고")
+    assert ce.pairs == first
+    assert [d.id for d in again] == [d.id for d in docs]
+
+    # 재작성된 쿼리: 이전 후보까지 모두 새 쿼리로 다시 점수화 (점수 기준이 섞이지 않음)
+    before = ce.pairs
+    docs3, pool3 = r.retrieve_incremental("용접 화재", pool2, "추락 안전난간 사고")
+    assert set(pool2) <= set(pool3)
+    assert ce.pairs - before == len(pool3)
+    expected = dict(zip(pool3, r.cross_encoder.score([("용접 화재", d.page_content)
+                                                       for d in r.get_documents(list(pool3))])))
+    assert pool3 == pytest.approx(expected)
+    assert [d.id for d in docs3] == sorted(pool3, key=pool3.get, reverse=True)[: r.top_k]
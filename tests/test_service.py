@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import service
+from core.budget import LEDGER, new_budget
+
+
+class FakeGraph:
+    """app.stream / get_state / checkpointer.delete_thread 만 흉내 낸 그래프"""
+
+    def __init__(self, gate=None, fail=False):
+        self.gate = gate
+        self.fail = fail
+        self.deleted = []
+        self.checkpointer = SimpleNamespace(delete_thread=self.deleted.append)
+
+    def stream(self, graph_input, config, stream_mode=None):
+        yield "values", graph_input
+        # gate가 열릴 때까지 이벤트를 계속 보냄 (끊긴 클라이언트에 쓰다가 핸들러가 먼저 종료되도록)
+        deadline = time.monotonic() + 5
+        while self.gate is not None and not self.gate.is_set() and time.monotonic() < deadline:
+            yield "updates", {"retrieve": {}}
+            time.sleep(0.02)
+        if self.fail:
+            raise RuntimeError("boom")
+        yield "updates", {"generate": {"candidate_answer": "ok"}}
+
+    def get_state(self, config):
+        return SimpleNamespace(next=(), tasks=(), values={})
+
+
+def _ready_service(graph):
+    svc = service.AgentService(max_concurrency=1, max_queue=0)
+    svc.app = graph
+    svc.ready = True
+    return svc
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_bad_json_and_budget_return_400():
+    async def main():
+        svc = _ready_service(FakeGraph())
+        app = service.make_app(svc)
+        app.on_startup.clear()
+        async with TestClient(TestServer(app)) as client:
+            r = await client.post("/v1/cases", data="not json", headers={"Content-Type": "application/json"})
+            assert r.status == 400
+            r = await client.post("/v1/cases", json=["list"])
+            assert r.status == 400
+            r = await client.post("/v1/cases", json={"situation": "x", "budget": {"deadline_s": "soon"}})
+            assert r.status == 400
+            r = await client.post("/v1/cases", json={"situation": "x", "budget": {"nope": 1}})
+            assert r.status == 400
+            r = await client.post("/v1/cases/t1/resume", data="{", headers={"Content-Type": "application/json"})
+            assert r.status == 400
+
+    _run(main())
+
+
+def test_failed_run_releases_budget_and_checkpoint():
+    graph = FakeGraph(fail=True)
+    svc = _ready_service(graph)
+    budget = new_budget()
+    LEDGER.add(budget["run_id"], "generate", llm_calls=1)
+    try:
+        svc._run_graph({"budget": budget}, {"configurable": {"thread_id": "t1"}}, lambda ev: None)
+    except RuntimeError:
+        pass
+    assert budget["run_id"] not in LEDGER._runs
+    assert graph.deleted == ["t1"]
+
+
+def test_disconnected_client_keeps_slot_until_graph_finishes():
+    gate = threading.Event()
+    svc = _ready_service(FakeGraph(gate=gate))
+
+    async def handler(request):
+        return await svc.execute(request, {"budget": new_budget()}, {"configurable": {"thread_id": "t2"}}, stream=True)
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/run", handler)
+        async with TestClient(TestServer(app)) as client:
+            resp = await client.post("/run")
+            await resp.content.readline()  # queued
+            await resp.content.readline()  # started
+            resp.close()                   # 클라이언트 연결 끊김
+            await asyncio.sleep(0.5)
+            assert svc.running == 1        # 그래프는 아직 실행 중 → 슬롯 유지
+            assert svc.admit() is not None
+            gate.set()
+            for _ in range(50):
+                if svc.running == 0:
+                    break
+                await asyncio.sleep(0.05)
+            assert svc.running == 0
+
+    _run(main())
+
+
+class PausedGraph(FakeGraph):
+    """confirm interrupt에서 멈춘 상태를 돌려주는 그래프"""
+
+    def get_state(self, config):
+        return SimpleNamespace(next=("confirm_retrieval",), tasks=(), values={})
+
+
+def test_paused_run_releases_budget_but_keeps_checkpoint():
+    graph = PausedGraph()
+    svc = _ready_service(graph)
+    budget = new_budget()
+    LEDGER.add(budget["run_id"], "generate", llm_calls=1)
+    svc._run_graph({"budget": budget}, {"configurable": {"thread_id": "t3"}}, lambda ev: None)
+    assert budget["run_id"] not in LEDGER._runs
+    assert graph.deleted == []
+
+
+def test_duplicate_case_id_returns_409():
+    gate = threading.Event()
+    svc = _ready_service(FakeGraph(gate=gate))
+    svc.max_queue = 5
+
+    async def handler(request):
+        return await svc.execute(request, {"budget": new_budget()}, {"configurable": {"thread_id": "dup"}}, stream=True)
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/run", handler)
+        async with TestClient(TestServer(app)) as client:
+            first = await client.post("/run")
+            await first.content.readline()  # queued
+            await first.content.readline()  # started
+            r = await client.post("/run")
+            assert r.status == 409
+            gate.set()
+            await first.read()
+            assert svc.active == set()
+
+        # 확인 대기(interrupt)로 멈춘 case_id도 새 실행으로 덮어쓰지 않음
+        app = service.make_app(_ready_service(PausedGraph()))
+        app.on_startup.clear()
+        async with TestClient(TestServer(app)) as client:
+            r = await client.post("/v1/cases", json={"situation": "x", "case_id": "paused"})
+            assert r.status == 409
+            r = await client.post("/v1/cases", json={"situation": "x", "case_id": 3})
+            assert r.status == 400
+
+    _run(main())
+
+
+def test_service_is_stored_under_app_key():
+    import warnings
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        app = service.make_app(_ready_service(FakeGraph()))
+    assert isinstance(app[service.SERVICE_KEY], service.AgentService)
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import web_backends
+from core.web_backends import LocalFolderBackend, TavilyBackend, WebSearchBackend
+
+
+def _folder(tmp_path):
+    for i in range(12):
+        (tmp_path / f"doc{i}.md").write_text(
+            f"안전난간 설치 기준 {i}번 문단입니다. 추락 방지를 위해 작업발판 끝에 난간을 설치해야 합니다.\n\n",
+            encoding="utf-8",
+        )
+    return str(tmp_path)
+
+
+def test_local_backend_k_is_per_call(tmp_path):
+    backend = LocalFolderBackend(folder=_folder(tmp_path))
+    ks = [1, 7, 3, 10] * 10
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sizes = list(pool.map(lambda k: len(backend.search("안전난간 추락", k)), ks))
+    assert sizes == ks
+
+
+def test_tavily_requires_api_key(monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    with pytest.raises(RuntimeError, match="TAVILY_API_KEY"):
+        TavilyBackend()
+    assert TavilyBackend(api_key="tvly-test").api_key == "tvly-test"
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        WebSearchBackend()
+    assert web_backends.BACKENDS["local"] is LocalFolderBackend
+
+
+def test_search_all_skips_tavily_without_key_with_one_warning(monkeypatch, capsys, tmp_path):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    monkeypatch.setattr(web_backends, "_instances", {"local": LocalFolderBackend(folder=_folder(tmp_path))})
+    monkeypatch.setattr(web_backends, "_unconfigured", {})
+    monkeypatch.setattr(web_backends, "CACHE", web_backends.WebSearchCache(str(tmp_path / "cache.sqlite")))
+
+    for _ in range(3):
+        docs = web_backends.search_all(["안전난간 추락"], k=2, backends=["tavily", "local"])
+        assert len(docs) == 2
+    out = capsys.readouterr().out
+    assert out.count("'tavily' 설정 없음") == 1
+    assert "웹 검색 실패" not in out
+    assert web_backends.search_all(["안전난간"], k=2, backends=["tavily"]) == []
+
+    with pytest.raises(ValueError):
+        web_backends.search_all(["안전난간"], backends=["tavly"])